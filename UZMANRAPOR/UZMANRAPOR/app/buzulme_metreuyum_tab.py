@@ -16,6 +16,8 @@ from PySide6.QtGui import QFont, QTextDocument
 from app.models import PandasModel
 from app.filter_proxy import MultiColumnFilterProxy
 from app import storage
+from io_layer.excel_reader import read_excel_fast
+from io_layer.parse_cache import cached_load
 
 
 def _col_pick(df: pd.DataFrame, candidates: list[str]) -> str | None:
@@ -44,6 +46,17 @@ def _clean_col(c: object) -> str:
     return s
 
 
+# Parse önbelleği anahtarı; _read_zppr0308 çıktısını değiştiren her düzenlemede artırın
+ZPPR_LOADER_VERSION = 1
+
+
+def _read_zppr0308(path: str) -> pd.DataFrame:
+    df_raw = read_excel_fast(path)
+    # >>> KOLON ADLARINI TEMİZLE (kritik)
+    df_raw.columns = [_clean_col(c) for c in df_raw.columns]
+    return df_raw
+
+
 class WrapHeaderView(QHeaderView):
     """
     Bu sekmeye özel: Sütun başlıklarını 3 satıra kadar word-wrap ile çizer.
@@ -256,9 +269,7 @@ class BuzulmeMetreUyumTab(QWidget):
 
     def _run_pipeline(self, path: str):
         try:
-            df_raw = pd.read_excel(path)
-            # >>> KOLON ADLARINI TEMİZLE (kritik)
-            df_raw.columns = [_clean_col(c) for c in df_raw.columns]
+            df_raw = cached_load(path, "zppr0308", ZPPR_LOADER_VERSION, _read_zppr0308)
         except Exception as e:
             QMessageBox.critical(self, "Hata", f"Dosya okunamadı:\n{e}")
             return
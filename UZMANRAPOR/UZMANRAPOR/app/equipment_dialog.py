@@ -5,7 +5,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 import traceback
 
-from app.storage import load_loom_cut_map, save_loom_cut_map
+from app.storage import SaveConflict, load_loom_cut_map_for_edit, save_loom_cut_map
 
 
 def _norm_choice(val: str) -> str:
@@ -31,7 +31,8 @@ class LoomCutEditor(QDialog):
 
         self._start = int(start_loom)
         self._end = int(end_loom)
-        self._data = load_loom_cut_map() or {}  # {"2201":"ISAVER", ...}
+        # {"2201":"ISAVER", ...}; kayıt, okunan hale (taban) göre fark olarak yazılır
+        self._data, self._baseline = load_loom_cut_map_for_edit()
 
         v = QVBoxLayout(self)
 
@@ -108,7 +109,19 @@ class LoomCutEditor(QDialog):
                 if tz and typ:
                     out[tz] = typ
 
-            save_loom_cut_map(out)
+            try:
+                saved = save_loom_cut_map(out, self._baseline)
+            except SaveConflict:
+                # Başka bir oturum arada kaydetmiş: güncel listeyi göster, kullanıcı tekrar kaydetsin
+                self._data, self._baseline = load_loom_cut_map_for_edit()
+                self._fill()
+                QMessageBox.warning(self, "Kayıt çakışması",
+                                    "Kesim Tipi listesi başka bir oturumda değiştirilmiş.\n"
+                                    "Güncel liste yüklendi; değişikliklerinizi tekrar yapıp kaydediniz.")
+                return
+            if not saved:
+                QMessageBox.critical(self, "Hata (Kaydet)", "Kesim Tipi listesi kaydedilemedi.")
+                return
             self._data = out  # hafızayı da güncelle
             QMessageBox.information(self, "Kaydedildi", "Kesim Tipi listesi kaydedildi.")
         except Exception:
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+# ============================================================
+#  ETİKET -> TEZGAH İNDEKSİ (Usta Defteri, artımlı)
+#   UstaDefteri yalnız büyür: son görülen Id (high-water mark) tutulur, her tazelemede yalnız
+#   Id'si bundan büyük satırlar çekilir. Aynı etiketin en yeni (Id'si büyük) kaydı kazanır.
+#   Silme: uygulama silerken ver:UstaDefteri damgasını yeniler -> indeks baştan kurulur.
+#   Uygulama dışı silmeler / geç commit olan küçük Id'ler: Id <= high-water satır sayısı
+#   ``verify_sec``'te bir sunucuyla karşılaştırılır; tutmazsa baştan kurulur.
+#   İndeks diskte JSON olarak saklanır; yeniden başlatmada yalnız fark çekilir.
+# ============================================================
+
+FORMAT = 1
+
+# (Id, EtiketNo, Tezgah) satırları
+Row = tuple[Any, Any, Any]
+
+
+@dataclass
+class EtiketIndexStats:
+    deltas: int = 0         # high-water üstü sorgu sayısı
+    delta_rows: int = 0     # bu sorgularla gelen satır
+    rebuilds: int = 0       # baştan kurulum (ilk yükleme, silme damgası, sayım uyuşmazlığı)
+    verifies: int = 0       # sayım kontrolü
+    disk_loads: int = 0     # diskten yüklenen indeks
+    disk_writes: int = 0
+    errors: int = 0         # sorgu hatası (son bilinen harita kullanıldı)
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+def clean_value(val: Any) -> str:
+    if val is None:
+        return ""
+    if isinstance(val, float) and val != val:  # NaN
+        return ""
+    s = str(val).strip()
+    if not s:
+        return ""
+    return re.sub(r"\.0+$", "", s)
+
+
+class EtiketIndex:
+    """
+    Etiket -> Tezgah haritası (thread-safe).
+
+    fetch_rows(after_id): Id > after_id olan, EtiketNo'su dolu satırlar [(Id, EtiketNo, Tezgah)] (Id sırasıyla)
+    count_rows(upto_id): Id <= upto_id olan, EtiketNo'su dolu satır sayısı
+    version(): ver:UstaDefteri damgası (bilinmiyorsa None)
+    """
+
+    def __init__(
+        self,
+        fetch_rows: Callable[[int], Iterable[Row]],
+        count_rows: Callable[[int], int],
+        version: Callable[[], Optional[str]],
+        path: Optional[Path] = None,
+        verify_sec: float = 300.0,
+    ) -> None:
+        self.fetch_rows = fetch_rows
+        self.count_rows = count_rows
+        self.version = version
+        self.path = path
+        self.verify_sec = float(verify_sec)
+        self._map: dict[str, tuple[int, str]] = {}
+        self._high_water = 0
+        self._count = 0
+        self._version: Optional[str] = None
+        self._verified_at = float("-inf")
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.stats = EtiketIndexStats()
+
+    def mapping(self) -> dict[str, str]:
+        """Güncel harita ({etiket: tezgah}); sorgu hata verirse son bilinen harita döner."""
+        with self._lock:
+            if not self._loaded:
+                self._load_disk()
+                self._loaded = True
+            try:
+                self._refresh()
+            except Exception as e:
+                self.stats.errors += 1
+                print(f"[EtiketIndex] tazeleme hatası: {e!r}")
+            return {etiket: tezgah for etiket, (_, tezgah) in self._map.items()}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(None)
+            self._loaded = True
+            if self.path is not None:
+                try:
+                    self.path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------
+    def _reset(self, version: Optional[str]) -> None:
+        self._map = {}
+        self._high_water = 0
+        self._count = 0
+        self._version = version
+        self._verified_at = float("-inf")
+
+    def _refresh(self) -> None:
+        version = self.version()
+        rebuilt = False
+        if version is not None and version != self._version:
+            self._reset(version)
+            rebuilt = True
+        elif self._high_water and time.monotonic() - self._verified_at >= self.verify_sec:
+            self.stats.verifies += 1
+            if int(self.count_rows(self._high_water)) != self._count:
+                self._reset(self._version)
+                rebuilt = True
+            self._verified_at = time.monotonic()
+        if rebuilt:
+            self.stats.rebuilds += 1
+
+        rows = list(self.fetch_rows(self._high_water))
+        self.stats.deltas += 1
+        self.stats.delta_rows += len(rows)
+        if not rows and not rebuilt:
+            return
+        for rid, etiket, tezgah in sorted(rows, key=lambda r: int(r[0])):
+            rid = int(rid)
+            self._high_water = max(self._high_water, rid)
+            self._count += 1
+            etiket, tezgah = clean_value(etiket), clean_value(tezgah)
+            if etiket and tezgah:
+                self._map[etiket] = (rid, tezgah)
+        if rebuilt:
+            self._verified_at = time.monotonic()
+        self._save_disk()
+
+    def _load_disk(self) -> None:
+        if self.path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != FORMAT:
+                return
+            self._map = {str(k): (int(v[0]), str(v[1])) for k, v in data.get("map", {}).items()}
+            self._high_water = int(data.get("high_water", 0))
+            self._count = int(data.get("count", 0))
+            self._version = data.get("version")
+            self.stats.disk_loads += 1
+        except FileNotFoundError:
+            pass
+        except Exception:
+            self._reset(None)  # bozuk dosya: baştan kurulur
+
+    def _save_disk(self) -> None:
+        if self.path is None:
+            return
+        data = {
+            "format": FORMAT,
+            "high_water": self._high_water,
+            "count": self._count,
+            "version": self._version,
+            "map": {k: [rid, tezgah] for k, (rid, tezgah) in self._map.items()},
+        }
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp, self.path)
+            self.stats.disk_writes += 1
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["entries"] = len(self._map)
+            data["high_water"] = self._high_water
+            data["rows_seen"] = self._count
+            data["version"] = self._version
+            data["path"] = str(self.path) if self.path is not None else None
+        return data
@@ -9,7 +9,7 @@ from PySide6.QtWidgets import (
     QTableView, QHeaderView, QToolButton, QSizePolicy, QTextEdit, QDialog
 )
 from PySide6.QtCore import Qt, QTimer, QSettings
-from typing import Any
+from typing import Any, Optional
 
 from app.itema_tab import ItemaAyarTab
 from app.models import PandasModel
@@ -17,6 +17,7 @@ from app.filter_proxy import MultiColumnFilterProxy
 from io_layer.loaders import load_dinamik_any, load_running_orders, VISIBLE_COLUMNS, HEADER_ALIASES
 from app.value_picker import ValuePickerDialog
 from app.notes_dialog import NotesDialog
+from app.note_engine import NoteEngine
 from app import storage
 from app.kusbakisi import KusbakisiWidget
 from app.planning_dialog import PlanningDialog
@@ -27,6 +28,12 @@ from io_layer.loaders import enrich_running_with_loom_cut, enrich_running_with_s
 from app.auth import User
 from app.user_management_widget import UserManagementWidget
 from app.buzulme_metreuyum_tab import BuzulmeMetreUyumTab
+from app.sql_fanout import SqlFanout
+from app.running_norm import normalize_df_running
+from app.shifts import shift_bounds
+from app.load_pipeline import LoadPipeline, Stage
+from app.loading_overplay import LoadingOverlay
+from app.resource_path import resource_path
 
 
 
@@ -93,122 +100,6 @@ def require_permission(window: QWidget, perm: str, message: str) -> bool:
     return False
 
 
-# ============================================================
-# RUNNING ORDERS NORMALİZASYON BLOĞU (tek noktadan düzeltme)
-# ============================================================
-def _parse_number_loose(x):
-    """Metin/sayı karması 'Kalan' değerlerini güvenle floata çevirir.
-       92,7 | 1.234,56 | 1,234.56 | ' 300 ' | '92,7 m' | '-' -> float/NA"""
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return pd.NA
-    s = str(x).strip()
-    if s == "" or s == "-":
-        return pd.NA
-    # rakam, nokta, virgül, eksi dışını temizle
-    s = re.sub(r"[^0-9,.\-]", "", s)
-
-    if "," in s and "." in s:
-        # En sağdaki ayırıcı ondalık kabul
-        if s.rfind(",") > s.rfind("."):
-            s = s.replace(".", "")
-            s = s.replace(",", ".")
-        else:
-            s = s.replace(",", "")
-    else:
-        if "," in s:
-            parts = s.split(",")
-            if len(parts[-1]) <= 2:
-                s = s.replace(".", "")
-                s = s.replace(",", ".")
-            else:
-                s = s.replace(",", "")
-        elif "." in s:
-            parts = s.split(".")
-            if len(parts[-1]) > 2:  # 1.234 → binlik
-                s = s.replace(".", "")
-
-    try:
-        return float(s)
-    except Exception:
-        return pd.NA
-
-
-def _extract_nums_keep_decimal(text: str):
-    """Tarak grubu normalize için: ondalığı koruyarak sayıları çıkar (virgül -> nokta)."""
-    if text is None:
-        return []
-    nums = re.findall(r"[\d]+(?:[.,]\d+)?", str(text))
-    out = []
-    for n in nums:
-        n = n.replace(",", ".")
-        if re.fullmatch(r"\d+\.0+", n):
-            n = n.split(".", 1)[0]
-        out.append(n)
-    return out
-
-
-def _norm_tarak_generic(val) -> str:
-    """Dinamik/Running fark etmez: 'a/b/c' (ilk 3 sayı) şeklinde normalize anahtar."""
-    if val is None or (isinstance(val, float) and pd.isna(val)):
-        return ""
-    parts = _extract_nums_keep_decimal(str(val))
-    if not parts:
-        return str(val).strip()
-    return "/".join(parts[:3])
-
-
-def _detect_94_row(row):
-    """Running satırında 94 / 'Sipariş Yok' tespiti (kolon adı bağımsız)."""
-    for c in row.index:
-        u = str(row.get(c, "")).strip().upper()
-        if "SİPARİŞ YOK" in u or "SIPARIS YOK" in u or u == "94" or " 94" in u:
-            return True
-    return False
-
-
-def normalize_df_running(df_running: pd.DataFrame) -> pd.DataFrame:
-    """Running Orders df'sine kanonik kolonlar ekler/yeniler:
-       - _KalanMetreNorm  : float
-       - _TG_norm         : 'a/b/c' normalize tarak
-       - _OpenTezgahFlag  : bool (94 veya Durum='Bitti')
-    """
-    if df_running is None or df_running.empty:
-        return df_running
-
-    # 1) Kalan -> _KalanMetreNorm
-    kalan_cols = ["Kalan", "Kalan Mt", "Kalan Metre", "Kalan_Metre", "_KalanMetre"]
-    kal_col = next((c for c in kalan_cols if c in df_running.columns), None)
-    if kal_col:
-        df_running["_KalanMetreNorm"] = df_running[kal_col].apply(_parse_number_loose)
-    else:
-        df_running["_KalanMetreNorm"] = pd.NA
-
-    # 2) Tarak Grubu normalize -> _TG_norm
-    tg_col = next((c for c in ["Tarak Grubu", "Tarak", "TarakGrubu"] if c in df_running.columns), None)
-    if tg_col:
-        df_running["_TG_norm"] = df_running[tg_col].astype(str).apply(_norm_tarak_generic)
-    else:
-        df_running["_TG_norm"] = ""
-
-    # 3) 94 bayrağı -> _OpenTezgahFlag
-    df_running["_OpenTezgahFlag"] = df_running.apply(_detect_94_row, axis=1)
-
-    # 4) Durum normalizasyonu (Bitti kontrolü)
-    durum_col = next((c for c in ["Durum", "Durumu", "Durum Açıklaması", "Durum Tanım"] if c in df_running.columns), None)
-    if durum_col:
-        def _is_bitti(val: object) -> bool:
-            s = str(val or "").strip().upper()
-            return ("BİTTİ" in s) or ("BITTI" in s)
-        bitti_series = df_running[durum_col].apply(_is_bitti)
-    else:
-        bitti_series = pd.Series(False, index=df_running.index)
-
-    # 5) Açık kabul: 94 veya Durum=Bitti
-    df_running["_OpenTezgahFlag"] = df_running["_OpenTezgahFlag"].astype(bool) | bitti_series.astype(bool)
-
-    return df_running
-
-
 # ============================================================
 # **YENİ**: Tezgah listesi düzenleyici dialog (Arızalı/Bakımda & Boş Göster)
 # ============================================================
@@ -248,14 +139,15 @@ class LoomListEditor(QDialog):
         qv = str(self.settings.value(self.key, "") or "")
         q_tokens = re.findall(r"\d+", qv)
 
-        extra = []
+        # Kayıt, bu editörün okuduğu hale (taban) göre fark olarak yazılır
+        extra, self._baseline = [], None
         try:
             if self.key == "looms/blocked":
-                extra = storage.load_blocked_looms()
+                extra, self._baseline = storage.load_blocked_looms_for_edit()
             elif self.key == "looms/empty":
-                extra = storage.load_dummy_looms()
+                extra, self._baseline = storage.load_dummy_looms_for_edit()
         except Exception:
-            extra = []
+            extra, self._baseline = [], None
 
         # birleştir ve sıralı/benzersiz yap
         try:
@@ -272,16 +164,29 @@ class LoomListEditor(QDialog):
         # Normalize et: sadece rakam dizilerini al, araya virgül+boşluk koy
         tokens = re.findall(r"\d+", raw or "")
         val = ", ".join(tokens)
-        # 1) QSettings
-        self.settings.setValue(self.key, val)
-        # 2) storage SQL (merkezi kullanım için)
+        # 1) storage SQL (merkezi kullanım için)
+        ok = True
         try:
             if self.key == "looms/blocked":
-                storage.save_blocked_looms(tokens)
+                ok = storage.save_blocked_looms(tokens, self._baseline)
             elif self.key == "looms/empty":
-                storage.save_dummy_looms(tokens)
+                ok = storage.save_dummy_looms(tokens, self._baseline)
+        except storage.SaveConflict:
+            # Başka bir oturum arada kaydetmiş: güncel listeyi göster, kullanıcı tekrar kaydetsin
+            self._load_initial_text()
+            QMessageBox.warning(
+                self,
+                "Kayıt çakışması",
+                "Liste başka bir oturumda değiştirilmiş.\nGüncel liste yüklendi; değişikliklerinizi tekrar yapıp kaydediniz.",
+            )
+            return
         except Exception:
-            pass
+            ok = False
+        if not ok:
+            QMessageBox.warning(self, "Kaydedilemedi", "Liste veritabanına yazılamadı.\nBağlantıyı kontrol edip tekrar deneyiniz.")
+            return
+        # 2) QSettings
+        self.settings.setValue(self.key, val)
 
         QMessageBox.information(self, "Kaydedildi", f"Ayar güncellendi.\n({self.key} = {val})")
         self.accept()
@@ -306,9 +211,14 @@ class MainWindow(QMainWindow):
         self.df_dinamik_full = None
         self.df_running = None
 
-        # Kalıcı kurallar ve son güncelleme
-        self._note_rules: list[dict] = storage.load_rules()
-        self._last_update: datetime | None = storage.load_last_update()
+        # Kalıcı kurallar ve son güncelleme (açılış dalgasında SQL'den doldurulur)
+        self._note_rules: list[dict] = []
+        self._note_rules_base: storage.Baseline | None = None  # kuralların okunduğu hal (kayıt çakışma kontrolü)
+        self._last_update: datetime | None = None
+        # Açılış dalgasında okunan, henüz tüketilmemiş veriler
+        self._prefetched: dict[str, Any] = {}
+        # NOTLAR hesabı: son hesaplanan tabloda yalnız girdisi değişen satırları yeniden hesaplar
+        self._note_engine = NoteEngine(self._clean_label_value)
 
         tabs = QTabWidget()
         tabs.addTab(self.build_dugum_tab(), "DÜĞÜM TAKIM LİSTESİ")
@@ -334,12 +244,13 @@ class MainWindow(QMainWindow):
         self._did_click_load_running = False
         self._did_planlama = False
 
-        # Açılışta son snapshot'ları geri yükle (BUTON BAYRAKLARINI ETKİLEMEZ)
-        self._restore_last_state()
-
         # Başlangıçta kullanıcının yetkisine göre butonları ayarla
         self._apply_permissions()
 
+        # Açılış verilerini tek paralel dalgada oku; gelince son hali geri yükle
+        # (BUTON BAYRAKLARINI ETKİLEMEZ)
+        self._start_startup_fanout()
+
     # -------------------------
     # Yetki kontrol yardımcıları
     # -------------------------
@@ -598,42 +509,72 @@ class MainWindow(QMainWindow):
     def load_dinamik(self):
         if not require_permission(self, "read", "Dinamik raporu yüklemek için okuma yetkisi gerekiyor."):
             return
+        if self._is_loading():
+            return
         path, _ = QFileDialog.getOpenFileName(
             self, "Dinamik Rapor Seç", "", "Excel Files (*.xlsx *.xlsb);;All Files (*)"
         )
         if not path:
             return
-        try:
-            df = load_dinamik_any(path)
+
+        def parse(ctx):
+            ctx["df"] = load_dinamik_any(ctx["path"])
+
+        def normalize(ctx):
+            df = ctx["df"]
             if "Mamul Termin" in df.columns:
                 df = df.sort_values(by="Mamul Termin", ascending=True)
-            self.df_dinamik_full = df
-
-            # NOTLAR uygula
-            self._apply_notes_and_autonotes()
+            ctx["df"] = df
 
-            # Snapshot kaydet
-            storage.save_df_snapshot(self.df_dinamik_full, "dinamik")
+        def notes(ctx):
+            # NOTLAR uygula (girdiler aşağıda ana thread'de alındı; self'e dokunulmaz)
+            usta_map = ctx["usta_map"]
+            if usta_map is None:
+                try:
+                    usta_map = storage.load_usta_etiket_tezgah_map()
+                except Exception:
+                    usta_map = {}
+            ctx["df"] = self._compute_notes(ctx["df"], ctx["rules"], usta_map, ctx["running_map"])
+
+        def snapshot(ctx):
+            storage.save_df_snapshot(ctx["df"], "dinamik")
+
+        self._run_load_pipeline(
+            [
+                Stage("Dinamik rapor okunuyor…", parse),
+                Stage("Veri düzenleniyor…", normalize),
+                Stage("Notlar uygulanıyor…", notes),
+                Stage("Snapshot kaydediliyor…", snapshot, cancelable=False),
+            ],
+            {
+                "path": path,
+                # Not girdileri: kurallar, Running konumları ve açılışta okunmuş Usta haritası
+                "rules": list(self._note_rules or []),
+                "running_map": self._running_barkod_tezgah_map(),
+                "usta_map": self._prefetched.pop("usta_etiket_map", None),
+            },
+            on_done=self._on_dinamik_loaded,
+            error_text="Dinamik rapor yüklenemedi",
+        )
 
-            self._refresh_dugum_view()
-            self._refresh_kusbakisi()
+    def _on_dinamik_loaded(self, ctx: dict):
+        self.df_dinamik_full = ctx["df"]
 
-            # Usta Defteri kaynaklarını güncelle
-            self._update_usta_sources()
+        self._refresh_dugum_view()
+        self._refresh_kusbakisi()
 
-            src = str(df.get("_LeventSource", "")).strip()
-            msg = (
-                "Dinamik Rapor Yüklendi.\n\n"
-                "Şimdi Vardiya Online sekmesindeki “Running Orders” dosyasını yükleyin."
-            )
-            QMessageBox.information(self, "Bilgi", msg)
+        # Usta Defteri kaynaklarını güncelle
+        self._update_usta_sources()
 
-            # >>> GÜNCELLİK: butondan yüklendi bayrağı
-            self._did_click_load_dinamik = True
-            self._update_freshness_if_ready()
+        msg = (
+            "Dinamik Rapor Yüklendi.\n\n"
+            "Şimdi Vardiya Online sekmesindeki “Running Orders” dosyasını yükleyin."
+        )
+        QMessageBox.information(self, "Bilgi", msg)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Hata", f"Dinamik rapor yüklenemedi:\n{e}")
+        # >>> GÜNCELLİK: butondan yüklendi bayrağı
+        self._did_click_load_dinamik = True
+        self._update_freshness_if_ready()
 
         QTimer.singleShot(0, lambda: self._refit_filter_area(self.dugum_scroll, self.dugum_filter_bar))
 
@@ -641,6 +582,58 @@ class MainWindow(QMainWindow):
             self.team_flow.refresh_sources()
             self.team_flow.set_write_enabled(self.has_permission("write"))
 
+    # -------------------------
+    # ARKA PLAN YÜKLEME (parse -> normalize -> notes -> snapshot -> view)
+    # -------------------------
+    def _is_loading(self) -> bool:
+        return getattr(self, "_load_job", None) is not None
+
+    def _loading_overlay(self) -> LoadingOverlay:
+        if getattr(self, "_overlay", None) is None:
+            self._overlay = LoadingOverlay(self, resource_path("assets/acilis.png"))
+        return self._overlay
+
+    def _run_load_pipeline(self, stages: list[Stage], ctx: dict, on_done, error_text: str):
+        """
+        Ağır adımları QThreadPool'da çalıştırır; overlay ilerlemeyi gösterir ve iptal sunar.
+        Görünüm (view) adımı on_done ile ana thread'de kurulur.
+        """
+        job = LoadPipeline(stages, ctx)
+        self._load_job = job
+        overlay = self._loading_overlay()
+        try:
+            overlay.cancelRequested.disconnect()
+        except (RuntimeError, TypeError):
+            pass
+        overlay.cancelRequested.connect(job.cancel)
+        overlay.show_overlay(cancelable=True)
+
+        def _progress(percent: int, text: str, cancelable: bool):
+            overlay.set_progress(percent, text)
+            if not cancelable:
+                overlay.set_cancelable(False)
+
+        def _end():
+            self._load_job = None
+            overlay.hide_overlay()
+
+        def _done(result: dict):
+            _end()
+            try:
+                on_done(result)
+            except Exception as e:
+                QMessageBox.critical(self, "Hata", f"{error_text}:\n{e}")
+
+        def _failed(msg: str):
+            _end()
+            QMessageBox.critical(self, "Hata", f"{error_text}:\n{msg}")
+
+        job.signals.progress.connect(_progress)
+        job.signals.finished.connect(_done)
+        job.signals.failed.connect(_failed)
+        job.signals.cancelled.connect(_end)
+        job.start()
+
     def _refresh_dugum_view(
             self,
             group_filter: str | None = None,
@@ -853,7 +846,23 @@ class MainWindow(QMainWindow):
                 self._note_rules = rules
 
                 # Kalıcı kaydet (AppMeta.notes_rules)
-                storage.save_rules(self._note_rules)
+                try:
+                    saved = storage.save_rules(self._note_rules, self._note_rules_base)
+                except storage.SaveConflict:
+                    QMessageBox.warning(
+                        self,
+                        "Kayıt çakışması",
+                        "Not kuralları başka bir oturumda değiştirilmiş; güncel kurallar yüklendi.\n"
+                        "Değişikliklerinizi tekrar yapınız.",
+                    )
+                    self._note_rules, self._note_rules_base = storage.load_rules_for_edit()
+                else:
+                    if not saved:
+                        QMessageBox.warning(
+                            self,
+                            "Kaydedilemedi",
+                            "Not kuralları veritabanına yazılamadı; değişiklikler yalnız bu oturumda geçerli.",
+                        )
 
                 # Dinamik df üzerine notları yeniden uygula
                 self._apply_notes_and_autonotes()
@@ -867,82 +876,6 @@ class MainWindow(QMainWindow):
                 # Kuşbakışı yenile
                 self._refresh_kusbakisi()
 
-    def _append_note(self, old: str, add: str) -> str:
-        base = (old or "").strip()
-        add = (add or "").strip()
-        if not add:
-            return base
-        if not base:
-            return add
-        parts = [p.strip() for p in base.split(";") if p.strip()]
-        if add in parts:
-            return base
-        return base + "; " + add
-
-    def _apply_manual_rules(self, df: pd.DataFrame) -> pd.DataFrame:
-        if not self._note_rules:
-            return df
-        if "NOTLAR" not in df.columns:
-            df["NOTLAR"] = ""
-
-        for rule in self._note_rules:
-            col, val, text = rule.get("col"), rule.get("val"), rule.get("text")
-            if not col or col not in df.columns or text is None:
-                continue
-            mask = (df[col].astype(str) == str(val))
-            if mask.any():
-                df.loc[mask, "NOTLAR"] = df.loc[mask, "NOTLAR"].astype(str).apply(
-                    lambda x, t=text: self._append_note(x, t)
-                )
-        return df
-
-    def _apply_auto_atki_notes(self, df: pd.DataFrame) -> pd.DataFrame:
-        need1_col = "Atkı İhtiyaç Miktar 1"
-        need2_col = "Atkı İhtiyaç Miktar 2"
-        stock1_col = "(Atkı-1 İşletme Depoları + Atkı-1 İşletme Diğer Depoları)"
-        stock2_col = "(Atkı-2 İşletme Depoları + Atkı-2 İşletme Diğer Depoları)"
-        key_col = "Üretim Sipariş No"
-
-        for c in [need1_col, need2_col, stock1_col, stock2_col, key_col]:
-            if c not in df.columns:
-                return df
-
-        if "NOTLAR" not in df.columns:
-            df["NOTLAR"] = ""
-
-        dwork = df.copy()
-        dwork[need1_col] = pd.to_numeric(dwork[need1_col], errors="coerce").fillna(0.0)
-        dwork[need2_col] = pd.to_numeric(dwork[need2_col], errors="coerce").fillna(0.0)
-        dwork[stock1_col] = pd.to_numeric(dwork[stock1_col], errors="coerce").fillna(0.0)
-        dwork[stock2_col] = pd.to_numeric(dwork[stock2_col], errors="coerce").fillna(0.0)
-
-        grp = dwork.groupby(key_col, dropna=False)
-        need1_sum = grp[need1_col].sum()
-        need2_sum = grp[need2_col].sum()
-        stock1_max = grp[stock1_col].max()
-        stock2_max = grp[stock2_col].max()
-
-        lack1 = set(need1_sum[need1_sum > stock1_max].index)
-        lack2 = set(need2_sum[need2_sum > stock2_max].index)
-
-        def decide_note(siparis: str) -> str:
-            msgs = []
-            if siparis in lack1:
-                msgs.append("ATKI1 EKSİK")
-            if siparis in lack2:
-                msgs.append("ATKI2 EKSİK")
-            return "; ".join(msgs)
-
-        for siparis in set(lack1 | lack2):
-            m = (df[key_col].astype(str) == str(siparis))
-            note_text = decide_note(siparis)
-            if note_text:
-                df.loc[m, "NOTLAR"] = df.loc[m, "NOTLAR"].astype(str).apply(
-                    lambda x, t=note_text: self._append_note(x, t)
-                )
-
-        return df
-
     def _clean_label_value(self, val: Any) -> str:
         if val is None:
             return ""
@@ -996,79 +929,43 @@ class MainWindow(QMainWindow):
                 mapping[label] = loom
         return mapping
 
-    def _apply_etiket_location_notes(self, df: pd.DataFrame) -> pd.DataFrame:
-        etiket_col = next((c for c in ["Levent Etiket FA", "EtiketFA", "Etiket No"] if c in df.columns), None)
-        if etiket_col is None:
-            return df
-
-        if "NOTLAR" not in df.columns:
-            df["NOTLAR"] = ""
-
-        try:
-            usta_map = storage.load_usta_etiket_tezgah_map()
-        except Exception:
-            usta_map = {}
-        running_map = self._running_barkod_tezgah_map()
-
-        if not usta_map and not running_map:
-            return df
-
-        def _find_machine(label: Any) -> str:
-            key = self._clean_label_value(label)
-            if not key:
-                return ""
-            if key in usta_map:
-                return self._clean_label_value(usta_map.get(key))
-            if key in running_map:
-                return self._clean_label_value(running_map.get(key))
-            return ""
-
-        for idx, label in df[etiket_col].items():
-            loom = _find_machine(label)
-            if not loom:
-                continue
-            note_text = f"{loom} NOLU TEZGAHA ALINDI"
-            df.at[idx, "NOTLAR"] = self._append_note(df.at[idx, "NOTLAR"], note_text)
-
-        return df
-
     def _apply_notes_and_autonotes(self):
         """
-        NOTLAR sütununu her seferinde TEMİZDEN hesapla:
+        NOTLAR sütununu güncelle (bkz. app/note_engine.py):
 
         - İlk çalıştığında mevcut NOTLAR değerini _NOTLAR_BASE kolonuna kopyalar.
-        - Sonraki her çağrıda NOTLAR'ı _NOTLAR_BASE'den geri yükler.
-        - Üzerine otomatik ATKI notlarını ve manuel kural notlarını uygular.
+        - NOTLAR = _NOTLAR_BASE + otomatik ATKI notları + etiket konumu + manuel kural notları.
+        - Aynı tabloda yalnız girdisi değişen satırlar yeniden hesaplanır (ör. tek atama -> tek satır).
         """
         if self.df_dinamik_full is None or self.df_dinamik_full.empty:
             return
+        self.df_dinamik_full = self._compute_notes(self.df_dinamik_full)
 
-        df = self.df_dinamik_full
-
-        # NOTLAR yoksa oluştur
-        if "NOTLAR" not in df.columns:
-            df["NOTLAR"] = ""
-
-        # Orijinal NOTLAR'ı bir kere yedekle
-        if "_NOTLAR_BASE" not in df.columns:
-            df["_NOTLAR_BASE"] = df["NOTLAR"].astype(str)
-        else:
-            # Emin olmak için string’e çevir
-            df["_NOTLAR_BASE"] = df["_NOTLAR_BASE"].astype(str)
-
-        # Her seferinde temiz bir başlangıç:
-        df["NOTLAR"] = df["_NOTLAR_BASE"]
-
-        # 1) Otomatik ATKI eksikliği notları
-        df = self._apply_auto_atki_notes(df)
-
-        # 2) Etiket -> Tezgah bilgisi (Usta Defteri + Running)
-        df = self._apply_etiket_location_notes(df)
+    def _compute_notes(
+        self,
+        df: pd.DataFrame,
+        rules: Optional[list[dict]] = None,
+        usta_map: Optional[dict[str, str]] = None,
+        running_map: Optional[dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """
+        NOTLAR hesabının kendisi; self.df_dinamik_full'a dokunmaz. Arka plan yüklemesinde girdiler
+        (kurallar, Usta / Running haritaları) ana thread'de alınıp verilir; verilmeyenler buradan okunur.
+        """
+        if df is None or df.empty:
+            return df
 
-        # 3) Senin tanımladığın manuel kurallar
-        df = self._apply_manual_rules(df)
+        if usta_map is None:
+            try:
+                usta_map = self._take_prefetched("usta_etiket_map", storage.load_usta_etiket_tezgah_map)
+            except Exception:
+                usta_map = {}
+        if running_map is None:
+            running_map = self._running_barkod_tezgah_map()
+        if rules is None:
+            rules = self._note_rules
 
-        self.df_dinamik_full = df
+        return self._note_engine.update(df, rules, usta_map, running_map)
 
     # -------------------------
     # RUNNING ORDERS SEKME
@@ -1259,17 +1156,20 @@ class MainWindow(QMainWindow):
     def load_running(self):
         if not require_permission(self, "read", "Running Orders dosyasını yüklemek için okuma yetkisi gerekiyor."):
             return
+        if self._is_loading():
+            return
         path, _ = QFileDialog.getOpenFileName(
             self, "Running Orders Seç", "", "Excel Files (*.xlsx);;All Files (*)"
         )
         if not path:
             return
-        try:
-            df = load_running_orders(path)
+
+        def parse(ctx):
+            ctx["df"] = load_running_orders(ctx["path"])
+
+        def normalize(ctx):
             # *** TEK NOKTADAN DÜZELTME ***
-            df = normalize_df_running(df)
-            df = enrich_running_with_loom_cut(df)
-            df = enrich_running_with_selvedge(df, getattr(self, "df_dinamik_full", None))
+            df = normalize_df_running(ctx["df"])
 
             # Running: Tip No'yu KökTip formatına çevir (R önekiyle)
             tip_col = next((c for c in ["Tip No", "Tip Kodu", "Tip", "Mamul Tipi"] if c in df.columns), None)
@@ -1278,56 +1178,74 @@ class MainWindow(QMainWindow):
                     lambda x: x if (x.strip() == "" or x.strip().upper().startswith("R")) else f"R{x.strip()}"
                 )
 
-            # (C) Süs Kenar ve ISAVER/ROTOCUT sütunlarını besle
-            df = enrich_running_with_loom_cut(df)
-            df = enrich_running_with_selvedge(df, getattr(self, "df_dinamik_full", None))
+            # (C) ISAVER/ROTOCUT sütunu; Süs Kenar kütüphanesi burada (arka planda) okunur
+            ctx["df"] = enrich_running_with_loom_cut(df)
+            ctx["selvedge_lib"] = storage.load_type_selvedge_map()
 
+        def selvedge(ctx):
+            # Revize sorusu (QMessageBox) sorabileceği için ana thread'de çalışır
+            df = enrich_running_with_selvedge(
+                ctx["df"], getattr(self, "df_dinamik_full", None), ctx.get("selvedge_lib")
+            )
             if "Tezgah No" in df.columns:
                 df = df.sort_values(by="Tezgah No", ascending=True)
+            ctx["df"] = df
+
+        def snapshot(ctx):
+            storage.save_df_snapshot(ctx["df"], "running")
+
+        self._run_load_pipeline(
+            [
+                Stage("Running Orders okunuyor…", parse),
+                Stage("Veri düzenleniyor…", normalize),
+                Stage("Süs Kenar eşleştiriliyor…", selvedge, main_thread=True),
+                Stage("Snapshot kaydediliyor…", snapshot, cancelable=False),
+            ],
+            {"path": path},
+            on_done=self._on_running_loaded,
+            error_text="Running orders yüklenemedi",
+        )
 
-            self.df_running = df
-            self.model_run.set_df(df.copy())
-            self._rebuild_run_filters()
-
-            # Snapshot kaydet
-            storage.save_df_snapshot(self.df_running, "running")
+    def _on_running_loaded(self, ctx: dict):
+        df = ctx["df"]
+        self.df_running = df
+        self.model_run.set_df(df.copy())
+        self._rebuild_run_filters()
 
-            # Kuşbakışı tazele
-            self._refresh_kusbakisi()
+        # Kuşbakışı tazele
+        self._refresh_kusbakisi()
 
-            # Usta Defteri tezgah listesini güncelle
-            self._update_usta_sources()
+        # Usta Defteri tezgah listesini güncelle
+        self._update_usta_sources()
 
-            QTimer.singleShot(
-                0,
-                lambda: self._autosize_columns(
-                    self.tbl_run,
-                    getattr(self, "_run_filter_cells", []),
-                    self.run_filter_bar,
-                    self.run_scroll
-                )
-            )
-            QTimer.singleShot(0, self._rebuild_run_filters)
-            QTimer.singleShot(
-                0,
-                lambda: self._sync_filter_widths(self.tbl_run, getattr(self, "_run_filter_cells", []))
+        QTimer.singleShot(
+            0,
+            lambda: self._autosize_columns(
+                self.tbl_run,
+                getattr(self, "_run_filter_cells", []),
+                self.run_filter_bar,
+                self.run_scroll
             )
-            QTimer.singleShot(0, lambda: self._sync_filter_scroll(self.tbl_run, self.run_scroll))
-            QTimer.singleShot(0, lambda: self._refit_filter_area(self.run_scroll, self.run_filter_bar))
+        )
+        QTimer.singleShot(0, self._rebuild_run_filters)
+        QTimer.singleShot(
+            0,
+            lambda: self._sync_filter_widths(self.tbl_run, getattr(self, "_run_filter_cells", []))
+        )
+        QTimer.singleShot(0, lambda: self._sync_filter_scroll(self.tbl_run, self.run_scroll))
+        QTimer.singleShot(0, lambda: self._refit_filter_area(self.run_scroll, self.run_filter_bar))
 
-            # >>> GÜNCELLİK: butondan yüklendi bayrağı
-            self._did_click_load_running = True
-            QMessageBox.information(
-                self,
-                "Running Hazır",
-                "Running Orders Yüklendi.\n\n"
-                "Şimdi “DÜĞÜM TAKIM LİSTESİ” sekmesinde Planlama yapabilirsiniz."
-            )
+        # >>> GÜNCELLİK: butondan yüklendi bayrağı
+        self._did_click_load_running = True
+        QMessageBox.information(
+            self,
+            "Running Hazır",
+            "Running Orders Yüklendi.\n\n"
+            "Şimdi “DÜĞÜM TAKIM LİSTESİ” sekmesinde Planlama yapabilirsiniz."
+        )
 
-            self._update_freshness_if_ready()
+        self._update_freshness_if_ready()
 
-        except Exception as e:
-            QMessageBox.critical(self, "Hata", f"Running orders yüklenemedi:\n{e}")
         if hasattr(self, "team_flow"):
             self.team_flow.refresh_sources()
             self.team_flow.set_write_enabled(self.has_permission("write"))
@@ -1545,26 +1463,7 @@ class MainWindow(QMainWindow):
         pass
 
     def _current_shift_bounds(self, ref: datetime | None = None) -> tuple[datetime, datetime]:
-        now = ref or datetime.now(self.TZ)
-        d = now.date()
-
-        s1 = datetime(d.year, d.month, d.day, 7, 0, tzinfo=self.TZ)
-        s2 = datetime(d.year, d.month, d.day, 15, 0, tzinfo=self.TZ)
-        s3 = datetime(d.year, d.month, d.day, 23, 0, tzinfo=self.TZ)
-
-        if s1 <= now < s2:
-            return (s1, s2)
-        elif s2 <= now < s3:
-            return (s2, s3)
-        else:
-            if now >= s3:
-                e3 = datetime(d.year, d.month, d.day, 7, 0, tzinfo=self.TZ) + timedelta(days=1)
-                return (s3, e3)
-            else:
-                prev = now - timedelta(days=1)
-                s_prev = datetime(prev.year, prev.month, prev.day, 23, 0, tzinfo=self.TZ)
-                e_prev = datetime(d.year, d.month, d.day, 7, 0, tzinfo=self.TZ)
-                return (s_prev, e_prev)
+        return shift_bounds(ref, self.TZ)
 
     def _is_fresh(self, last: datetime | None) -> bool:
         if last is None:
@@ -1605,16 +1504,69 @@ class MainWindow(QMainWindow):
     # -------------------------
     # AÇILIŞTA SON HALİ GERİ YÜKLE
     # -------------------------
+    def _start_startup_fanout(self):
+        """
+        Açılışta gereken bağımsız SQL okumalarını sırayla değil aynı anda gönderir.
+        Veri gelene kadar pencere pasif kalır (boş kural listesinin kaydedilmesini önler).
+        """
+        calls = {
+            "rules": storage.load_rules_for_edit,
+            "last_update": storage.load_last_update,
+            "snap_dinamik": lambda: storage.load_df_snapshot("dinamik"),
+            "snap_running": lambda: storage.load_df_snapshot("running"),
+            "loom_cut_map": storage.load_loom_cut_map,
+            "type_selvedge_map": storage.load_type_selvedge_map,
+            "usta_etiket_map": storage.load_usta_etiket_tezgah_map,
+            "blocked_looms": storage.load_blocked_looms,
+            "dummy_looms": storage.load_dummy_looms,
+        }
+        if self.centralWidget() is not None:
+            self.centralWidget().setEnabled(False)
+        self._startup_fanout = SqlFanout(self)
+        self._startup_fanout.finished.connect(self._on_startup_data)
+        self._startup_fanout.start(calls)
+
+    def _on_startup_data(self, results: dict, errors: dict):
+        # Hata veren okumalar ilk kullanımda normal (senkron) yoldan tekrar denenir
+        self._prefetched = dict(results or {})
+        try:
+            rules = self._prefetched.pop("rules", None)
+            self._note_rules, self._note_rules_base = rules if rules is not None else storage.load_rules_for_edit()
+            if "last_update" in self._prefetched:
+                self._last_update = self._prefetched.pop("last_update")
+            else:
+                self._last_update = storage.load_last_update()
+        except Exception:
+            pass
+
+        if hasattr(self, "kusbakisi") and self.kusbakisi is not None \
+                and "blocked_looms" in self._prefetched and "dummy_looms" in self._prefetched:
+            self.kusbakisi.preload_restrictions(
+                self._prefetched.pop("blocked_looms"), self._prefetched.pop("dummy_looms")
+            )
+
+        self._restore_last_state()
+        # Kullanılmayan (ör. boş snapshot nedeniyle) veriler bayatlamasın
+        self._prefetched.clear()
+        if self.centralWidget() is not None:
+            self.centralWidget().setEnabled(True)
+
+    def _take_prefetched(self, key: str, loader):
+        """Açılış dalgasında okunmuş değeri bir kez verir; yoksa loader ile okur."""
+        if key in self._prefetched:
+            return self._prefetched.pop(key)
+        return loader()
+
     def _restore_last_state(self):
         """Uygulama açıldığında snapshot'lardan DF'leri yükle, görünümü kur, filtreleri boş başlat."""
         try:
-            ddf = storage.load_df_snapshot("dinamik")
+            ddf = self._take_prefetched("snap_dinamik", lambda: storage.load_df_snapshot("dinamik"))
             if ddf is not None and not ddf.empty:
                 self.df_dinamik_full = ddf
                 self._apply_notes_and_autonotes()
                 self._refresh_dugum_view(rebuild_filters=True)
 
-            rdf = storage.load_df_snapshot("running")
+            rdf = self._take_prefetched("snap_running", lambda: storage.load_df_snapshot("running"))
             if rdf is not None and not rdf.empty:
                 # *** TEK NOKTADAN DÜZELTME (snapshot için de uygula) ***
                 rdf = normalize_df_running(rdf)
@@ -1626,8 +1578,12 @@ class MainWindow(QMainWindow):
                         else f"R{x.strip()}"
                     )
 
-                rdf = enrich_running_with_loom_cut(rdf)
-                rdf = enrich_running_with_selvedge(rdf, getattr(self, "df_dinamik_full", None))
+                rdf = enrich_running_with_loom_cut(rdf, self._prefetched.pop("loom_cut_map", None))
+                rdf = enrich_running_with_selvedge(
+                    rdf,
+                    getattr(self, "df_dinamik_full", None),
+                    self._prefetched.pop("type_selvedge_map", None),
+                )
 
                 self.df_running = rdf
                 self.model_run.set_df(self.df_running.copy())
@@ -1649,6 +1605,20 @@ class MainWindow(QMainWindow):
                 QTimer.singleShot(0, lambda: self._sync_filter_scroll(self.tbl_run, self.run_scroll))
                 QTimer.singleShot(0, lambda: self._refit_filter_area(self.run_scroll, self.run_filter_bar))
 
+            # Kayıt var ama bu kurulumda çözülemedi: sessizce boş açılmasın
+            failed = []
+            for name in ("dinamik", "running"):
+                err = storage.snapshot_decode_error(name)
+                if err:
+                    failed.append(f"{name}: {err}")
+            if failed:
+                QMessageBox.warning(
+                    self,
+                    "Son durum yüklenemedi",
+                    "Kayıtlı snapshot bu kurulumda açılamadı; raporları yeniden yükleyin.\n\n"
+                    + "\n".join(failed),
+                )
+
             # Usta Defteri kaynakları (snapshot sonrası)
             self._update_usta_sources()
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import re
-from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol, Sequence, Tuple
 from app.db_name import DB_NAME
 
 
@@ -59,12 +59,20 @@ class CursorLike(Protocol):
     def execute(self, query: str, params: Optional[Sequence[Any]] = None) -> "CursorLike":
         ...
 
+    def execute_stmt(
+        self, stmt_id: str, params: Optional[Sequence[Any]] = None, query: str = "", database: str = ""
+    ) -> "CursorLike":
+        ...
+
     def fetchone(self) -> Optional[Iterable[Any]]:
         ...
 
     def fetchall(self) -> list[Iterable[Any]]:
         ...
 
+    def __iter__(self) -> Iterator[Iterable[Any]]:
+        ...
+
 
 class ConnectionLike(Protocol):
     def cursor(self) -> CursorLike:
@@ -280,7 +288,10 @@ def _extract_features_from_tip_features(tip_features: Optional[Dict[str, Optiona
 
 def _fetch_itema_ayar_by_tip(conn: ConnectionLike, tip: str) -> Optional[Dict[str, Optional[str]]]:
     cur = conn.cursor()
-    cur.execute(f"SELECT TOP 1 * FROM [{DB_NAME}].[dbo].[ItemaAyar] WHERE [tip] = ?", [tip])
+    cur.execute_stmt(
+        "itema_ayar.by_tip", [tip],
+        f"SELECT TOP 1 * FROM [{DB_NAME}].[dbo].[ItemaAyar] WHERE [tip] = ?", DB_NAME,
+    )
     row = cur.fetchone()
     if not row:
         return None
@@ -345,16 +356,15 @@ def _fetch_makine_ayar_match(
     cur = conn.cursor()
 
     # Sadece aynı örgü tipinden adayları çek
-    cur.execute(
-        f"SELECT * FROM [{DB_NAME}].[dbo].[Makine_Ayar_Tablosu] WHERE [orgu_tipi] = ?",
-        [orgu_tipi],
+    cur.execute_stmt(
+        "makine_ayar.by_orgu", [orgu_tipi],
+        f"SELECT * FROM [{DB_NAME}].[dbo].[Makine_Ayar_Tablosu] WHERE [orgu_tipi] = ?", DB_NAME,
     )
-    raw = cur.fetchall()
-    if not raw:
+    # Satırları okundukça dict'e çevir (akışlı bağlantıda ham liste ayrıca tutulmaz)
+    all_rows = [_row_to_dict(cur, r) for r in cur]
+    if not all_rows:
         return None
 
-    all_rows = [_row_to_dict(cur, r) for r in raw]
-
     # ------------------ 1) TAM EŞLEŞME ------------------
     matches: List[Dict[str, Optional[str]]] = []
     for r in all_rows:
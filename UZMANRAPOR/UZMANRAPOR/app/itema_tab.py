@@ -512,7 +512,7 @@ class ItemaAyarTab(QWidget):
             return
 
         try:
-            conn = get_sql_connection()
+            conn = get_sql_connection(stream=True)
         except Exception as e:
             QMessageBox.critical(self, "Bağlantı Hatası", f"SQL sunucusuna bağlanılamadı:\n\n{e}")
             return
@@ -3,7 +3,6 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional, Dict, Tuple, List
 import re, hashlib, colorsys
-from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import pandas as pd
 from PySide6.QtCore import Qt, QSize
@@ -14,6 +13,7 @@ from PySide6.QtWidgets import (
 )
 
 from app import storage  # Usta Defteri sayımları + kısıt listeleri
+from app.shifts import yesterday_shift_windows
 from app.site_config import get_site, get_categories, loom_in_category
 from app.layout_loader import load_layout_for_site
 
@@ -170,26 +170,12 @@ def _loom_digits(val: object) -> str:
 #  DÜNÜN TOPLAM SAYIMI (3 vardiya toplamı)
 # -------------------------------------------------------------
 
-def _yesterday_shift_windows(ref: datetime | None = None):
-    """Dünün üç vardiya penceresi (07-15, 15-23, 23-ertesi 07)."""
-    now = ref or datetime.now(IST)
-    y  = (now - timedelta(days=1)).date()
-    s1 = datetime(y.year, y.month, y.day, 7, 0, tzinfo=IST)
-    s2 = datetime(y.year, y.month, y.day, 15, 0, tzinfo=IST)
-    s3 = datetime(y.year, y.month, y.day, 23, 0, tzinfo=IST)
-    e1 = s2
-    e2 = s3
-    e3 = datetime(y.year, y.month, y.day, 7, 0, tzinfo=IST) + timedelta(days=1)
-    return [(s1, e1), (s2, e2), (s3, e3)]
-
 def _compute_yesterday_totals() -> tuple[int, int, str]:
-    """Dünün üç vardiyasını toplayıp (DÜĞÜM, TAKIM, tarih_str) döndürür."""
-    wins = _yesterday_shift_windows()
-    total_dugum = 0
-    total_takim = 0
-    for (s,e) in wins:
-        total_dugum += storage.count_usta_between(s, e, what="DÜĞÜM", direction="ALINDI")
-        total_takim += storage.count_usta_between(s, e, what="TAKIM",  direction="ALINDI")
+    """Dünün üç vardiyasını toplayıp (DÜĞÜM, TAKIM, tarih_str) döndürür (tek sorgu)."""
+    wins = yesterday_shift_windows(tz=IST)
+    counts = storage.count_usta_matrix(wins, ["DÜĞÜM", "TAKIM"])
+    total_dugum = sum(counts.get((i, "DÜĞÜM"), 0) for i in range(len(wins)))
+    total_takim = sum(counts.get((i, "TAKIM"), 0) for i in range(len(wins)))
     date_str = wins[0][0].strftime("%d.%m.%Y")
     return total_dugum, total_takim, date_str
 
@@ -387,6 +373,8 @@ class KusbakisiWidget(QWidget):
         # Kısıt listeleri (Arızalı/Bakımda & Boş Gösterilecek)
         self._blocked: set[str] = set()
         self._dummy: set[str] = set()
+        # Açılışta paralel okunan listeler (bir sonraki _reload_restrictions'ta kullanılır)
+        self._preloaded_restrictions: tuple[set[str], set[str]] | None = None
 
         # Sinyaller
         self.cmb_cat.currentTextChanged.connect(self._rebuild_all)
@@ -394,7 +382,14 @@ class KusbakisiWidget(QWidget):
         self.btn_all_colors.clicked.connect(self._clear_selection)
 
     # --- Kısıt listelerini depodan oku
+    def preload_restrictions(self, blocked, dummy) -> None:
+        self._preloaded_restrictions = (set(blocked or []), set(dummy or []))
+
     def _reload_restrictions(self):
+        if self._preloaded_restrictions is not None:
+            self._blocked, self._dummy = self._preloaded_restrictions
+            self._preloaded_restrictions = None
+            return
         try:
             self._blocked = set(storage.load_blocked_looms() or [])
         except Exception:
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Sequence
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal, Slot
+
+
+class LoadCancelled(Exception):
+    """Kullanıcı yüklemeyi iptal etti."""
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise LoadCancelled()
+
+
+@dataclass
+class Stage:
+    name: str                          # overlay'de gösterilen adım metni
+    fn: Callable[[dict[str, Any]], None]  # ctx sözlüğünü okur / günceller
+    main_thread: bool = False          # GUI gerektiren adım (ör. QMessageBox) ana thread'de çalışır
+    cancelable: bool = True            # False: bu adım başladıktan sonra iptal edilemez (ör. snapshot yazımı)
+
+
+class _Signals(QObject):
+    progress = Signal(int, str, bool)  # (yüzde, adım, iptal edilebilir mi)
+    finished = Signal(object)          # ctx
+    failed = Signal(str)
+    cancelled = Signal()
+    _call_main = Signal(object)
+
+    def __init__(self) -> None:
+        super().__init__()
+        # Bu nesne ana thread'de oluşturulur; kuyruklu bağlantı işi GUI thread'inde çalıştırır
+        self._call_main.connect(self._run_main, Qt.ConnectionType.QueuedConnection)
+
+    @Slot(object)
+    def _run_main(self, job: Callable[[], None]) -> None:
+        job()
+
+
+class LoadPipeline(QRunnable):
+    """
+    Aşamalı yükleme işi (ör. parse -> normalize -> notes -> snapshot) QThreadPool'da çalışır.
+    Her aşama ortak bir ctx sözlüğü üzerinde çalışır; sonuç ``finished(ctx)`` ile ana thread'e
+    verilir, görünüm orada kurulur. İptal aşama aralarında kontrol edilir.
+
+        job = LoadPipeline([Stage("Dosya okunuyor", parse), ...], {"path": path})
+        job.signals.finished.connect(self._on_loaded)
+        job.start()
+    """
+
+    def __init__(self, stages: Sequence[Stage], ctx: dict[str, Any] | None = None) -> None:
+        super().__init__()
+        # Referansı çağıran tutar (self._load_job); Qt silmesin
+        self.setAutoDelete(False)
+        self.stages = list(stages)
+        self.ctx: dict[str, Any] = ctx if ctx is not None else {}
+        self.token = CancelToken()
+        self.ctx["cancel"] = self.token
+        self.signals = _Signals()
+
+    def start(self, pool: QThreadPool | None = None) -> None:
+        (pool or QThreadPool.globalInstance()).start(self)
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    def _run_on_main(self, stage: Stage) -> None:
+        done = threading.Event()
+        box: dict[str, BaseException] = {}
+
+        def job() -> None:
+            try:
+                stage.fn(self.ctx)
+            except BaseException as exc:  # hatayı worker'a taşı
+                box["error"] = exc
+            finally:
+                done.set()
+
+        self.signals._call_main.emit(job)
+        done.wait()
+        if "error" in box:
+            raise box["error"]
+
+    def run(self) -> None:
+        total = max(1, len(self.stages))
+        committed = False
+        try:
+            for i, stage in enumerate(self.stages):
+                if not committed:
+                    self.token.check()
+                committed = committed or not stage.cancelable
+                self.signals.progress.emit(int(i * 100 / total), stage.name, not committed)
+                if stage.main_thread:
+                    self._run_on_main(stage)
+                else:
+                    stage.fn(self.ctx)
+            self.signals.progress.emit(100, "", False)
+            self.signals.finished.emit(self.ctx)
+        except LoadCancelled:
+            self.signals.cancelled.emit()
+        except Exception as exc:
+            self.signals.failed.emit(str(exc))
@@ -2,17 +2,20 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from PySide6.QtCore import Qt, QSize, QEvent, QTimer
+from PySide6.QtCore import Qt, QSize, QEvent, QTimer, Signal
 from PySide6.QtGui import QPixmap
-from PySide6.QtWidgets import QWidget, QLabel, QProgressBar, QVBoxLayout
+from PySide6.QtWidgets import QWidget, QLabel, QProgressBar, QVBoxLayout, QHBoxLayout, QPushButton
 
 
 class LoadingOverlay(QWidget):
     """
     MainWindow üzerinde tam kaplama (overlay).
     assets/acilis.png'yi pencere boyutuna sığdırır, altta indeterminate bar gösterir.
+    set_progress() ile yüzde + adım metni, show_overlay(cancelable=True) ile "İptal" butonu gösterilir.
     """
 
+    cancelRequested = Signal()
+
     def __init__(self, parent: QWidget, image_path: Path) -> None:
         super().__init__(parent)
         self._image_path = image_path
@@ -40,11 +43,25 @@ class LoadingOverlay(QWidget):
             }
         """)
 
+        self._status = QLabel(self)
+        self._status.setStyleSheet("background: transparent; color: white; font-weight: 600;")
+        self._status.hide()
+
+        self._btn_cancel = QPushButton("İptal", self)
+        self._btn_cancel.setCursor(Qt.CursorShape.PointingHandCursor)
+        self._btn_cancel.clicked.connect(self._on_cancel_clicked)
+        self._btn_cancel.hide()
+
+        status_row = QHBoxLayout()
+        status_row.addWidget(self._status, stretch=1)
+        status_row.addWidget(self._btn_cancel, stretch=0)
+
         lay = QVBoxLayout(self)
         lay.setContentsMargins(24, 24, 24, 24)
         lay.setSpacing(16)
         lay.addWidget(self._img, stretch=1)
         lay.addWidget(self._bar, stretch=0)
+        lay.addLayout(status_row)
 
         self.hide()
         parent.installEventFilter(self)
@@ -52,7 +69,9 @@ class LoadingOverlay(QWidget):
         # İlk show’dan sonra bir tur daha güncelle (layout otursun diye)
         QTimer.singleShot(0, self._update_pixmap)
 
-    def show_overlay(self) -> None:
+    def show_overlay(self, cancelable: bool = False) -> None:
+        self.set_progress(None)
+        self.set_cancelable(cancelable)
         self.setGeometry(self.parentWidget().rect())
         self.raise_()
         self.show()
@@ -61,6 +80,26 @@ class LoadingOverlay(QWidget):
     def hide_overlay(self) -> None:
         self.hide()
 
+    def set_progress(self, percent: int | None, text: str = "") -> None:
+        """percent=None -> hareketli (indeterminate) bar."""
+        if percent is None:
+            self._bar.setRange(0, 0)
+        else:
+            self._bar.setRange(0, 100)
+            self._bar.setValue(max(0, min(100, int(percent))))
+        self._status.setText(text)
+        self._status.setVisible(bool(text))
+
+    def set_cancelable(self, cancelable: bool) -> None:
+        self._btn_cancel.setEnabled(True)
+        self._btn_cancel.setText("İptal")
+        self._btn_cancel.setVisible(cancelable)
+
+    def _on_cancel_clicked(self) -> None:
+        self._btn_cancel.setEnabled(False)
+        self._btn_cancel.setText("İptal ediliyor…")
+        self.cancelRequested.emit()
+
     def eventFilter(self, obj, event):
         if obj is self.parentWidget() and event.type() == QEvent.Type.Resize:
             self.setGeometry(self.parentWidget().rect())
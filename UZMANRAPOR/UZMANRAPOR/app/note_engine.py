@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app import note_rules
+
+# ============================================================
+#  NOTLAR MOTORU (bağımlılık takipli, artımlı)
+#   Satırın NOTLAR'ı = _NOTLAR_BASE + ATKI eksik notu (sipariş no) + etiket konumu (etiket)
+#                     + manuel kurallar (kural kolonu / değeri).
+#   Her güncellemede yalnız girdisi değişen satırlar yeniden hesaplanır:
+#     - satırın bağımlı kolonları (taban not, sipariş, atkı ihtiyaç / stok, etiket, kural kolonları)
+#     - siparişinin ATKI toplamı değişen satırlar
+#     - etiketinin tezgah konumu değişen satırlar (Usta Defteri / Running haritası)
+#     - eklenen / silinen / sırası değişen kuralların eşleştiği satırlar
+#   Farklı bir DataFrame (yeni yükleme) gelirse tamamı hesaplanır.
+# ============================================================
+
+NEED_COLS = ("Atkı İhtiyaç Miktar 1", "Atkı İhtiyaç Miktar 2")
+STOCK_COLS = (
+    "(Atkı-1 İşletme Depoları + Atkı-1 İşletme Diğer Depoları)",
+    "(Atkı-2 İşletme Depoları + Atkı-2 İşletme Diğer Depoları)",
+)
+ORDER_COL = "Üretim Sipariş No"
+ETIKET_COLS = ("Levent Etiket FA", "EtiketFA", "Etiket No")
+BASE_COL = "_NOTLAR_BASE"
+
+
+@dataclass
+class NoteEngineStats:
+    full: int = 0           # tüm satırların hesaplandığı güncellemeler
+    incremental: int = 0    # yalnız değişen satırların hesaplandığı güncellemeler
+    rows: int = 0           # yeniden hesaplanan toplam satır
+    last_rows: int = 0      # son güncellemede yeniden hesaplanan satır
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+def _changed(old: pd.Series, new: pd.Series) -> np.ndarray:
+    """
+    Konum bazında değişen satırlar (iki tarafta da boş olan değer değişmemiş sayılır).
+    Boş değerler (None / NaN / pd.NA / NaT) karşılaştırmaya girmez: pd.NA'nın != sonucu bool değildir.
+    """
+    a = old.to_numpy(dtype=object)
+    b = new.to_numpy(dtype=object)
+    a_na = pd.isna(a)
+    b_na = pd.isna(b)
+    changed = a_na != b_na
+    both = ~(a_na | b_na)
+    if both.any():
+        changed[both] = a[both] != b[both]
+    return changed
+
+
+class NoteEngine:
+    """
+    NOTLAR hesabı (thread-safe). ``update`` aynı DataFrame ile tekrar çağrıldığında son hesaptan
+    bu yana girdisi değişmeyen satırlara dokunmaz; tek atama O(1) satırı yeniden hesaplar.
+    ``clean_label`` etiket / tezgah değerlerini karşılaştırma için normalize eder.
+    """
+
+    def __init__(self, clean_label: Callable[[Any], str]) -> None:
+        self.clean_label = clean_label
+        self._lock = threading.Lock()
+        self._frame: Optional[weakref.ref] = None
+        self._index: Optional[pd.Index] = None
+        self._inputs: dict[str, pd.Series] = {}
+        self._notes: Optional[pd.Series] = None
+        self._order_str: Optional[np.ndarray] = None
+        self._atki: dict[str, str] = {}
+        self._locs: dict[str, str] = {}
+        self._maps: tuple[dict, dict] = ({}, {})
+        self._rule_key: tuple = ()
+        self.stats = NoteEngineStats()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._frame = None
+
+    # ------------------------------------------------------------------
+    def update(
+        self,
+        df: pd.DataFrame,
+        rules: list[dict],
+        usta_map: dict[str, str],
+        running_map: dict[str, str],
+    ) -> pd.DataFrame:
+        if df is None or df.empty:
+            return df
+        with self._lock:
+            return self._update(df, rules or [], dict(usta_map or {}), dict(running_map or {}))
+
+    def _update(self, df: pd.DataFrame, rules: list[dict], usta_map: dict, running_map: dict) -> pd.DataFrame:
+        if "NOTLAR" not in df.columns:
+            df["NOTLAR"] = ""
+
+        full = (
+            self._frame is None
+            or self._frame() is not df
+            or self._notes is None
+            or not df.index.equals(self._index)
+        )
+        if full:
+            # Orijinal NOTLAR'ı bir kere yedekle; her tam hesapta str'e çevir
+            if BASE_COL not in df.columns:
+                df[BASE_COL] = df["NOTLAR"].astype(str)
+            else:
+                df[BASE_COL] = df[BASE_COL].astype(str)
+
+        etiket_col = next((c for c in ETIKET_COLS if c in df.columns), None)
+        atki_cols = (*NEED_COLS, *STOCK_COLS, ORDER_COL)
+        has_atki = all(c in df.columns for c in atki_cols)
+        compiled = note_rules.compile_rules(rules)
+        rule_key = compiled.key
+        rule_cols = [c for c in compiled.index if c in df.columns]
+
+        dep_cols = [BASE_COL, *(atki_cols if has_atki else ()), *([etiket_col] if etiket_col else []), *rule_cols]
+        dep_cols = list(dict.fromkeys(dep_cols))
+        n = len(df)
+
+        if full:
+            dirty = np.ones(n, dtype=bool)
+            order_str = df[ORDER_COL].astype(str).to_numpy(dtype=object) if has_atki else None
+            self._atki = self._atki_notes(df, order_str, None) if has_atki else {}
+            self._locs = {}
+        else:
+            dirty = _changed(self._notes, df["NOTLAR"])  # NOTLAR'a dışarıdan yazılmışsa
+            atki_dirty = np.zeros(n, dtype=bool)
+            for col in dep_cols:
+                old = self._inputs.get(col)
+                if old is None:
+                    continue  # yeni kural kolonu: aşağıda kural farkıyla yakalanır
+                changed = _changed(old, df[col])
+                dirty |= changed
+                if has_atki and col in atki_cols:
+                    atki_dirty |= changed
+
+            order_str = self._order_str if has_atki else None
+            if has_atki:
+                if order_str is None:
+                    order_str = df[ORDER_COL].astype(str).to_numpy(dtype=object)
+                    atki_dirty[:] = True
+                orders = set(order_str[atki_dirty].tolist())
+                if atki_dirty.any():
+                    order_str = order_str.copy()
+                    pos = np.flatnonzero(atki_dirty)
+                    order_str[pos] = df[ORDER_COL].iloc[pos].astype(str).to_numpy(dtype=object)
+                    orders |= set(order_str[pos].tolist())
+                if orders:
+                    fresh = self._atki_notes(df, order_str, orders)
+                    for o in orders:
+                        if self._atki.get(o, "") != fresh.get(o, ""):
+                            dirty |= order_str == o
+                        if fresh.get(o):
+                            self._atki[o] = fresh[o]
+                        else:
+                            self._atki.pop(o, None)
+
+            if etiket_col and (usta_map, running_map) != self._maps:
+                # Konum haritası değişti: yalnız konumu değişen etiketlerin satırları
+                labels = df[etiket_col].to_numpy(dtype=object)
+                keys = [self.clean_label(v) for v in labels]
+                moved = {k for k in set(keys) if self._locate(k, usta_map, running_map) != self._locs.get(k, "")}
+                if moved:
+                    dirty |= np.fromiter((k in moved for k in keys), dtype=bool, count=n)
+
+            if rule_key != self._rule_key:
+                dirty |= self._rule_dirty(df, rule_key)
+
+        self._maps = (usta_map, running_map)
+        self._rule_key = rule_key
+        self._order_str = order_str
+
+        positions = np.flatnonzero(dirty)
+        if len(positions):
+            self._recompute(df, positions, etiket_col, order_str, compiled, rule_cols, usta_map, running_map)
+
+        self._frame = weakref.ref(df)
+        self._index = df.index
+        self._inputs = {c: df[c].copy() for c in dep_cols}
+        self._notes = df["NOTLAR"].copy()
+
+        self.stats.last_rows = len(positions)
+        self.stats.rows += len(positions)
+        if full:
+            self.stats.full += 1
+        else:
+            self.stats.incremental += 1
+        return df
+
+    # ------------------------------------------------------------------
+    def _atki_notes(self, df: pd.DataFrame, order_str: np.ndarray, orders: Optional[set]) -> dict[str, str]:
+        """Sipariş -> "ATKI1 EKSİK; ATKI2 EKSİK" (yalnız eksik olanlar); orders verilirse yalnız onlar."""
+        if orders is None:
+            rows = df
+            keys = order_str
+        else:
+            mask = np.fromiter((o in orders for o in order_str), dtype=bool, count=len(order_str))
+            rows = df[mask]
+            keys = order_str[mask]
+        if rows.empty:
+            return {}
+        work = pd.DataFrame(
+            {c: pd.to_numeric(rows[c], errors="coerce").fillna(0.0).to_numpy() for c in (*NEED_COLS, *STOCK_COLS)}
+        )
+        work["_key"] = keys
+        grp = work.groupby("_key", dropna=False)
+        lack1 = grp[NEED_COLS[0]].sum() > grp[STOCK_COLS[0]].max()
+        lack2 = grp[NEED_COLS[1]].sum() > grp[STOCK_COLS[1]].max()
+        out: dict[str, str] = {}
+        for key in lack1.index:
+            msgs = []
+            if lack1.get(key, False):
+                msgs.append("ATKI1 EKSİK")
+            if lack2.get(key, False):
+                msgs.append("ATKI2 EKSİK")
+            if msgs:
+                out[key] = "; ".join(msgs)
+        return out
+
+    def _locate(self, key: str, usta_map: dict, running_map: dict) -> str:
+        if not key:
+            return ""
+        if key in usta_map:
+            return self.clean_label(usta_map.get(key))
+        if key in running_map:
+            return self.clean_label(running_map.get(key))
+        return ""
+
+    def _rule_dirty(self, df: pd.DataFrame, rule_key: tuple) -> np.ndarray:
+        """Kural listesi değişti: eklenen / silinen kuralların (sıra değiştiyse tüm kuralların) satırları."""
+        old, new = self._rule_key, rule_key
+        changed = set(old) ^ set(new)
+        common_old = [r for r in old if r in set(new)]
+        common_new = [r for r in new if r in set(old)]
+        if common_old != common_new:
+            changed |= set(old) | set(new)
+        dirty = np.zeros(len(df), dtype=bool)
+        by_col: dict[str, set[str]] = {}
+        for col, val, _ in changed:
+            by_col.setdefault(col, set()).add(val)
+        for col, vals in by_col.items():
+            if col in df.columns:
+                dirty |= df[col].astype(str).isin(vals).to_numpy()
+        return dirty
+
+    def _recompute(
+        self,
+        df: pd.DataFrame,
+        positions: np.ndarray,
+        etiket_col: Optional[str],
+        order_str: Optional[np.ndarray],
+        compiled: note_rules.CompiledRules,
+        rule_cols: list[str],
+        usta_map: dict,
+        running_map: dict,
+    ) -> None:
+        notes = df[BASE_COL].iloc[positions].astype(str).tolist()
+
+        # 1) Otomatik ATKI eksikliği notları
+        if order_str is not None and self._atki:
+            for i, order in enumerate(order_str[positions].tolist()):
+                add = self._atki.get(order)
+                if add:
+                    notes[i] = note_rules.append_note(notes[i], add)
+
+        # 2) Etiket -> Tezgah bilgisi (Usta Defteri + Running); harita boşken de konum kaydı tutulur
+        if etiket_col:
+            for i, label in enumerate(df[etiket_col].iloc[positions].tolist()):
+                key = self.clean_label(label)
+                loom = self._locate(key, usta_map, running_map)
+                self._locs[key] = loom
+                if loom:
+                    notes[i] = note_rules.append_note(notes[i], f"{loom} NOLU TEZGAHA ALINDI")
+
+        # 3) Manuel kurallar
+        if compiled.rule_count:
+            sub = pd.DataFrame({c: df[c].iloc[positions].to_numpy() for c in rule_cols})
+            sub["NOTLAR"] = notes
+            notes = note_rules.apply_rules(sub, compiled)["NOTLAR"].tolist()
+
+        df.iloc[positions, df.columns.get_loc("NOTLAR")] = notes
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["tracking"] = self._frame is not None and self._frame() is not None
+            data["orders_lacking"] = len(self._atki)
+            data["labels_located"] = sum(1 for v in self._locs.values() if v)
+        return data
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import pickle
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import pandas as pd
+
+# ============================================================
+#  NOT KURALLARI: derleme, uygulama ve saklama biçimi
+#   Kural: {"col": kolon, "val": değer, "text": not, "user": ..., "created_at": ...}
+#   Kolonu değere eşit (str karşılaştırma) satırların NOTLAR'ına not eklenir; kurallar
+#   liste sırasıyla uygulanır, satırda zaten olan not tekrar eklenmez.
+#   Saklama: JSON. Eski base64 pickle kayıtları normal okumada açılmaz; yalnız geçiş
+#   (migrate_*) sırasında sınıf / fonksiyon yüklemeyen kısıtlı unpickler ile bir kez çevrilir.
+# ============================================================
+
+# (kural sırası, not metni)
+_Hit = tuple[int, str]
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    # kolon -> {str(değer): ((kural sırası, not), ...)}
+    index: dict[str, dict[str, tuple[_Hit, ...]]]
+    # derlenen kurallar sırasıyla (kolon, değer, not); değişiklik karşılaştırması için
+    key: tuple[tuple[str, str, str], ...]
+
+    @property
+    def rule_count(self) -> int:
+        return len(self.key)
+
+
+def append_note(old: str, add: str) -> str:
+    base = (old or "").strip()
+    add = (add or "").strip()
+    if not add:
+        return base
+    if not base:
+        return add
+    parts = [p.strip() for p in base.split(";") if p.strip()]
+    if add in parts:
+        return base
+    return base + "; " + add
+
+
+def _rule_key(rules: list[dict]) -> tuple[tuple[str, str, str], ...]:
+    key = []
+    for rule in rules or []:
+        if not isinstance(rule, dict):
+            continue
+        col, text = rule.get("col"), rule.get("text")
+        if not col or text is None:
+            continue
+        key.append((str(col), str(rule.get("val")), str(text)))
+    return tuple(key)
+
+
+@lru_cache(maxsize=8)
+def _compile(key: tuple[tuple[str, str, str], ...]) -> CompiledRules:
+    index: dict[str, dict[str, list[_Hit]]] = {}
+    for i, (col, val, text) in enumerate(key):
+        index.setdefault(col, {}).setdefault(val, []).append((i, text))
+    return CompiledRules(
+        {col: {val: tuple(hits) for val, hits in table.items()} for col, table in index.items()},
+        key,
+    )
+
+
+def compile_rules(rules: list[dict]) -> CompiledRules:
+    """Kuralları kolon bazında değer -> notlar indeksine çevirir (aynı kural listesi için önbellekten)."""
+    return _compile(_rule_key(rules))
+
+
+def apply_rules(df: pd.DataFrame, compiled: CompiledRules) -> pd.DataFrame:
+    """
+    Derlenmiş kuralları NOTLAR'a uygular; sonuç kuralları tek tek sırayla uygulamakla aynıdır.
+    Her kolon bir kez str'e çevrilip indekse eşlenir; not birleştirme eşsiz (not, eşleşen notlar)
+    çiftleri için bir kez yapılır.
+    """
+    if not compiled.rule_count:
+        return df
+    if "NOTLAR" not in df.columns:
+        df["NOTLAR"] = ""
+
+    # Satırlar konumla izlenir (index tekrarlı olabilir)
+    matched: list[pd.Series] = []
+    for col, table in compiled.index.items():
+        if col not in df.columns:
+            continue
+        hits = df[col].astype(str).reset_index(drop=True).map(table)
+        hits = hits[hits.notna()]
+        if not hits.empty:
+            matched.append(hits)
+    if not matched:
+        return df
+
+    if len(matched) == 1:
+        positions = matched[0].index.tolist()
+        adds = [tuple(t for _, t in hs) for hs in matched[0].tolist()]
+    else:
+        # Birden çok kolondan eşleşen satırlarda notlar kural sırasına göre birleştirilir
+        merged: dict[int, list[_Hit]] = {}
+        for hits in matched:
+            for pos, hs in hits.items():
+                merged.setdefault(pos, []).extend(hs)
+        positions = sorted(merged)
+        adds = [tuple(t for _, t in sorted(merged[pos])) for pos in positions]
+
+    notes_at = df.columns.get_loc("NOTLAR")
+    base = df.iloc[positions, notes_at].astype(str).tolist()
+
+    memo: dict[tuple[str, tuple[str, ...]], str] = {}
+
+    def _fold(old: str, adds: tuple[str, ...]) -> str:
+        key = (old, adds)
+        out = memo.get(key)
+        if out is None:
+            out = old
+            for add in adds:
+                out = append_note(out, add)
+            memo[key] = out
+        return out
+
+    df.iloc[positions, notes_at] = [_fold(o, a) for o, a in zip(base, adds)]
+    return df
+
+
+# ------------------------------------------------------------
+#  Saklama biçimi
+# ------------------------------------------------------------
+
+def _clean_rule(rule: dict) -> dict:
+    return {str(k): (v if isinstance(v, (str, int, float, bool)) or v is None else str(v)) for k, v in rule.items()}
+
+
+def encode_record(rules: list[dict], legacy: str | None) -> str:
+    """
+    AppMeta.note_rules_json kaydı: kurallar ve yanında yazılan eski biçimli kaydın parmak izi.
+    Eski client eski kaydı değiştirirse parmak izi tutmaz; kurallar oradan yeniden çevrilir.
+    """
+    return json.dumps(
+        {"legacy": fingerprint(legacy), "rules": [_clean_rule(r) for r in rules if isinstance(r, dict)]},
+        ensure_ascii=False,
+    )
+
+
+def decode_record(raw: str | bytes | None) -> tuple[list[dict], str | None] | None:
+    """encode_record'un tersi: (kurallar, eski kaydın parmak izi); kayıt yoksa / bozuksa None."""
+    try:
+        obj = _decode(raw)
+    except Exception:
+        return None
+    if not isinstance(obj, dict) or not isinstance(obj.get("rules"), list):
+        return None
+    return [r for r in obj["rules"] if isinstance(r, dict)], obj.get("legacy")
+
+
+def fingerprint(raw: str | bytes | None) -> str | None:
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return hashlib.sha256(bytes(raw)).hexdigest()
+
+
+def _decode(raw: str | bytes | None) -> Any:
+    """Yalnız JSON; eski pickle kaydı ValueError verir (migrate_* ile çevrilir)."""
+    if raw is None:
+        return None
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        raw = bytes(raw).decode("utf-8", errors="ignore")
+    text = raw.strip()
+    if not text:
+        return None
+    # base64 alfabesinde [ ve { yok: JSON ile eski pickle kaydı ilk karakterden ayrılır
+    if text[0] not in "[{":
+        raise ValueError("eski (pickle) biçimli kayıt")
+    return json.loads(text)
+
+
+# ------------------------------------------------------------
+#  Eski biçim (base64 pickle): geçiş dönemi
+#   Eski client'lar AppMeta.note_rules ve NoteRules.RuleData'yı base64 pickle olarak okur / yazar.
+#   Tüm client'lar güncellenene kadar yeni client bu kayıtları da yazar (yazmak güvenli; açmak değil).
+# ------------------------------------------------------------
+
+class _NoGlobals(pickle.Unpickler):
+    """Kural kayıtları yalnız list / dict / str / sayı içerir; sınıf veya fonksiyon yüklenmesi reddedilir."""
+
+    def find_class(self, module: str, name: str) -> Any:
+        raise pickle.UnpicklingError(f"izin verilmeyen nesne: {module}.{name}")
+
+
+def _decode_legacy(raw: str | bytes | None) -> Any:
+    if raw is None:
+        return None
+    if isinstance(raw, (bytes, bytearray, memoryview)):
+        raw = bytes(raw)
+        if raw[:1] == b"\x80":  # eski varbinary kayıt: ham pickle
+            return _NoGlobals(io.BytesIO(raw)).load()
+        raw = raw.decode("utf-8", errors="ignore")
+    text = raw.strip()
+    if not text:
+        return None
+    if text[0] in "[{":
+        return json.loads(text)
+    return _NoGlobals(io.BytesIO(base64.b64decode(text))).load()
+
+
+def migrate_rules(raw: str | bytes | None) -> list[dict]:
+    """Eski AppMeta.note_rules kaydı (pickle ya da JSON) -> kural listesi; açılamazsa []."""
+    try:
+        obj = _decode_legacy(raw)
+    except Exception:
+        return []
+    if isinstance(obj, list):
+        return [_clean_rule(r) for r in obj if isinstance(r, dict)]
+    return []
+
+
+def migrate_rule(raw: str | bytes | None) -> dict | None:
+    """Eski NoteRules.RuleData kaydı -> kural; açılamazsa None."""
+    try:
+        obj = _decode_legacy(raw)
+    except Exception:
+        return None
+    return _clean_rule(obj) if isinstance(obj, dict) else None
+
+
+def encode_legacy_rules(rules: list[dict]) -> str:
+    """Kural listesi -> eski client'ların okuduğu base64 pickle (AppMeta.note_rules)."""
+    return base64.b64encode(pickle.dumps([_clean_rule(r) for r in rules if isinstance(r, dict)])).decode("ascii")
+
+
+def encode_legacy_rule(rule: dict) -> str:
+    """Tek kural -> eski client'ların okuduğu base64 pickle (NoteRules.RuleData)."""
+    return base64.b64encode(pickle.dumps(_clean_rule(rule))).decode("ascii")
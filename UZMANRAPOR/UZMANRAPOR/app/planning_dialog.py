@@ -13,6 +13,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QSettings, QModelIndex
 
 from app.models import PandasModel
+from app.running_norm import detect_94_mask
 
 # ---- Arızalı/Boş tezgah listesini depodan okuma (varsa) ----
 try:
@@ -798,13 +799,7 @@ class PlanningDialog(QDialog):
 
         # açık/soon için gerekli alanlar
         if "_OpenTezgahFlag" not in df.columns:
-            def _detect_94_row(row):
-                for c in row.index:
-                    u = str(row.get(c, "")).strip().upper()
-                    if "SİPARİŞ YOK" in u or "SIPARIS YOK" in u or u == "94" or " 94" in u:
-                        return True
-                return False
-            df["_OpenTezgahFlag"] = df.apply(_detect_94_row, axis=1)
+            df["_OpenTezgahFlag"] = detect_94_mask(df)
         if "_KalanMetreNorm" not in df.columns:
             kal_col = _pick_col(df, ["Kalan", "Kalan Mt", "Kalan Metre", "Kalan_Metre", "_KalanMetre"])
             df["_KalanMetreNorm"] = pd.to_numeric(df[kal_col], errors="coerce") if kal_col else pd.NA
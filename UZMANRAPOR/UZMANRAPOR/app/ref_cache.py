@@ -0,0 +1,157 @@
+# app/ref_cache.py
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class RefCacheStats:
+    hits: int = 0            # geçerli girdi bulundu (istek yok)
+    misses: int = 0          # girdi yoktu, yüklendi
+    stale: int = 0           # sürüm damgası değiştiği için yeniden yüklendi
+    expired: int = 0         # max_age dolduğu için yeniden yüklendi
+    version_checks: int = 0  # sürüm sorgusu sayısı
+    check_errors: int = 0    # sürüm sorgusu hata verdi (girdiler bayat sayıldı)
+    writes: int = 0          # kayıt sonrası önbelleğe doğrudan yazılan (write-through)
+    invalidations: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    version: Optional[str]
+    loaded_at: float
+
+
+class RefCache:
+    """
+    Referans tabloları için client tarafı read-through önbellek (thread-safe).
+
+    Her tablonun sürüm damgası sunucuda tutulur; ``fetch_versions()`` tek sorguda hepsini döndürür
+    ({tablo: damga}). Sürümler en fazla ``check_sec`` saniyede bir sorulur; arada gelen okumalar
+    istek atmadan önbellekten döner. Damgası değişen tablonun girdileri yeniden yüklenir.
+    Damgayı artırmayan dış değişiklikler (SSMS vb.) ``max_age`` sonunda görülür.
+    Dönen değerler kopyadır; çağıran değiştirse de önbellek bozulmaz.
+    """
+
+    def __init__(
+        self,
+        fetch_versions: Callable[[], dict[str, str]],
+        check_sec: float = 5.0,
+        max_age: float = 600.0,
+        enabled: bool = True,
+    ) -> None:
+        self.fetch_versions = fetch_versions
+        self.check_sec = float(check_sec)
+        self.max_age = float(max_age)
+        self.enabled = enabled
+        self._entries: dict[tuple[str, str], _Entry] = {}
+        self._versions: dict[str, str] = {}
+        self._checked_at = float("-inf")
+        self._check_ok = False
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self.stats = RefCacheStats()
+
+    def get(self, table: str, key: str, loader: Callable[[], Any]) -> Any:
+        """(tablo, anahtar) için geçerli değer; yoksa / bayatsa loader() ile yükler. loader hatası yayılır."""
+        return self.get_versioned(table, key, loader)[0]
+
+    def get_versioned(self, table: str, key: str, loader: Callable[[], Any]) -> tuple[Any, Optional[str], bool]:
+        """
+        get() gibi; ayrıca değerin ait olduğu sürüm damgası (okumadan önce görülen; damga yoksa None)
+        ve damganın sunucudan doğrulanıp doğrulanamadığı (sürüm sorgusu hata verdiyse False).
+        Kayıtta iyimser eşzamanlılık kontrolü bu damgayla yapılır.
+        """
+        versions = self._current_versions()
+        if not self.enabled:
+            return loader(), versions.get(table) if versions is not None else None, versions is not None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((table, key))
+            if entry is not None:
+                if versions is None or entry.version != versions.get(table):
+                    self.stats.stale += 1
+                elif now - entry.loaded_at > self.max_age:
+                    self.stats.expired += 1
+                else:
+                    self.stats.hits += 1
+                    return copy.deepcopy(entry.value), entry.version, True
+            else:
+                self.stats.misses += 1
+
+        value = loader()
+        version = versions.get(table) if versions is not None else None
+        with self._lock:
+            self._entries[(table, key)] = _Entry(copy.deepcopy(value), version, time.monotonic())
+        return value, version, versions is not None
+
+    def version(self, table: str) -> Optional[str]:
+        """Tablonun bilinen sürüm damgası (check_sec dolduysa sunucudan tazelenir); bilinmiyorsa None."""
+        return self.version_info(table)[0]
+
+    def version_info(self, table: str) -> tuple[Optional[str], bool]:
+        """(damga, doğrulandı mı): sürüm sorgusu hata verdiyse (None, False); damga yoksa (None, True)."""
+        versions = self._current_versions()
+        if versions is None:
+            return None, False
+        return versions.get(table), True
+
+    def put(self, table: str, key: str, value: Any, version: Optional[str]) -> None:
+        """Kayıttan sonra yazılan değeri ve yeni damgayı önbelleğe koyar (write-through)."""
+        with self._lock:
+            if version is not None:
+                self._versions[table] = version
+            if not self.enabled:
+                return
+            self._entries[(table, key)] = _Entry(copy.deepcopy(value), version, time.monotonic())
+            self.stats.writes += 1
+
+    def invalidate(self, table: Optional[str] = None, version: Optional[str] = None) -> None:
+        """Tablonun (None: tümünün) girdilerini düşürür; yeni damga biliniyorsa kaydedilir."""
+        with self._lock:
+            for k in [k for k in self._entries if table is None or k[0] == table]:
+                del self._entries[k]
+            if table is not None and version is not None:
+                self._versions[table] = version
+            self.stats.invalidations += 1
+
+    def _current_versions(self) -> Optional[dict[str, str]]:
+        """Son bilinen sürümler; check_sec dolduysa sunucudan tazelenir. Sorgu hata verirse None."""
+        if time.monotonic() - self._checked_at < self.check_sec:
+            with self._lock:
+                return dict(self._versions) if self._check_ok else None
+        # Aynı anda gelen okumalardan yalnız biri sorar; diğerleri onun sonucunu kullanır
+        with self._check_lock:
+            if time.monotonic() - self._checked_at >= self.check_sec:
+                try:
+                    fresh: Optional[dict[str, str]] = dict(self.fetch_versions())
+                except Exception:
+                    fresh = None
+                with self._lock:
+                    self.stats.version_checks += 1
+                    if fresh is None:
+                        self.stats.check_errors += 1
+                    else:
+                        self._versions = fresh
+                    self._check_ok = fresh is not None
+                self._checked_at = time.monotonic()
+            with self._lock:
+                return dict(self._versions) if self._check_ok else None
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            lookups = self.stats.hits + self.stats.misses + self.stats.stale + self.stats.expired
+            data["hit_rate"] = round(self.stats.hits / lookups, 4) if lookups else 0.0
+            data["entries"] = sorted(f"{t}:{k}" if k else t for t, k in self._entries)
+            data["versions"] = dict(self._versions)
+            data["enabled"] = self.enabled
+        return data
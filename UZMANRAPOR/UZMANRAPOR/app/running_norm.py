@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+
+# ============================================================
+# RUNNING ORDERS NORMALİZASYON BLOĞU (tek noktadan düzeltme)
+# Satır satır apply yerine sütun bazlı (vektörel) string işlemleri kullanılır;
+# çıktılar eski satır bazlı fonksiyonlarla birebir aynıdır.
+# ============================================================
+
+_TARAK_NUM_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _on_uniques(s: pd.Series, fn: Callable[[pd.Series], Any], na: Any) -> np.ndarray:
+    """fn'i yalnız farklı değerlere uygular, sonucu satırlara dağıtır.
+       Running'de Kalan/Tarak/Durum değerleri çok tekrar ettiği için iş, satır sayısından bağımsızlaşır.
+       pandas 3'te astype(str) boş hücreyi metne çevirmeden NA bırakır; bu hücreler fn'e gitmez, 'na' alır
+       (pandas 2'de NaN/None zaten 'nan'/'None' metnidir)."""
+    codes, uniq = pd.factorize(s.astype(str), use_na_sentinel=False)
+    u = pd.Series(uniq, dtype=object)
+    missing = u.isna().to_numpy()
+    res = np.full(len(u), na, dtype=object)
+    if not missing.all():
+        res[~missing] = np.asarray(fn(u[~missing].reset_index(drop=True)), dtype=object)
+    return res[codes]
+
+
+def _parse_number_loose_strs(s: pd.Series) -> pd.Series:
+    # rakam, nokta, virgül, eksi dışını temizle
+    s = s.str.strip().str.replace(r"[^0-9,.\-]", "", regex=True)
+
+    has_c = s.str.contains(",", regex=False)
+    has_d = s.str.contains(".", regex=False)
+    n = s.str.len()
+    rc = s.str.rfind(",")
+    rd = s.str.rfind(".")
+
+    # Virgül ondalık: iki ayırıcı varsa en sağdaki; yalnız virgül varsa sonrası <= 2 hane
+    comma_dec = (has_c & has_d & (rc > rd)) | (has_c & ~has_d & (n - rc - 1 <= 2))
+    comma_thousand = has_c & ~comma_dec
+    # Yalnız nokta ve sonrası > 2 hane: 1.234 -> binlik
+    dot_thousand = ~has_c & has_d & (n - rd - 1 > 2)
+
+    out = s.copy()
+    out[comma_dec] = s[comma_dec].str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    out[comma_thousand] = s[comma_thousand].str.replace(",", "", regex=False)
+    out[dot_thousand] = s[dot_thousand].str.replace(".", "", regex=False)
+    return pd.to_numeric(out, errors="coerce").astype("float64")
+
+
+def parse_number_loose_series(ser: pd.Series) -> pd.Series:
+    """Metin/sayı karması 'Kalan' değerlerini güvenle floata çevirir.
+       92,7 | 1.234,56 | 1,234.56 | ' 300 ' | '92,7 m' | '-' -> float/NA
+       Çevrilemeyen varsa sonuç object (float + pd.NA), yoksa float64 döner."""
+    if ser.empty:
+        return ser.map(lambda _: pd.NA)
+    vals = pd.Series(_on_uniques(ser, _parse_number_loose_strs, np.nan), index=ser.index, dtype="float64")
+    vals[ser.isna().to_numpy()] = np.nan
+    if vals.isna().any():
+        return vals.astype(object).where(vals.notna(), pd.NA)
+    return vals
+
+
+def _norm_tarak_one(val: str) -> str:
+    nums = _TARAK_NUM_RE.findall(val)
+    if not nums:
+        return val.strip()
+    out = []
+    for n in nums[:3]:
+        n = n.replace(",", ".")
+        if re.fullmatch(r"\d+\.0+", n):
+            n = n.split(".", 1)[0]
+        out.append(n)
+    return "/".join(out)
+
+
+def norm_tarak_series(ser: pd.Series) -> pd.Series:
+    """Dinamik/Running fark etmez: 'a/b/c' (ilk 3 sayı) şeklinde normalize anahtar.
+       Sayı yoksa değerin kendisi (strip) döner."""
+    return pd.Series(_on_uniques(ser, lambda u: u.map(_norm_tarak_one), ""), index=ser.index, dtype=object)
+
+
+def _has_94_text(u: pd.Series) -> pd.Series:
+    u = u.str.strip().str.upper()
+    return (
+        u.str.contains("SİPARİŞ YOK", regex=False)
+        | u.str.contains("SIPARIS YOK", regex=False)
+        | u.eq("94")
+        | u.str.contains(" 94", regex=False)
+    )
+
+
+def detect_94_mask(df: pd.DataFrame) -> pd.Series:
+    """
+    Running satırında 94 / 'Sipariş Yok' tespiti (kolon adı bağımsız), tüm sütunlarda.
+    Bir hücre eşleşir: upper(strip(str(x))) 'SİPARİŞ YOK' / 'SIPARIS YOK' ya da ' 94' içerir veya '94'e eşittir.
+    Ondalıklı / tarih / bool sütunların metni bu kalıplara hiç uymaz; atlanır.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        if (
+            ptypes.is_bool_dtype(col)
+            or ptypes.is_float_dtype(col)
+            or ptypes.is_datetime64_any_dtype(col)
+        ):
+            continue
+        if ptypes.is_integer_dtype(col):
+            mask |= (col == 94).fillna(False).to_numpy(dtype=bool)
+            continue
+        mask |= _on_uniques(col, _has_94_text, False).astype(bool)
+    return pd.Series(mask, index=df.index)
+
+
+def normalize_df_running(df_running: pd.DataFrame) -> pd.DataFrame:
+    """Running Orders df'sine kanonik kolonlar ekler/yeniler:
+       - _KalanMetreNorm  : float
+       - _TG_norm         : 'a/b/c' normalize tarak
+       - _OpenTezgahFlag  : bool (94 veya Durum='Bitti')
+    """
+    if df_running is None or df_running.empty:
+        return df_running
+
+    # 1) Kalan -> _KalanMetreNorm
+    kalan_cols = ["Kalan", "Kalan Mt", "Kalan Metre", "Kalan_Metre", "_KalanMetre"]
+    kal_col = next((c for c in kalan_cols if c in df_running.columns), None)
+    if kal_col:
+        df_running["_KalanMetreNorm"] = parse_number_loose_series(df_running[kal_col])
+    else:
+        df_running["_KalanMetreNorm"] = pd.NA
+
+    # 2) Tarak Grubu normalize -> _TG_norm
+    tg_col = next((c for c in ["Tarak Grubu", "Tarak", "TarakGrubu"] if c in df_running.columns), None)
+    if tg_col:
+        df_running["_TG_norm"] = norm_tarak_series(df_running[tg_col])
+    else:
+        df_running["_TG_norm"] = ""
+
+    # 3) 94 bayrağı -> _OpenTezgahFlag (yukarıda eklenen kanonik kolonlar dahil tüm sütunlar)
+    open_94 = detect_94_mask(df_running)
+
+    # 4) Durum normalizasyonu (Bitti kontrolü)
+    durum_col = next((c for c in ["Durum", "Durumu", "Durum Açıklaması", "Durum Tanım"] if c in df_running.columns), None)
+    if durum_col:
+        s = df_running[durum_col]
+        # str(val or "") : boş/0/False değerler "" sayılır
+        s = s.where(s.map(bool), "")
+
+        def _is_bitti(u: pd.Series) -> pd.Series:
+            u = u.str.strip().str.upper()
+            return u.str.contains("BİTTİ", regex=False) | u.str.contains("BITTI", regex=False)
+
+        bitti_series = pd.Series(_on_uniques(s, _is_bitti, False).astype(bool), index=df_running.index)
+    else:
+        bitti_series = pd.Series(False, index=df_running.index)
+
+    # 5) Açık kabul: 94 veya Durum=Bitti
+    df_running["_OpenTezgahFlag"] = open_94.astype(bool) | bitti_series.astype(bool)
+
+    return df_running
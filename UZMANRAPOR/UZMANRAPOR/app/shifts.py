@@ -0,0 +1,33 @@
+# app/shifts.py
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Vardiyalar: 07-15, 15-23, 23-ertesi gün 07 (İstanbul saati)
+IST = ZoneInfo("Europe/Istanbul")
+SHIFT_START_HOURS = (7, 15, 23)
+
+
+def day_shift_windows(day: date, tz: ZoneInfo = IST) -> list[tuple[datetime, datetime]]:
+    """Verilen günün üç vardiya penceresi [(başlangıç, bitiş), ...]; üçüncüsü ertesi gün 07'de biter."""
+    starts = [datetime(day.year, day.month, day.day, h, 0, tzinfo=tz) for h in SHIFT_START_HOURS]
+    ends = starts[1:] + [starts[0] + timedelta(days=1)]
+    return list(zip(starts, ends))
+
+
+def shift_bounds(ref: datetime | None = None, tz: ZoneInfo = IST) -> tuple[datetime, datetime]:
+    """ref anının içinde bulunduğu vardiyanın (başlangıç, bitiş) aralığı."""
+    now = ref or datetime.now(tz)
+    # 00:00-07:00 arası bir önceki günün gece vardiyasıdır
+    day = now.date() if now.hour >= SHIFT_START_HOURS[0] else now.date() - timedelta(days=1)
+    for start, end in day_shift_windows(day, tz):
+        if start <= now < end:
+            return start, end
+    return day_shift_windows(day, tz)[-1]
+
+
+def yesterday_shift_windows(ref: datetime | None = None, tz: ZoneInfo = IST) -> list[tuple[datetime, datetime]]:
+    """Dünün üç vardiya penceresi (07-15, 15-23, 23-ertesi 07)."""
+    now = ref or datetime.now(tz)
+    return day_shift_windows((now - timedelta(days=1)).date(), tz)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import io
+import pickle
+import zlib
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pyarrow bağımlılıklarda tanımlı; kurulu değilse pickle biçimi yazılır
+    pa = None
+    pq = None
+
+try:
+    import zstandard
+except Exception:  # zstandard yoksa zstd gövdeler pyarrow ile (o da yoksa zlib) işlenir
+    zstandard = None
+
+from io_layer.parse_cache import frame_to_table, table_to_frame
+
+# ============================================================
+#  SNAPSHOT CODEC (sürümlü)
+#   MAGIC + [sürüm, biçim, sıkıştırma] + gövde
+#   - biçim 1: Parquet (gövde içi zstd)         -> tipler korunur, hızlı
+#   - biçim 2: pickle (Arrow'un temsil edemediği karışık tipli sütunlar için); zstd ile sıkıştırılır,
+#     pyarrow olmadan da (zstandard) okunur
+#   Eski kayıtlar (MAGIC yok): zlib(pickle) — geçiş için okunmaya devam eder; güncellenmemiş
+#   client'lar yalnız bunu okuyabildiğinden UZMANRAPOR_LEGACY_SNAPSHOTS=1 ile DataHex'e bu biçim de yazılır.
+# ============================================================
+
+MAGIC = b"UZSNAP"
+VERSION = 2
+
+FMT_PARQUET = 1
+FMT_PICKLE = 2
+
+COMP_NONE = 0
+COMP_ZSTD = 1
+COMP_ZLIB = 2
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def _compress(raw: bytes) -> tuple[int, bytes]:
+    if zstandard is not None:
+        return COMP_ZSTD, zstandard.ZstdCompressor(level=3).compress(raw)
+    if pa is not None:
+        try:
+            return COMP_ZSTD, pa.Codec("zstd").compress(raw, asbytes=True)
+        except Exception:
+            pass
+    return COMP_ZLIB, zlib.compress(raw, level=3)
+
+
+def _decompress(comp: int, body: bytes, raw_size: int | None = None) -> bytes:
+    if comp == COMP_NONE:
+        return body
+    if comp == COMP_ZLIB:
+        return zlib.decompress(body)
+    if comp == COMP_ZSTD:
+        # Standart zstd çerçevesi: pyarrow'un yazdığı gövde zstandard ile de açılır
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().decompress(body, max_output_size=raw_size or 0)
+        if pa is None:
+            raise SnapshotFormatError("zstd snapshot için zstandard (veya pyarrow) gerekli")
+        return pa.Codec("zstd").decompress(body, decompressed_size=raw_size, asbytes=True)
+    raise SnapshotFormatError(f"bilinmeyen sıkıştırma: {comp}")
+
+
+def encode_frame(df: pd.DataFrame) -> bytes:
+    if pa is not None and df.columns.is_unique:
+        try:
+            sink = io.BytesIO()
+            pq.write_table(frame_to_table(df), sink, compression="zstd")
+            return MAGIC + bytes([VERSION, FMT_PARQUET, COMP_NONE]) + sink.getvalue()
+        except (ValueError, TypeError, pa.ArrowException):
+            pass
+    raw = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    comp, body = _compress(raw)
+    return MAGIC + bytes([VERSION, FMT_PICKLE, comp]) + len(raw).to_bytes(8, "big") + body
+
+
+def encode_legacy_frame(df: pd.DataFrame) -> bytes:
+    """Eski client'ların okuduğu biçim: zlib(pickle) (MAGIC yok)."""
+    return zlib.compress(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL), level=3)
+
+
+def decode_frame(blob: bytes) -> pd.DataFrame:
+    if not blob.startswith(MAGIC):
+        # Eski biçim: zlib(pickle)
+        return pd.read_pickle(io.BytesIO(zlib.decompress(blob)))
+
+    head = len(MAGIC)
+    version, fmt, comp = blob[head], blob[head + 1], blob[head + 2]
+    if version > VERSION:
+        raise SnapshotFormatError(f"snapshot sürümü desteklenmiyor: {version}")
+    body = blob[head + 3:]
+    if fmt == FMT_PARQUET:
+        if pq is None:
+            raise SnapshotFormatError("Parquet snapshot için pyarrow gerekli (pip install pyarrow)")
+        return table_to_frame(pq.read_table(pa.BufferReader(_decompress(comp, body))))
+    if fmt == FMT_PICKLE:
+        raw_size = int.from_bytes(body[:8], "big")
+        return pickle.loads(_decompress(comp, body[8:], raw_size))
+    raise SnapshotFormatError(f"bilinmeyen snapshot biçimi: {fmt}")
+
+
+def describe(blob: bytes) -> str:
+    """Log için kısa biçim adı."""
+    if not blob.startswith(MAGIC):
+        return "legacy-pickle-zlib"
+    fmt = blob[len(MAGIC) + 1]
+    return {FMT_PARQUET: "parquet-zstd", FMT_PICKLE: "pickle"}.get(fmt, f"fmt{fmt}")
@@ -1,14 +1,69 @@
 from __future__ import annotations
 
+import asyncio
+import base64
+import http.client
 import json
 import os
+import random
+import re
+import socket
+import threading
+import time
 import urllib.error
+import urllib.parse
 import urllib.request
-from typing import Any, Iterable, Optional
+import uuid
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence
+
+try:
+    import pyarrow as pa
+except Exception:  # requirements'ta var; eksik kurulumda JSON yoluna düşülür (ilk Arrow denemesinde uyarılır)
+    pa = None
+
+try:
+    import zstandard
+except Exception:  # zstandard opsiyonel; yoksa yalnız gzip istenir
+    zstandard = None
 
 
 class SqlApiError(RuntimeError):
-    pass
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        # HTTP durum kodu (bağlantı/format hatalarında None)
+        self.status = status
+
+
+class ArrowUnavailable(SqlApiError):
+    """Client'ta pyarrow yok veya API /sql/arrow desteklemiyor."""
+
+
+class QueryCancelled(SqlApiError):
+    """İstek iptal edildi (CallContext.cancel veya sunucuda /sql/cancel)."""
+
+
+class QueryTimeout(SqlApiError):
+    """İsteğin süresi doldu (client'ta ya da sunucudaki sorgu zaman aşımıyla)."""
+
+
+class WriteConflict(SqlApiError):
+    """Batch'teki expect_rows koşulu tutmadı (409); batch'in hiçbir ifadesi uygulanmadı."""
+
+
+def _api_error(status: int, reason: str, msg: str) -> SqlApiError:
+    text = f"SQL API hatası: {status} {reason} {msg}".strip()
+    if status == 499:
+        return QueryCancelled(text, status=status)
+    if status == 504:
+        return QueryTimeout(text, status=status)
+    if status == 409:
+        return WriteConflict(text, status=status)
+    return SqlApiError(text, status=status)
 
 
 def _env(name: str, default: str) -> str:
@@ -16,6 +71,364 @@ def _env(name: str, default: str) -> str:
     return value.strip() if value else default
 
 
+# Sunucuya bildirilen kodlamalar; UZMANRAPOR_API_COMPRESSION=0 ile kapatılır
+_ACCEPT_ENCODING = (
+    ("zstd, gzip" if zstandard is not None else "gzip")
+    if _env("UZMANRAPOR_API_COMPRESSION", "1") not in ("0", "false", "no")
+    else "identity"
+)
+
+
+# 503 (sunucu kuyruğu dolu / havuz meşgul): istek sunucuda çalıştırılmadan reddedilir,
+# bu yüzden yazmalar dahil güvenle tekrarlanır
+_RETRY_STATUSES = {503}
+_RETRY_BASE_SEC = float(_env("UZMANRAPOR_API_RETRY_BASE_SEC", "0.25"))
+_RETRY_MAX_SEC = float(_env("UZMANRAPOR_API_RETRY_MAX_SEC", "8"))
+# GUI (ana) thread'inde tek beklemenin üst sınırı: arayüz saniyelerce donmasın
+_RETRY_MAIN_MAX_SEC = float(_env("UZMANRAPOR_API_RETRY_MAIN_MAX_SEC", "0.5"))
+# Sunucudaki adil kuyruk için makine kimliği
+_CLIENT_ID = _env("UZMANRAPOR_CLIENT_ID", socket.gethostname())
+
+
+def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+    """Tam jitter'lı üstel bekleme; sunucu Retry-After verdiyse en az o kadar (üst sınır _RETRY_MAX_SEC)."""
+    delay = random.uniform(0, min(_RETRY_MAX_SEC, _RETRY_BASE_SEC * (2 ** attempt)))
+    try:
+        hint = float(retry_after) if retry_after else 0.0
+    except ValueError:
+        hint = 0.0
+    if hint > 0:
+        # Aynı anda reddedilen client'lar aynı anda geri dönmesin
+        delay = max(delay, hint * random.uniform(1.0, 1.5))
+    return min(delay, _RETRY_MAX_SEC)
+
+
+# Client süresi dolunca sunucunun 504 cevabının gelebilmesi için soket zaman aşımına eklenen pay
+_DEADLINE_GRACE_SEC = 1.0
+_CTX_LOCAL = threading.local()
+
+
+def _send_cancel(cancel_url: str, token: str, request_id: str) -> None:
+    data = json.dumps({"request_id": request_id}).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["X-Token"] = token
+    req = urllib.request.Request(cancel_url, data=data, headers=headers, method="POST")
+    try:
+        urllib.request.urlopen(req, timeout=3).close()
+    except Exception:
+        pass  # iptal en iyi çaba: sunucu zaten zaman aşımıyla durdurur
+
+
+def _cancel_async(targets: Sequence[tuple[str, str, str]]) -> None:
+    """(cancel_url, token, request_id) listesini arka planda gönderir; çağıran (GUI) thread beklemez."""
+    if not targets:
+        return
+
+    def _run() -> None:
+        for cancel_url, token, request_id in targets:
+            _send_cancel(cancel_url, token, request_id)
+
+    threading.Thread(target=_run, name="sql-cancel", daemon=True).start()
+
+
+class CallContext:
+    """
+    Bir işin (ör. rapor yenileme) API isteklerine ortak süre sınırı ve iptal.
+
+        ctx = CallContext(timeout=20)
+        with ctx.active():              # bu thread'deki ApiConnection istekleri ctx'e bağlanır
+            df = storage.load_x()
+        ctx.cancel()                    # başka thread'den: sunucuda çalışan sorgular durdurulur
+
+    Kalan süre her istekte X-Deadline-Ms ile sunucuya gider; sunucu bunu ODBC sorgu zaman
+    aşımı olarak uygular.
+    """
+
+    def __init__(self, timeout: Optional[float] = None) -> None:
+        self.deadline = time.monotonic() + float(timeout) if timeout else None
+        self.cancelled = False
+        # request id -> (cancel_url, token): iptalde sunucuya bildirilecek, süren istekler
+        self._inflight: dict[str, tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise QueryCancelled("SQL isteği iptal edildi.")
+        left = self.remaining()
+        if left is not None and left <= 0:
+            raise QueryTimeout("SQL isteğinin süresi doldu.")
+
+    @contextmanager
+    def active(self) -> Iterator["CallContext"]:
+        prev = getattr(_CTX_LOCAL, "ctx", None)
+        _CTX_LOCAL.ctx = self
+        try:
+            yield self
+        finally:
+            _CTX_LOCAL.ctx = prev
+
+    def cancel(self) -> None:
+        """İptal eder; süren isteklerin sunucudaki sorguları arka planda durdurulur."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            targets = [(url, token, rid) for rid, (url, token) in self._inflight.items()]
+        _cancel_async(targets)
+
+    def _track(self, request_id: str, cancel_url: str, token: str) -> None:
+        with self._lock:
+            self._inflight[request_id] = (cancel_url, token)
+            cancelled = self.cancelled
+        if cancelled:
+            # cancel() ile kayıt arasında kalan istek
+            _cancel_async([(cancel_url, token, request_id)])
+
+    def _untrack(self, request_id: str) -> None:
+        with self._lock:
+            self._inflight.pop(request_id, None)
+
+
+def current_context() -> Optional[CallContext]:
+    """Bu thread'de etkin CallContext (yoksa None)."""
+    return getattr(_CTX_LOCAL, "ctx", None)
+
+
+@dataclass
+class TransferStats:
+    requests: int = 0
+    wire_bytes: int = 0   # ağdan gelen (sıkıştırılmış) bayt
+    raw_bytes: int = 0    # açıldıktan sonraki bayt
+
+    def as_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = dict(self.__dict__)
+        data["ratio"] = round(self.wire_bytes / self.raw_bytes, 4) if self.raw_bytes else None
+        return data
+
+
+_TRANSFER: dict[str, TransferStats] = {}
+_TRANSFER_LOCK = threading.Lock()
+_LAST_TRANSFER = threading.local()
+
+
+def _record_transfer(encoding: str, wire: int, raw: int) -> None:
+    encoding = encoding or "identity"
+    with _TRANSFER_LOCK:
+        st = _TRANSFER.setdefault(encoding, TransferStats())
+        st.requests += 1
+        st.wire_bytes += wire
+        st.raw_bytes += raw
+    _LAST_TRANSFER.value = {"encoding": encoding, "wire_bytes": wire, "raw_bytes": raw}
+
+
+def transfer_stats() -> dict[str, dict[str, Any]]:
+    """Süreç boyunca kodlama başına gelen ağ / ham bayt sayaçları."""
+    with _TRANSFER_LOCK:
+        return {k: v.as_dict() for k, v in _TRANSFER.items()}
+
+
+def last_transfer() -> Optional[dict[str, Any]]:
+    """Bu thread'de tamamlanan son cevabın kodlaması ve ağ / ham boyutu."""
+    return getattr(_LAST_TRANSFER, "value", None)
+
+
+# Bu süreyi (ms) aşan çağrılar request id ve sunucu süresiyle loglanır (0: kapalı)
+_TRACE_MS = float(_env("UZMANRAPOR_API_TRACE_MS", "0"))
+_LAST_CALL = threading.local()
+_SERVER_TIMING = re.compile(r"\bapp;dur=([\d.]+)")
+
+
+def _record_call(
+    endpoint: str, request_id: str, status: int, started: float, headers: Any, attempts: int
+) -> None:
+    """Çağrının client süresini, sunucunun döndürdüğü request id ve Server-Timing ile eşleştirir."""
+    client_ms = (time.perf_counter() - started) * 1000.0
+    server_ms: Optional[float] = None
+    if headers is not None:
+        request_id = headers.get("X-Request-Id") or request_id
+        m = _SERVER_TIMING.search(headers.get("Server-Timing") or "")
+        if m:
+            server_ms = float(m.group(1))
+    call = {
+        "request_id": request_id,
+        "endpoint": endpoint,
+        "status": status,
+        "attempts": attempts,
+        "client_ms": round(client_ms, 1),
+        "server_ms": server_ms,
+    }
+    _LAST_CALL.value = call
+    if _TRACE_MS and client_ms >= _TRACE_MS:
+        server = f"{server_ms:.0f} ms" if server_ms is not None else "?"
+        print(f"[SQL API] {request_id} {endpoint} {status}: client {client_ms:.0f} ms, sunucu {server}, deneme {attempts}")
+
+
+def last_call() -> Optional[dict[str, Any]]:
+    """
+    Bu thread'deki son API çağrısı: request id (sunucu /metrics ve [SLOW] logları ile eşleşir),
+    uç nokta, durum, deneme sayısı, client süresi ve sunucu süresi (ms; akışlarda ilk bayta kadar).
+    """
+    return getattr(_LAST_CALL, "value", None)
+
+
+def _decompressor(encoding: str):
+    """Content-Encoding için parça parça açan nesne (decompress(bytes) -> bytes); tanınmazsa None."""
+    if encoding == "gzip":
+        return zlib.decompressobj(31)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+def _decode_body(encoding: str, data: bytes) -> bytes:
+    encoding = encoding.lower().strip()
+    if not encoding or encoding == "identity":
+        return data
+    dec = _decompressor(encoding)
+    if dec is None:
+        raise SqlApiError(f"SQL API desteklenmeyen Content-Encoding döndürdü: {encoding}")
+    try:
+        return dec.decompress(data)
+    except Exception as exc:
+        raise SqlApiError(f"SQL API cevabı açılamadı ({encoding}): {exc}") from exc
+
+
+class _DecodingReader:
+    """
+    Sıkıştırılmış akış cevabını (urllib) okundukça açar; _NdjsonStream için readline/close sağlar.
+    Ağ / ham bayt sayaçları akış kapanınca kaydedilir.
+    """
+
+    CHUNK = 64 * 1024
+
+    def __init__(self, resp, encoding: str) -> None:
+        self._resp = resp
+        self._encoding = encoding
+        self._dec = _decompressor(encoding)
+        if self._dec is None:
+            resp.close()
+            raise SqlApiError(f"SQL API desteklenmeyen Content-Encoding döndürdü: {encoding}")
+        self._buf = b""
+        self._eof = False
+        self._wire = 0
+        self._raw = 0
+        self._closed = False
+
+    def _fill(self) -> bool:
+        chunk = self._resp.read1(self.CHUNK) if hasattr(self._resp, "read1") else self._resp.read(self.CHUNK)
+        if not chunk:
+            self._eof = True
+            return False
+        self._wire += len(chunk)
+        try:
+            out = self._dec.decompress(chunk)
+        except Exception as exc:
+            raise SqlApiError(f"SQL API akışı açılamadı ({self._encoding}): {exc}") from exc
+        self._raw += len(out)
+        self._buf += out
+        return True
+
+    def readline(self) -> bytes:
+        while True:
+            idx = self._buf.find(b"\n")
+            if idx >= 0:
+                line, self._buf = self._buf[: idx + 1], self._buf[idx + 1 :]
+                return line
+            if self._eof or not self._fill():
+                line, self._buf = self._buf, b""
+                return line
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        _record_transfer(self._encoding, self._wire, self._raw)
+        self._resp.close()
+
+
+class _KeepAlive:
+    """
+    Thread başına kalıcı (keep-alive) HTTP bağlantısı. Her sorguda yeni TCP bağlantısı
+    açmak yerine aynı soket tekrar kullanılır; cevaplar zstd/gzip ile sıkıştırılmış gelebilir.
+    Sunucu boşta kalan bağlantıyı kapattıysa istek bir kez yeni bağlantıyla tekrarlanır; ancak
+    istek gönderildikten sonra (cevap beklenirken) kopan bağlantıda sunucu isteği işlemiş olabilir:
+    bu durumda yalnız ``idempotent`` (salt okuma) istekler tekrarlanır, yazmalar iki kez çalışmasın.
+    """
+
+    # uvicorn varsayılan keep-alive süresi 5 sn; bundan uzun boşta kalan soket yeniden açılır
+    IDLE_SEC = float(os.getenv("UZMANRAPOR_API_KEEPALIVE_SEC", "4") or 4)
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def _conns(self) -> dict[tuple[str, str], tuple[http.client.HTTPConnection, float]]:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def _get(self, scheme: str, netloc: str, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        conns = self._conns()
+        entry = conns.pop((scheme, netloc), None)
+        if entry is not None:
+            conn, last_used = entry
+            if time.monotonic() - last_used <= self.IDLE_SEC:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+            conn.close()
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=timeout), False
+
+    def post(
+        self, url: str, body: bytes, headers: Mapping[str, str], timeout: float, idempotent: bool = False
+    ) -> tuple[int, str, bytes, Any]:
+        """Dönüş: (durum, açıklama, açılmış gövde, cevap başlıkları)."""
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        hdrs = dict(headers)
+        hdrs["Accept-Encoding"] = _ACCEPT_ENCODING
+        hdrs["Connection"] = "keep-alive"
+
+        for attempt in (1, 2):
+            conn, reused = self._get(parts.scheme, parts.netloc, timeout)
+            sent = False
+            try:
+                conn.request("POST", path or "/", body=body, headers=hdrs)
+                sent = True
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                # yalnızca tekrar kullanılan (eskimiş olabilecek) bağlantıda yeniden dene;
+                # gövde tamamen gittiyse sunucu çalıştırmış olabilir: yalnız okumalar tekrarlanır
+                if reused and attempt == 1 and (not sent or idempotent):
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+
+            encoding = resp.getheader("Content-Encoding", "")
+            wire = len(data)
+            data = _decode_body(encoding, data)
+            _record_transfer(encoding.lower().strip(), wire, len(data))
+            if resp.will_close:
+                conn.close()
+            else:
+                self._conns()[(parts.scheme, parts.netloc)] = (conn, time.monotonic())
+            return resp.status, resp.reason, data, resp.headers
+        raise SqlApiError("SQL API bağlantı hatası: yeniden deneme başarısız")  # pragma: no cover
+
+
+_KEEPALIVE = _KeepAlive()
+
+
 class ApiConnection:
     """
     pyodbc benzeri minimal bir arayüz sağlayan HTTP tabanlı "bağlantı".
@@ -28,21 +441,80 @@ class ApiConnection:
         endpoint: Optional[str] = None,
         timeout: int = 30,
         token: Optional[str] = None,
+        stream: bool = False,
+        retries: Optional[int] = None,
     ) -> None:
         self.base_url = (base_url or _env("UZMANRAPOR_API_URL", "http://10.30.1.68:8000")).rstrip("/")
         raw_endpoint = endpoint or _env("UZMANRAPOR_SQL_ENDPOINT", "/sql")
         self.endpoint = raw_endpoint if raw_endpoint.startswith("/") else f"/{raw_endpoint}"
+        raw_batch = _env("UZMANRAPOR_SQL_BATCH_ENDPOINT", f"{self.endpoint}/batch")
+        self.batch_endpoint = raw_batch if raw_batch.startswith("/") else f"/{raw_batch}"
+        raw_stream = _env("UZMANRAPOR_SQL_STREAM_ENDPOINT", f"{self.endpoint}/stream")
+        self.stream_endpoint = raw_stream if raw_stream.startswith("/") else f"/{raw_stream}"
+        # stream=True: SELECT sonuçları NDJSON parçaları halinde, okundukça gelir
+        raw_arrow = _env("UZMANRAPOR_SQL_ARROW_ENDPOINT", f"{self.endpoint}/arrow")
+        self.arrow_endpoint = raw_arrow if raw_arrow.startswith("/") else f"/{raw_arrow}"
+        raw_stmt = _env("UZMANRAPOR_SQL_STMT_ENDPOINT", f"{self.endpoint}/stmt")
+        self.stmt_endpoint = raw_stmt if raw_stmt.startswith("/") else f"/{raw_stmt}"
+        raw_upsert = _env("UZMANRAPOR_SQL_UPSERT_ENDPOINT", f"{self.endpoint}/upsert")
+        self.upsert_endpoint = raw_upsert if raw_upsert.startswith("/") else f"/{raw_upsert}"
+        raw_cancel = _env("UZMANRAPOR_SQL_CANCEL_ENDPOINT", f"{self.endpoint}/cancel")
+        self.cancel_endpoint = raw_cancel if raw_cancel.startswith("/") else f"/{raw_cancel}"
+        self.stream = stream
+        self._open_streams: list["_NdjsonStream"] = []
         self.timeout = timeout
         self.token = token or _env("UZMANRAPOR_API_TOKEN", "")
+        # 503 cevaplarında jitter'lı bekleme ile en fazla bu kadar yeniden deneme
+        self.retries = max(0, retries if retries is not None else int(_env("UZMANRAPOR_API_RETRIES", "3")))
 
     def cursor(self) -> "ApiCursor":
         return ApiCursor(self)
 
+    def batch(self) -> "ApiBatch":
+        """Yazma ifadelerini biriktirip tek istekte/tek transaction'da gönderen yardımcı."""
+        return ApiBatch(self)
+
+    def execute_batch(self, statements: Sequence[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        statements: [{"query": ..., "params": [...]}, {"query": ..., "many": [[...], ...]}]
+        Tamamı API tarafında tek transaction'da çalışır; hata olursa hiçbiri uygulanmaz.
+        """
+        if not statements:
+            return []
+        data = self._request({"statements": list(statements)}, endpoint=self.batch_endpoint)
+        results = data.get("results")
+        if not isinstance(results, list):
+            raise SqlApiError("SQL API beklenmeyen batch cevabı döndürdü.")
+        return results
+
+    def upsert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Iterable[Any]],
+        database: str = "",
+    ) -> dict[str, int]:
+        """
+        Anahtar kolonlara göre ekle/güncelle (/sql/upsert); tüm satırlar tek istek, tek transaction.
+        Tablo ve anahtar kolonları API tarafında tanımlıdır. Dönüş: {"updated": n, "inserted": m}
+        """
+        payload = {
+            "table": table,
+            "columns": list(columns),
+            "rows": [_wire_params(r) for r in rows],
+            "database": database,
+        }
+        data = self._request(payload, endpoint=self.upsert_endpoint)
+        return {"updated": int(data.get("updated") or 0), "inserted": int(data.get("inserted") or 0)}
+
     def commit(self) -> None:
         return
 
     def close(self) -> None:
-        return
+        # Yarım okunmuş akışlar HTTP bağlantısını açık tutmasın
+        streams, self._open_streams = self._open_streams, []
+        for st in streams:
+            st.close()
 
     def __enter__(self) -> "ApiConnection":
         return self
@@ -50,24 +522,134 @@ class ApiConnection:
     def __exit__(self, exc_type, exc, tb) -> None:
         self.close()
 
-    def _request(self, payload: dict[str, Any]) -> dict[str, Any]:
-        url = f"{self.base_url}{self.endpoint}"
+    def _open(self, payload: dict[str, Any], endpoint: Optional[str] = None) -> tuple[Any, Callable[[], None]]:
+        """Akışlı istek; dönüş (cevap, bitti) — bitti() akış kapanınca çağrılmalı (iptal kaydını siler)."""
+        url = f"{self.base_url}{endpoint or self.endpoint}"
         data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        headers = {"Content-Type": "application/json"}
+        ctx, request_id = self._begin_call()
+        started = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                headers, budget = self._call_headers(ctx, request_id)
+                headers["Accept-Encoding"] = _ACCEPT_ENCODING
+                req = urllib.request.Request(url, data=data, headers=headers, method="POST")
+                try:
+                    resp = urllib.request.urlopen(req, timeout=budget + _DEADLINE_GRACE_SEC)
+                    break
+                except urllib.error.HTTPError as exc:
+                    if exc.code not in _RETRY_STATUSES or attempt >= self.retries:
+                        _record_call(endpoint or self.endpoint, request_id, exc.code, started, exc.headers, attempt + 1)
+                        raise self._http_error(exc) from exc
+                    retry_after = exc.headers.get("Retry-After")
+                    exc.close()
+                    self._sleep_before_retry(ctx, attempt, retry_after)
+                    attempt += 1
+                except urllib.error.URLError as exc:
+                    self._raise_transport(ctx, request_id, exc.reason, exc)
+                except OSError as exc:
+                    self._raise_transport(ctx, request_id, exc, exc)
+        except BaseException:
+            self._end_call(ctx, request_id)
+            raise
+        _record_call(endpoint or self.endpoint, request_id, resp.status, started, resp.headers, attempt + 1)
+        encoding = (resp.headers.get("Content-Encoding") or "").lower().strip()
+        if encoding and encoding != "identity":
+            resp = _DecodingReader(resp, encoding)
+        return resp, lambda: self._end_call(ctx, request_id)
+
+    def _headers(self) -> dict[str, str]:
+        headers = {"Content-Type": "application/json", "X-Client-Id": _CLIENT_ID}
         if self.token:
             headers["X-Token"] = self.token
-        req = urllib.request.Request(url, data=data, headers=headers, method="POST")
+        return headers
+
+    # --- süre sınırı / iptal ---------------------------------------------
+    def _begin_call(self) -> tuple[Optional[CallContext], str]:
+        ctx = current_context()
+        request_id = uuid.uuid4().hex
+        if ctx is not None:
+            ctx.check()
+            ctx._track(request_id, f"{self.base_url}{self.cancel_endpoint}", self.token)
+        return ctx, request_id
+
+    @staticmethod
+    def _end_call(ctx: Optional[CallContext], request_id: str) -> None:
+        if ctx is not None:
+            ctx._untrack(request_id)
+
+    def _call_headers(self, ctx: Optional[CallContext], request_id: str) -> tuple[dict[str, str], float]:
+        """Deneme başına başlıklar ve bu denemenin süresi (sn): bağlantı zaman aşımı ile ctx'in kalanı."""
+        if ctx is not None:
+            ctx.check()
+        budget = float(self.timeout)
+        left = ctx.remaining() if ctx is not None else None
+        if left is not None:
+            budget = min(budget, left)
+        headers = self._headers()
+        headers["X-Request-Id"] = request_id
+        headers["X-Deadline-Ms"] = str(max(1, int(budget * 1000)))
+        return headers, budget
+
+    @staticmethod
+    def _sleep_before_retry(ctx: Optional[CallContext], attempt: int, retry_after: Optional[str]) -> None:
+        delay = _backoff(attempt, retry_after)
+        left = ctx.remaining() if ctx is not None else None
+        if threading.current_thread() is threading.main_thread():
+            delay = min(delay, _RETRY_MAIN_MAX_SEC)
+        if left is not None and left <= delay:
+            raise QueryTimeout("SQL API meşgul; istek süresi yeniden denemeye yetmiyor.", status=503)
+        time.sleep(delay)
+
+    def _raise_transport(self, ctx: Optional[CallContext], request_id: str, reason: Any, exc: BaseException) -> None:
+        if ctx is not None and ctx.cancelled:
+            raise QueryCancelled("SQL isteği iptal edildi.") from exc
+        if isinstance(reason, TimeoutError):
+            # Client vazgeçti: sorgu sunucuda sürmesin
+            _cancel_async([(f"{self.base_url}{self.cancel_endpoint}", self.token, request_id)])
+            raise QueryTimeout(f"SQL API zaman aşımı: {reason}") from exc
+        raise SqlApiError(f"SQL API bağlantı hatası: {reason}") from exc
+
+    @staticmethod
+    def _http_error(exc: urllib.error.HTTPError) -> SqlApiError:
         try:
-            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-                body = resp.read().decode("utf-8")
-        except urllib.error.HTTPError as exc:
-            try:
-                msg = exc.read().decode("utf-8")
-            except Exception:
-                msg = ""
-            raise SqlApiError(f"SQL API hatası: {exc.code} {exc.reason} {msg}".strip()) from exc
-        except urllib.error.URLError as exc:
-            raise SqlApiError(f"SQL API bağlantı hatası: {exc.reason}") from exc
+            msg = _decode_body(exc.headers.get("Content-Encoding", ""), exc.read()).decode("utf-8")
+        except Exception:
+            msg = ""
+        return _api_error(exc.code, exc.reason, msg)
+
+    def _post(self, payload: dict[str, Any], endpoint: Optional[str] = None, idempotent: bool = False) -> bytes:
+        """
+        Cevabı tamamen okunan istekler: thread'in keep-alive bağlantısı üzerinden gider.
+        idempotent: salt okuma; gönderildikten sonra kopan bağlantıda da tekrarlanabilir.
+        """
+        url = f"{self.base_url}{endpoint or self.endpoint}"
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        ctx, request_id = self._begin_call()
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                headers, budget = self._call_headers(ctx, request_id)
+                try:
+                    status, reason, body, resp_headers = _KEEPALIVE.post(
+                        url, data, headers, budget + _DEADLINE_GRACE_SEC, idempotent
+                    )
+                except (OSError, http.client.HTTPException) as exc:
+                    self._raise_transport(ctx, request_id, exc, exc)
+                if status not in _RETRY_STATUSES or attempt >= self.retries:
+                    break
+                self._sleep_before_retry(ctx, attempt, resp_headers.get("Retry-After"))
+        finally:
+            self._end_call(ctx, request_id)
+        _record_call(endpoint or self.endpoint, request_id, status, started, resp_headers, attempt + 1)
+        if status >= 400:
+            raise _api_error(status, reason, body.decode("utf-8", errors="replace"))
+        return body
+
+    def _request(
+        self, payload: dict[str, Any], endpoint: Optional[str] = None, idempotent: bool = False
+    ) -> dict[str, Any]:
+        body = self._post(payload, endpoint, idempotent).decode("utf-8")
 
         try:
             data = json.loads(body)
@@ -80,22 +662,268 @@ class ApiConnection:
             raise SqlApiError("SQL API beklenmeyen cevap döndürdü.")
         return data
 
+    def fetch_arrow(self, query: str, params: Optional[Iterable[Any]] = None):
+        """
+        SELECT sonucunu Arrow tablosu (pyarrow.Table) olarak getirir; tipler sunucuda
+        SQL tiplerinden eşlenir. Kullanılamıyorsa ArrowUnavailable fırlatır.
+        """
+        global _ARROW_SERVER_OK, _ARROW_MISSING_REPORTED
+        if pa is None:
+            if not _ARROW_MISSING_REPORTED:
+                _ARROW_MISSING_REPORTED = True
+                print("[SQL API] pyarrow kurulu değil: Arrow modu kapalı, JSON yolu kullanılacak (pip install pyarrow)")
+            raise ArrowUnavailable("Arrow modu kullanılamıyor: pyarrow kurulu değil.")
+        if not _ARROW_SERVER_OK:
+            raise ArrowUnavailable("Arrow modu kullanılamıyor.")
+
+        payload = {"query": _clean_query(query), "params": _wire_params(params)}
+        try:
+            body = self._post(payload, self.arrow_endpoint, idempotent=_is_read(payload["query"]))
+        except SqlApiError as exc:
+            if exc.status in (404, 405, 501):
+                # Eski API sürümü / sunucuda pyarrow yok: bu oturumda bir daha deneme
+                _ARROW_SERVER_OK = False
+                raise ArrowUnavailable(str(exc), status=exc.status) from exc
+            raise
+        try:
+            return pa.ipc.open_stream(body).read_all()
+        except Exception as exc:
+            raise SqlApiError(f"SQL API geçersiz Arrow akışı döndürdü: {exc}") from exc
+
+    def _stream(self, payload: dict[str, Any]) -> "_NdjsonStream":
+        self._open_streams = [st for st in self._open_streams if not st.done]
+        resp, on_close = self._open(payload, self.stream_endpoint)
+        try:
+            stream = _NdjsonStream(resp, on_close)
+        except BaseException:
+            on_close()
+            resp.close()
+            raise
+        if not stream.done:
+            self._open_streams.append(stream)
+        return stream
+
+
+class _NdjsonStream:
+    """
+    /sql/stream cevabını satır satır okur:
+      {"columns": [...]}  ->  {"rows": [[...], ...]} ...  ->  {"done": true, "rowcount": n}
+    Sunucu akış ortasında hata verirse {"error": "..."} satırı gelir.
+    """
+
+    def __init__(self, resp, on_close: Optional[Callable[[], None]] = None) -> None:
+        self._resp = resp
+        self._on_close = on_close
+        self.done = False
+        self.rowcount: Optional[int] = None
+        self.affected_rows: Optional[int] = None
+        head = self._next_message()
+        if head is None:
+            raise SqlApiError("SQL API boş akış döndürdü.")
+        self.columns: list[str] = list(head.get("columns") or [])
+        self._pending: Optional[list[list[Any]]] = head.get("rows")
+        self._absorb(head)
+
+    def _next_message(self) -> Optional[dict[str, Any]]:
+        while True:
+            line = self._resp.readline()
+            if not line:
+                return None
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+                self.close()
+                raise SqlApiError("SQL API geçersiz akış satırı döndürdü.") from exc
+            if not isinstance(msg, dict):
+                continue
+            if msg.get("error"):
+                self.close()
+                raise SqlApiError(str(msg["error"]))
+            return msg
+
+    def _absorb(self, msg: dict[str, Any]) -> None:
+        if msg.get("done"):
+            self.done = True
+            self.rowcount = msg.get("rowcount")
+            self.affected_rows = msg.get("affected_rows")
+            self.close()
+
+    def next_rows(self) -> Optional[list[list[Any]]]:
+        """Bir sonraki satır parçasını döndürür; akış bittiyse None."""
+        if self._pending is not None:
+            rows, self._pending = self._pending, None
+            return rows
+        while not self.done:
+            msg = self._next_message()
+            if msg is None:
+                self.done = True
+                self.close()
+                break
+            self._absorb(msg)
+            rows = msg.get("rows")
+            if rows:
+                return rows
+        return None
+
+    def close(self) -> None:
+        self.done = True
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            on_close()
+        try:
+            self._resp.close()
+        except Exception:
+            pass
+
+
+# API /sql/arrow desteklemiyorsa (404/501) oturum boyunca JSON'a düşülür
+_ARROW_SERVER_OK = True
+# Client'ta pyarrow yoksa bu, ilk Arrow denemesinde bir kez bildirilir
+_ARROW_MISSING_REPORTED = False
+# Sunucuda kayıtlı olmayan ifade id'leri (eski API / bilinmeyen id): oturum boyunca metinle gönderilir
+_STMT_UNSUPPORTED: set[str] = set()
+# Yorum / boşluktan sonra SELECT ile başlayan sorgu (WITH ... yazma da olabilir: sayılmaz)
+_READ_RE = re.compile(r"^\s*(?:(?:--[^\n]*\n|/\*.*?\*/)\s*)*select\b", re.IGNORECASE | re.DOTALL)
+
+
+def _clean_query(query: str) -> str:
+    q = (query or "").strip()
+    if q.endswith(";"):
+        q = q[:-1].rstrip()  # sadece sondaki ; temizlensin
+    return q
+
+
+def _is_read(query: str) -> bool:
+    """Yalnız SELECT ile başlayan sorgular salt okuma sayılır (tekrar güvenli)."""
+    return _READ_RE.match(query or "") is not None
+
+
+def _wire_params(params: Optional[Iterable[Any]]) -> list[Any]:
+    """bytes parametreler JSON'da {"$b64": ...} olarak taşınır; API varbinary'ye bytes olarak bağlar."""
+    out = list(params or [])
+    for i, p in enumerate(out):
+        if isinstance(p, (bytes, bytearray, memoryview)):
+            out[i] = {"$b64": base64.b64encode(bytes(p)).decode("ascii")}
+    return out
+
+
+class ApiBatch:
+    """
+    execute/executemany çağrılarını biriktirir; flush() (veya with bloğu sonu)
+    hepsini tek /sql/batch isteğiyle, tek transaction içinde çalıştırır.
+
+        with conn.batch() as b:
+            b.execute("DELETE FROM dbo.X;")
+            b.executemany("INSERT INTO dbo.X (A) VALUES (?);", rows)
+
+    execute(..., expect_rows=n): ifade tam n satırı etkilemezse tüm batch geri alınır
+    ve WriteConflict fırlatılır (iyimser eşzamanlılık kontrolü için).
+    """
+
+    def __init__(self, conn: ApiConnection) -> None:
+        self._conn = conn
+        self._statements: list[dict[str, Any]] = []
+        self.results: list[dict[str, Any]] = []
+
+    def execute(
+        self, query: str, params: Optional[Iterable[Any]] = None, expect_rows: Optional[int] = None
+    ) -> "ApiBatch":
+        statement: dict[str, Any] = {"query": _clean_query(query), "params": _wire_params(params)}
+        if expect_rows is not None:
+            statement["expect_rows"] = int(expect_rows)
+        self._statements.append(statement)
+        return self
+
+    def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]) -> "ApiBatch":
+        rows = [_wire_params(p) for p in (seq_of_params or [])]
+        if rows:
+            self._statements.append({"query": _clean_query(query), "many": rows})
+        return self
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def flush(self) -> list[dict[str, Any]]:
+        statements, self._statements = self._statements, []
+        self.results = self._conn.execute_batch(statements)
+        return self.results
+
+    def __enter__(self) -> "ApiBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.flush()
+        else:
+            self._statements = []
+
+
+_SAFE_IDENT = re.compile(r"^\w+$")
+
 
 class ApiCursor:
+    arraysize: int = 1000
+
     def __init__(self, conn: ApiConnection) -> None:
         self._conn = conn
-        self._rows: list[list[Any]] = []
+        self._rows: deque[list[Any]] = deque()
+        # Satırlar parça parça geliyorsa bir sonraki parçayı getiren fonksiyon
+        self._more: Optional[Callable[[], Optional[list[list[Any]]]]] = None
+        self._stream: Optional[_NdjsonStream] = None
         self.description: Optional[list[tuple[Any, ...]]] = None
         self.rowcount: int = -1
 
+    def _reset(self) -> None:
+        self.close()
+        self._rows = deque()
+        self._more = None
+
+    def _set_columns(self, columns: Optional[Sequence[Any]]) -> None:
+        if columns:
+            self.description = [(col, None, None, None, None, None, None) for col in columns]
+        else:
+            self.description = None
+
     def execute(self, query: str, params: Optional[Iterable[Any]] = None) -> "ApiCursor":
-        q = (query or "").strip()
-        if q.endswith(";"):
-            q = q[:-1].rstrip()  # sadece sondaki ; temizlensin
+        q = _clean_query(query)
+        self._reset()
+
+        payload = {"query": q, "params": _wire_params(params)}
+        if self._conn.stream:
+            return self._execute_stream(payload)
+
+        return self._load(self._conn._request(payload, idempotent=_is_read(q)))
+
+    def execute_stmt(
+        self,
+        stmt_id: str,
+        params: Optional[Iterable[Any]] = None,
+        query: str = "",
+        database: str = "",
+    ) -> "ApiCursor":
+        """
+        Sunucuda kayıtlı, önceden doğrulanmış ifadeyi id ile çalıştırır (/sql/stmt).
+        query: aynı ifadenin metni; API bu id'yi tanımıyorsa (404) bununla /sql'e düşülür.
+        Akışlı bağlantıda (stream=True) metin /sql/stream ile gönderilir.
+        """
+        if stmt_id in _STMT_UNSUPPORTED or self._conn.stream:
+            return self.execute(query, params)
 
-        payload = {"query": q, "params": list(params or [])}
-        data = self._conn._request(payload)
+        self._reset()
+        payload = {"id": stmt_id, "params": _wire_params(params), "database": database}
+        try:
+            data = self._conn._request(payload, endpoint=self._conn.stmt_endpoint, idempotent=_is_read(query))
+        except SqlApiError as exc:
+            if exc.status not in (404, 405) or not query:
+                raise
+            _STMT_UNSUPPORTED.add(stmt_id)
+            return self.execute(query, params)
+        return self._load(data)
 
+    def _load(self, data: dict[str, Any]) -> "ApiCursor":
         rows = data.get("rows")
         columns = data.get("columns")
         if rows is None and "data" in data:
@@ -112,28 +940,203 @@ class ApiCursor:
                 columns = list(rows[0].keys())
             rows = [[row.get(col) for col in columns] for row in rows]
 
-        self._rows = [list(row) for row in rows]
-        if columns:
-            self.description = [(col, None, None, None, None, None, None) for col in columns]
-        else:
-            self.description = None
+        self._rows = deque(list(row) for row in rows)
+        self._set_columns(columns)
 
         self.rowcount = data.get("rowcount")
         if self.rowcount is None:
             self.rowcount = data.get("affected_rows", len(self._rows) if self._rows else -1)
         return self
 
+    def _execute_stream(self, payload: dict[str, Any]) -> "ApiCursor":
+        stream = self._conn._stream(payload)
+        self._stream = stream
+        self._set_columns(stream.columns)
+        self._more = stream.next_rows
+        if stream.done and stream.affected_rows is not None:
+            self.rowcount = int(stream.affected_rows)
+        else:
+            # satır sayısı akış bitene kadar bilinmez (pyodbc gibi -1)
+            self.rowcount = -1
+        return self
+
+    def execute_keyset(
+        self,
+        query: str,
+        key: str,
+        params: Optional[Iterable[Any]] = None,
+        page_size: int = 5000,
+    ) -> "ApiCursor":
+        """
+        Büyük SELECT'leri anahtar sütuna göre (keyset) sayfalayarak okur:
+            SELECT TOP (n) * FROM (<query>) AS _page WHERE _page.[key] > ? ORDER BY _page.[key]
+        query ORDER BY içermemeli ve key sütununu döndürmeli. Sonuç key'e göre artan sıradadır.
+        Her sayfa ayrı küçük bir istek olduğundan MAX_ROWS (413) sınırına takılmaz.
+        """
+        if not _SAFE_IDENT.match(key or ""):
+            raise ValueError(f"Geçersiz keyset sütunu: {key!r}")
+        base = _clean_query(query)
+        base_params = list(params or [])
+        size = max(1, int(page_size))
+
+        first_sql = f"SELECT TOP ({size}) * FROM ({base}) AS _page ORDER BY _page.[{key}]"
+        next_sql = f"SELECT TOP ({size}) * FROM ({base}) AS _page WHERE _page.[{key}] > ? ORDER BY _page.[{key}]"
+
+        page_cur = ApiCursor(self._conn)
+        page_cur.execute(first_sql, base_params)
+        first = [list(r) for r in page_cur.fetchall()]
+
+        self._reset()
+        self.description = page_cur.description
+        self.rowcount = -1
+        self._rows = deque(first)
+        if not first or not self.description:
+            return self
+
+        cols = [d[0] for d in self.description]
+        key_idx = next((i for i, c in enumerate(cols) if str(c).lower() == key.lower()), None)
+        if key_idx is None:
+            raise ValueError(f"Keyset sütunu sonuçta yok: {key}")
+
+        state = {"last": first[-1][key_idx], "full": len(first) >= size}
+
+        def _next_page() -> Optional[list[list[Any]]]:
+            if not state["full"]:
+                return None
+            page_cur.execute(next_sql, base_params + [state["last"]])
+            page = [list(r) for r in page_cur.fetchall()]
+            if not page:
+                state["full"] = False
+                return None
+            state["last"] = page[-1][key_idx]
+            state["full"] = len(page) >= size
+            return page
+
+        self._more = _next_page
+        return self
+
+    def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]) -> "ApiCursor":
+        """pyodbc executemany karşılığı: tüm satırlar tek istekte, tek transaction'da."""
+        self._reset()
+        results = self._conn.batch().executemany(query, seq_of_params).flush()
+        self.description = None
+        counts = [int(r.get("affected_rows") or 0) for r in results or []]
+        # API many ifadelerinde etkilenen satırı bilemez (-1): pyodbc gibi -1 (bilinmiyor)
+        self.rowcount = -1 if any(n < 0 for n in counts) else sum(counts)
+        return self
+
+    def _fill(self) -> bool:
+        """Tampon boşsa bir sonraki parçayı çeker; yeni satır geldiyse True."""
+        while not self._rows and self._more is not None:
+            chunk = self._more()
+            if chunk is None:
+                self._more = None
+                if self._stream is not None and self._stream.rowcount is not None:
+                    self.rowcount = int(self._stream.rowcount)
+                return False
+            self._rows.extend(list(r) for r in chunk)
+        return bool(self._rows)
+
     def fetchone(self) -> Optional[tuple[Any, ...]]:
-        if not self._rows:
+        if not self._rows and not self._fill():
             return None
-        row = self._rows.pop(0)
-        return tuple(row)
+        return tuple(self._rows.popleft())
+
+    def fetchmany(self, size: Optional[int] = None) -> list[tuple[Any, ...]]:
+        n = self.arraysize if size is None else max(0, int(size))
+        out: list[tuple[Any, ...]] = []
+        while len(out) < n and (self._rows or self._fill()):
+            out.append(tuple(self._rows.popleft()))
+        return out
 
     def fetchall(self) -> list[tuple[Any, ...]]:
-        rows = [tuple(row) for row in self._rows]
-        self._rows = []
-        return rows
+        out: list[tuple[Any, ...]] = []
+        while self._rows or self._fill():
+            out.extend(tuple(row) for row in self._rows)
+            self._rows.clear()
+        return out
+
+    def __iter__(self) -> Iterator[tuple[Any, ...]]:
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+
+def get_sql_connection(stream: bool = False) -> ApiConnection:
+    return ApiConnection(stream=stream)
+
+
+class AsyncApiConnection:
+    """
+    asyncio arayüzü. İstekler küçük bir thread havuzunda paralel çalışır; her thread kendi
+    keep-alive bağlantısını kullanır. Birbirinden bağımsız okumaları (ör. storage.load_*)
+    aynı anda göndermek için:
+
+        async with AsyncApiConnection() as api:
+            results, errors = await api.gather({"blocked": storage.load_blocked_looms, ...})
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, **conn_kwargs: Any) -> None:
+        workers = max_workers or int(_env("UZMANRAPOR_API_PARALLEL", "6"))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sql-api")
+        self._conn_kwargs = conn_kwargs
 
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Senkron bir çağrıyı (ör. storage fonksiyonu) havuzda çalıştırır; etkin CallContext taşınır."""
+        loop = asyncio.get_running_loop()
+        ctx = current_context()
 
-def get_sql_connection() -> ApiConnection:
-    return ApiConnection()
+        def _call() -> Any:
+            if ctx is None:
+                return fn(*args)
+            with ctx.active():
+                return fn(*args)
+
+        return await loop.run_in_executor(self._executor, _call)
+
+    async def execute(self, query: str, params: Optional[Iterable[Any]] = None) -> dict[str, Any]:
+        """Tek sorgu; /sql cevabını ({"columns", "rows", ...}) döndürür."""
+        conn = ApiConnection(**self._conn_kwargs)
+        payload = {"query": _clean_query(query), "params": _wire_params(params)}
+        return await self.run(conn._request, payload)
+
+    async def gather(
+        self,
+        calls: Mapping[str, Callable[[], Any]],
+        on_result: Optional[Callable[[str, Any], None]] = None,
+    ) -> tuple[dict[str, Any], dict[str, BaseException]]:
+        """
+        Tüm çağrıları aynı anda başlatır. Biri hata verse de diğerleri tamamlanır.
+        on_result: her sonuç geldiğinde (anahtar, değer) ile çağrılır.
+        """
+        results: dict[str, Any] = {}
+        errors: dict[str, BaseException] = {}
+
+        async def _one(key: str, fn: Callable[[], Any]) -> None:
+            try:
+                value = await self.run(fn)
+            except Exception as exc:
+                errors[key] = exc
+                return
+            results[key] = value
+            if on_result is not None:
+                on_result(key, value)
+
+        await asyncio.gather(*(_one(k, fn) for k, fn in calls.items()))
+        return results, errors
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncApiConnection":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.close()
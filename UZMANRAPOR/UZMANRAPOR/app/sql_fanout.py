@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Callable, Mapping
+
+from PySide6.QtCore import QObject, Signal, Slot
+
+from app.sql_api_client import AsyncApiConnection, CallContext, QueryCancelled
+
+
+class SqlFanout(QObject):
+    """
+    Birbirinden bağımsız SQL okumalarını arka planda tek dalgada (paralel) çalıştırır,
+    sonuçları Qt sinyalleriyle ana thread'e taşır.
+
+        fan = SqlFanout(self)
+        fan.finished.connect(self._on_data)   # (results: dict, errors: dict)
+        fan.start({"blocked": storage.load_blocked_looms, "dummy": storage.load_dummy_looms})
+
+    Sinyaller worker thread'inden yayılır; alıcı ana thread'de olduğu için Qt bunları
+    kuyruklu (queued) bağlantıyla GUI thread'inde çalıştırır.
+    """
+
+    resultReady = Signal(str, object)   # (anahtar, değer) — her çağrı bitince
+    failed = Signal(str, str)           # (anahtar, hata mesajı)
+    finished = Signal(object, object)   # (results: dict, errors: dict) — dalga bitince
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._thread: threading.Thread | None = None
+        self._ctx: CallContext | None = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, calls: Mapping[str, Callable[[], Any]], timeout: float | None = None) -> None:
+        """timeout: dalganın tamamı için süre sınırı (sn); dolunca sunucudaki sorgular da durur."""
+        if self.is_running():
+            raise RuntimeError("SqlFanout zaten çalışıyor")
+        calls = dict(calls)
+        ctx = self._ctx = CallContext(timeout)
+        self._thread = threading.Thread(
+            target=lambda: asyncio.run(self._run(calls, ctx)),
+            name="sql-fanout",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """Süren dalgayı iptal eder (ör. pencere kapandı); sunucudaki sorgular da durdurulur."""
+        if self._ctx is not None:
+            self._ctx.cancel()
+
+    async def _run(self, calls: dict[str, Callable[[], Any]], ctx: CallContext) -> None:
+        results: dict[str, Any] = {}
+        errors: dict[str, BaseException] = {}
+        try:
+            with ctx.active():
+                async with AsyncApiConnection(max_workers=len(calls) or 1) as api:
+                    results, errors = await api.gather(calls, on_result=self.resultReady.emit)
+            for key, exc in errors.items():
+                self.failed.emit(key, str(exc))
+        finally:
+            self.finished.emit(results, errors)
+
+
+class SqlLatest(QObject):
+    """
+    Aynı yeri dolduran isteklerden yalnız EN SON gönderileni teslim eder. Yeni istek gelince
+    öncekinin sunucudaki sorgusu iptal edilir (ör. filtre değişti); sahibi yok olunca da.
+
+        self._table_req = SqlLatest(self)
+        self._table_req.ready.connect(self._show_df)
+        self._table_req.submit(lambda: self._select(start, end), timeout=60)
+    """
+
+    ready = Signal(object)   # fn() sonucu
+    failed = Signal(str)     # hata mesajı (iptal edilenler bildirilmez)
+
+    _done = Signal(int, bool, object)  # (sıra no, başarılı mı, sonuç / hata) — worker'dan
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self._seq = 0
+        self._ctx: CallContext | None = None
+        self._done.connect(self._on_done)
+        if parent is not None:
+            parent.destroyed.connect(self.cancel)
+
+    def submit(self, fn: Callable[[], Any], timeout: float | None = None) -> None:
+        self.cancel()
+        self._seq += 1
+        seq = self._seq
+        ctx = self._ctx = CallContext(timeout)
+
+        def _run() -> None:
+            try:
+                with ctx.active():
+                    value = fn()
+            except QueryCancelled:
+                return
+            except Exception as exc:
+                if not ctx.cancelled:
+                    self._done.emit(seq, False, str(exc))
+                return
+            if not ctx.cancelled:
+                self._done.emit(seq, True, value)
+
+        threading.Thread(target=_run, name="sql-latest", daemon=True).start()
+
+    def cancel(self) -> None:
+        if self._ctx is not None:
+            self._ctx.cancel()
+            self._ctx = None
+
+    def is_pending(self) -> bool:
+        return self._ctx is not None
+
+    @Slot(int, bool, object)
+    def _on_done(self, seq: int, ok: bool, value: Any) -> None:
+        # Sinyal kuyrukta beklerken daha yeni bir istek gönderilmiş olabilir
+        if seq != self._seq:
+            return
+        self._ctx = None
+        if ok:
+            self.ready.emit(value)
+        else:
+            self.failed.emit(value)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from typing import List, Dict
@@ -8,13 +9,20 @@ import base64
 import re
 import secrets
 import hashlib
-import io
-import pickle
-import zlib
+import os
+import time
+import uuid
+from pathlib import Path
 
 import pandas as pd
-from app.sql_api_client import ApiConnection, get_sql_connection
+from app import note_rules, snapshot_codec
+from app.etiket_index import EtiketIndex
+from app.ref_cache import RefCache
+from app.sql_api_client import (
+    ApiBatch, ApiConnection, ArrowUnavailable, SqlApiError, WriteConflict, get_sql_connection, last_call,
+)
 from app.db_name import DB_NAME
+from io_layer import parse_cache
 
 
 
@@ -27,11 +35,39 @@ def _sql_conn() -> ApiConnection:
     return get_sql_connection()
 
 
-def _fetch_dataframe(sql: str, params: tuple | list | None = None) -> pd.DataFrame:
-    """API cursor ile DataFrame üretir (pd.read_sql yerine)."""
+def _api_trace() -> str:
+    """Son API çağrısının request id'si ve sunucu süresi (API'nin /metrics ve [SLOW] loglarıyla eşleştirmek için)."""
+    call = last_call()
+    if not call:
+        return ""
+    server = f", sunucu {call['server_ms']:.0f} ms" if call.get("server_ms") is not None else ""
+    return f" [istek {call['request_id']}{server}]"
+
+
+def _fetch_dataframe(
+    sql: str,
+    params: tuple | list | None = None,
+    keyset_key: str | None = None,
+) -> pd.DataFrame:
+    """
+    API üzerinden DataFrame üretir (pd.read_sql yerine).
+    Önce Arrow modu denenir: tipler sunucudan gelir (tarih -> datetime64, sayı -> int64/float64).
+    pyarrow / /sql/arrow yoksa JSON satırlarına düşülür; keyset_key verilirse JSON yolu
+    o sütuna göre sayfalı okur.
+    """
     with _sql_conn() as c:
+        try:
+            table = c.fetch_arrow(sql, params or [])
+        except ArrowUnavailable:
+            table = None
+        if table is not None:
+            return table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+
         cur = c.cursor()
-        cur.execute(sql, params or [])
+        if keyset_key:
+            cur.execute_keyset(sql, key=keyset_key, params=params or [])
+        else:
+            cur.execute(sql, params or [])
         rows = cur.fetchall()
         columns = [d[0] for d in cur.description] if cur.description else []
     return pd.DataFrame(rows, columns=columns)
@@ -51,7 +87,10 @@ def _meta_get(key: str) -> str | None:
     try:
         with _sql_conn() as c:
             cur = c.cursor()
-            cur.execute(f"SELECT MetaValue FROM [{DB_NAME}].[dbo].[AppMeta] WHERE MetaKey = ?;", (key,))
+            cur.execute_stmt(
+                "meta.get", (key,),
+                f"SELECT MetaValue FROM [{DB_NAME}].[dbo].[AppMeta] WHERE MetaKey = ?;", DB_NAME,
+            )
             row = cur.fetchone()
         if not row:
             return None
@@ -60,44 +99,258 @@ def _meta_get(key: str) -> str | None:
         return None
 
 
-def _meta_set(key: str, value: str | None) -> None:
+def _meta_get_many(keys: tuple[str, ...]) -> dict[str, str | None]:
+    """Birden çok AppMeta anahtarı tek sorguyla; _meta_get'ten farklı olarak okuma hatası yayılır."""
     _ensure_meta_table()
-    try:
-        with _sql_conn() as c:
-            cur = c.cursor()
+    with _sql_conn() as c:
+        cur = c.cursor()
+        cur.execute(
+            f"SELECT MetaKey, MetaValue FROM [{DB_NAME}].[dbo].[AppMeta] "
+            f"WHERE MetaKey IN ({', '.join(['?'] * len(keys))});",
+            keys,
+        )
+        rows = cur.fetchall()
+    return {str(r[0]): r[1] for r in rows}
 
-            # 1) Önce UPDATE dene
-            cur.execute(
-                f"UPDATE [{DB_NAME}].[dbo].[AppMeta] "
-                "SET MetaValue = ?, UpdatedAt = SYSUTCDATETIME() "
-                "WHERE MetaKey = ?",
-                (value, key),
-            )
 
-            # 2) Rowcount API’de güvenilir olmayabilir; var mı diye kontrol et
-            cur.execute(
-                f"SELECT COUNT(*) FROM [{DB_NAME}].[dbo].[AppMeta] WHERE MetaKey = ?",
-                (key,),
-            )
-            cnt = cur.fetchone()[0] if cur.fetchone is not None else 0
+# API /sql/upsert desteklemiyorsa oturum boyunca eski yola düşülür
+_UPSERT_SERVER_OK = True
+
+
+def _upsert(table: str, keys: tuple[str, ...], columns: list[str], rows: list[tuple]) -> None:
+    """
+    Tek istek / tek transaction ekle-güncelle (API /sql/upsert).
+    Eski API'de (404) satır başına UPDATE + COUNT + INSERT yoluna düşülür.
+    """
+    global _UPSERT_SERVER_OK
+    if not rows:
+        return
+    with _sql_conn() as c:
+        if _UPSERT_SERVER_OK:
+            try:
+                c.upsert(table, columns, rows, database=DB_NAME)
+                return
+            except SqlApiError as e:
+                if e.status not in (404, 405):
+                    raise
+                _UPSERT_SERVER_OK = False
 
-            if cnt == 0:
+        cur = c.cursor()
+        set_cols = [col for col in columns if col not in keys]
+        touch = ", UpdatedAt = SYSUTCDATETIME()" if table == "AppMeta" else ""
+        where = " AND ".join(f"{k} = ?" for k in keys)
+        for row in rows:
+            vals = dict(zip(columns, row))
+            key_vals = tuple(vals[k] for k in keys)
+            if set_cols:
+                cur.execute(
+                    f"UPDATE [{DB_NAME}].[dbo].[{table}] SET "
+                    + ", ".join(f"{col} = ?" for col in set_cols) + touch + f" WHERE {where}",
+                    tuple(vals[col] for col in set_cols) + key_vals,
+                )
+            # Rowcount API’de güvenilir olmayabilir; var mı diye kontrol et
+            cur.execute(f"SELECT COUNT(*) FROM [{DB_NAME}].[dbo].[{table}] WHERE {where}", key_vals)
+            if cur.fetchone()[0] == 0:
+                ins_cols = list(columns) + (["UpdatedAt"] if touch else [])
+                ins_vals = ", ".join(["?"] * len(columns) + (["SYSUTCDATETIME()"] if touch else []))
                 cur.execute(
-                    f"INSERT INTO [{DB_NAME}].[dbo].[AppMeta] (MetaKey, MetaValue, UpdatedAt) "
-                    "VALUES (?, ?, SYSUTCDATETIME())",
-                    (key, value),
+                    f"INSERT INTO [{DB_NAME}].[dbo].[{table}] ({', '.join(ins_cols)}) VALUES ({ins_vals})",
+                    tuple(row),
                 )
+        c.commit()
 
-            c.commit()
+
+def _meta_set(key: str, value: str | None) -> None:
+    _ensure_meta_table()
+    try:
+        _upsert("AppMeta", ("MetaKey",), ["MetaKey", "MetaValue"], [(key, value)])
     except Exception as e:
         print(f"[APPMETA] yazma hatası: {e!r}")
 
 
+# ============================================================
+#  REFERANS TABLOLARI ÖNBELLEĞİ
+#  Her tablonun sürüm damgası AppMeta'da "ver:<Tablo>" anahtarında tutulur; storage üzerinden
+#  yapılan her kayıt damgayı yeniler. Client tüm damgaları tek sorguyla kontrol eder
+#  (en fazla UZMANRAPOR_REF_CHECK_SEC saniyede bir); değişmeyen tablolar için istek atılmaz.
+# ============================================================
+
+_VERSION_PREFIX = "ver:"
+
+
+def _fetch_ref_versions() -> dict[str, str]:
+    with _sql_conn() as c:
+        cur = c.cursor()
+        cur.execute_stmt(
+            "meta.versions", (_VERSION_PREFIX + "%",),
+            f"SELECT MetaKey, MetaValue FROM [{DB_NAME}].[dbo].[AppMeta] WHERE MetaKey LIKE ?;", DB_NAME,
+        )
+        rows = cur.fetchall()
+    return {str(r[0])[len(_VERSION_PREFIX):]: str(r[1] or "") for r in rows}
+
+
+_REF_CACHE = RefCache(
+    _fetch_ref_versions,
+    check_sec=float(os.getenv("UZMANRAPOR_REF_CHECK_SEC") or "5"),
+    max_age=float(os.getenv("UZMANRAPOR_REF_MAX_AGE_SEC") or "600"),
+    enabled=(os.getenv("UZMANRAPOR_REF_CACHE") or "1").lower() not in {"0", "false", "no"},
+)
+
+
+def cached_ref(table: str, key: str, loader):
+    """loader() sonucunu tablonun sürüm damgasına bağlı önbellekten verir (loader hatası yayılır)."""
+    return _REF_CACHE.get(table, key, loader)
+
+
+def touch_ref(table: str) -> str | None:
+    """
+    Tabloya yazıldıktan sonra çağrılır: damgayı yeniler (diğer client'lar yeniden yükler) ve
+    yerel girdileri düşürür. Dönüş yeni damga; yazılamazsa None.
+    """
+    version = uuid.uuid4().hex
+    try:
+        _upsert("AppMeta", ("MetaKey",), ["MetaKey", "MetaValue"], [(_VERSION_PREFIX + table, version)])
+    except Exception as e:
+        print(f"[REFCACHE] {table} sürümü yazılamadı: {e!r}")
+        version = None
+    _REF_CACHE.invalidate(table, version)
+    return version
+
+
+def ref_cache_stats() -> dict:
+    """Önbellek isabet / yeniden yükleme sayaçları, girdiler ve bilinen sürüm damgaları."""
+    return _REF_CACHE.snapshot()
+
+
+def clear_ref_cache() -> None:
+    _REF_CACHE.invalidate()
+
+
+# ============================================================
+#  FARK TABANLI KAYIT (iyimser eşzamanlılık)
+#  Kayıtlar tabloyu silip baştan yazmaz: editörün okuduğu hale (Baseline) göre yalnız eklenen,
+#  değişen ve silinen satırlar gönderilir. Aynı batch'in ilk ifadesi tablonun sürüm damgasını,
+#  okunduğu andaki değerden yenisine çevirir (expect_rows=1); arada başka client kaydettiyse
+#  hiçbir şey yazılmaz. Taban editöre load_*_for_edit ile verilir ve save_*'e geri geçilir.
+# ============================================================
+
+class SaveConflict(RuntimeError):
+    """Tablo son okunduğundan beri başka bir kullanıcı tarafından değiştirildi; kayıt uygulanmadı."""
+
+
+@dataclass
+class Baseline:
+    """
+    Editörün okuduğu hal: satırlar ({anahtar: diğer kolonlar}) ve okumadan önce görülen sürüm damgası.
+    checked=False: damga sorgusu hata verdi; kayıt çakışma kontrolü yapmadan damgayı yeniler.
+    Başarılı kayıttan sonra yerinde güncellenir; editör aynı nesneyle kaydetmeye devam eder.
+    """
+
+    table: str
+    rows: dict[tuple, tuple]
+    version: str | None
+    checked: bool = True
+
+
+def _load_tracked(table: str, loader, rows_of) -> tuple:
+    """Önbellekten / DB'den okur; (değer, fark kaydının tabanı)."""
+    value, version, checked = _REF_CACHE.get_versioned(table, "", loader)
+    return value, Baseline(table, rows_of(value), version, checked)
+
+
+def _version_guard(b: ApiBatch, base: Baseline, new_version: str) -> None:
+    key = _VERSION_PREFIX + base.table
+    meta = f"[{DB_NAME}].[dbo].[AppMeta]"
+    insert = (
+        f"INSERT INTO {meta} (MetaKey, MetaValue, UpdatedAt) SELECT ?, ?, SYSUTCDATETIME() "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {meta} WHERE MetaKey = ?);"
+    )
+    if not base.checked:
+        # Okurken damga doğrulanamadı: çakışma denetlenemez, damga yine de yenilenir
+        b.execute(f"UPDATE {meta} SET MetaValue = ?, UpdatedAt = SYSUTCDATETIME() WHERE MetaKey = ?;", (new_version, key))
+        b.execute(insert, (key, new_version, key))
+    elif base.version is None:
+        # Damga hiç yazılmamış: ilk kaydeden oluşturur, aynı anda oluşturan varsa çakışma
+        b.execute(insert, (key, new_version, key), expect_rows=1)
+    else:
+        b.execute(
+            f"UPDATE {meta} SET MetaValue = ?, UpdatedAt = SYSUTCDATETIME() WHERE MetaKey = ? AND MetaValue = ?;",
+            (new_version, key, base.version),
+            expect_rows=1,
+        )
+
+
+def _conflict(table: str) -> SaveConflict:
+    _REF_CACHE.invalidate(table)
+    return SaveConflict(f"{table} başka bir kullanıcı tarafından değiştirildi; listeyi yenileyip tekrar deneyin.")
+
+
+def _save_diff(
+    table: str,
+    keys: tuple[str, ...],
+    columns: tuple[str, ...],
+    rows: dict[tuple, tuple],
+    base: Baseline | None,
+    load_for_edit,
+) -> str | None:
+    """
+    rows'u ({anahtar: diğer kolonlar}) editörün okuduğu hale (base) göre fark olarak, tek istek /
+    tek transaction yazar. base verilmezse tablonun şu anki hali okunur (tam liste kaydı).
+    Dönüş yeni sürüm damgası (değişiklik yoksa None); çakışmada SaveConflict.
+    """
+    if base is None:
+        base = load_for_edit()[1]
+        if base is None:
+            raise RuntimeError(f"{table} okunamadı")
+    deletes = [k for k in base.rows if k not in rows]
+    updates = [v + k for k, v in rows.items() if k in base.rows and base.rows[k] != v]
+    inserts = [k + v for k, v in rows.items() if k not in base.rows]
+    if not (deletes or updates or inserts):
+        return None
+
+    target = f"[{DB_NAME}].[dbo].[{table}]"
+    where = " AND ".join(f"{k} = ?" for k in keys)
+    new_version = uuid.uuid4().hex
+    try:
+        with _sql_conn() as c:
+            with c.batch() as b:
+                _version_guard(b, base, new_version)
+                b.executemany(f"DELETE FROM {target} WHERE {where};", deletes)
+                if columns:
+                    b.executemany(
+                        f"UPDATE {target} SET {', '.join(f'{col} = ?' for col in columns)} WHERE {where};", updates
+                    )
+                b.executemany(
+                    f"INSERT INTO {target} ({', '.join(keys + columns)}) "
+                    f"VALUES ({', '.join(['?'] * (len(keys) + len(columns)))});",
+                    inserts,
+                )
+    except WriteConflict as e:
+        raise _conflict(table) from e
+
+    base.rows, base.version, base.checked = dict(rows), new_version, True
+    _REF_CACHE.invalidate(table, new_version)
+    return new_version
+
+
+def _loom_rows(items) -> dict[tuple, tuple]:
+    return {(str(x),): () for x in items or []}
+
+
 
 # ============================================================
 #  NOT KURALLARI (SQL)
+#  Kurallar AppMeta.note_rules_json'da JSON olarak tutulur. Geçiş dönemi: eski client'lar
+#  AppMeta.note_rules / NoteRules.RuleData'yı base64 pickle olarak okur; hâlâ kullanılıyorlarsa
+#  UZMANRAPOR_LEGACY_RULES=1 ile yeni client bunları da yazar (varsayılan kapalı: pickle yazılmaz).
+#  Eski kayıtlar normal okumada açılmaz: JSON kaydı yoksa ya da eski client arada kaydetmişse
+#  (parmak izi tutmaz) kısıtlı unpickler ile bir kez çevrilip JSON kaydı yazılır.
 # ============================================================
 
+_LEGACY_RULES = (os.getenv("UZMANRAPOR_LEGACY_RULES") or "0").lower() in {"1", "true", "yes"}
+_RULES_KEY = "note_rules_json"
+_LEGACY_RULES_KEY = "note_rules"
+
 def _note_rules_table_exists() -> bool:
     sql = """
     SELECT 1
@@ -114,94 +367,119 @@ def _note_rules_table_exists() -> bool:
         return False
 
 
-def _decode_rules_from_meta(raw: str | bytes | None) -> list[dict]:
-    if not raw:
-        return []
-    try:
-        if isinstance(raw, bytes):
-            raw = raw.decode("utf-8", errors="ignore")
-        blob = base64.b64decode(raw)
-        obj = pickle.loads(blob)
-        if isinstance(obj, list):
-            return [r for r in obj if isinstance(r, dict)]
-    except Exception:
-        pass
-    return []
+def load_rules() -> list[dict]:
+    return load_rules_for_edit()[0]
 
 
-def load_rules() -> list[dict]:
-    meta_rules = _decode_rules_from_meta(_meta_get("note_rules"))
-    if meta_rules:
-        return meta_rules
+def load_rules_for_edit() -> tuple[list[dict], Baseline]:
+    """Kurallar ve kayıttaki çakışma kontrolü için taban (damga okumadan önce alınır)."""
+    version, checked = _REF_CACHE.version_info("NoteRules")
+    return _read_rules(), Baseline("NoteRules", {}, version, checked)
 
-    if not _note_rules_table_exists():
-        return []
 
-    rules: list[dict] = []
+def _read_rules() -> list[dict]:
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute("SELECT RuleData FROM dbo.NoteRules ORDER BY Id;")
-            rows = cur.fetchall()
+        meta = _meta_get_many((_RULES_KEY, _LEGACY_RULES_KEY))
+    except Exception as e:
+        print(f"[NoteRules] okuma hatası: {e!r}")
+        return []
+    legacy = meta.get(_LEGACY_RULES_KEY)
+    record = note_rules.decode_record(meta.get(_RULES_KEY))
+    if record is not None and record[1] == note_rules.fingerprint(legacy):
+        return record[0]
+    return _migrate_rules(legacy)
 
+
+def _migrate_rules(legacy: str | None) -> list[dict]:
+    """Eski kayıtlardan (AppMeta.note_rules, yoksa NoteRules tablosu) kuralları çevirip JSON kaydını yazar."""
+    rules = note_rules.migrate_rules(legacy)
+    if not rules and _note_rules_table_exists():
+        try:
+            with _sql_conn() as c:
+                cur = c.cursor()
+                cur.execute("SELECT RuleData FROM dbo.NoteRules ORDER BY Id;")
+                rows = cur.fetchall()
+        except Exception as e:
+            print(f"[NoteRules] okuma hatası: {e!r}")
+            return []
         for row in rows:
-            blob = row[0]
-            if blob is None:
-                continue
+            rule = note_rules.migrate_rule(row[0])
+            if rule is not None:
+                rules.append(rule)
+    _meta_set(_RULES_KEY, note_rules.encode_record(rules, legacy))
+    return rules
+
+
+def _note_rule_rows() -> list[tuple[int, bytes]]:
+    """NoteRules tablosunun mevcut hali [(Id, RuleData), ...] (Id sırasıyla; API varbinary'yi base64 döner)."""
+    with _sql_conn() as c:
+        cur = c.cursor()
+        cur.execute("SELECT Id, RuleData FROM dbo.NoteRules ORDER BY Id;")
+        rows = cur.fetchall()
+    out: list[tuple[int, bytes]] = []
+    for rid, data in rows:
+        if isinstance(data, str):
             try:
-                # API tarafında RuleData nvarchar(max) base64 string tutuluyorsa:
-                if isinstance(blob, str):
-                    blob = base64.b64decode(blob)
-                rule = pickle.loads(blob)
-                if isinstance(rule, dict):
-                    rules.append(rule)
+                data = base64.b64decode(data)
             except Exception:
-                continue
-    except Exception:
-        pass
-
-    return rules
+                data = b""
+        out.append((int(rid), bytes(data or b"")))
+    return out
 
 
-def save_rules(rules: list[dict]) -> None:
+def save_rules(rules: list[dict], base: Baseline | None = None) -> bool:
+    """
+    AppMeta blob'u ve (varsa) NoteRules tablosu tek batch'te yazılır; tabloda yalnız değişen
+    sıralar güncellenir, fazlası eklenir / silinir (sıra Id ile korunur).
+    base: kuralların okunduğu hal (load_rules_for_edit); verilmezse çakışma kontrolü şu anki damgayla.
+    Dönüş: kaydedildi mi; kurallar başka kullanıcı tarafından değiştirildiyse SaveConflict.
+    """
     if not isinstance(rules, list):
-        return
+        return False
 
     cleaned = [r for r in rules if isinstance(r, dict)]
-
-    # AppMeta'ya base64 pickle olarak yaz
-    try:
-        if cleaned:
-            blob = pickle.dumps(cleaned)
-            payload = base64.b64encode(blob).decode("ascii")
-            _meta_set("note_rules", payload)
-        else:
-            _meta_set("note_rules", None)
-    except Exception:
-        pass
-
-    # NoteRules tablosu varsa orayı da güncelle
-    if not _note_rules_table_exists():
-        return
-
+    # Eski client'lar için base64 pickle (geçiş dönemi); kapalıysa eski anahtar boşaltılır
+    legacy = note_rules.encode_legacy_rules(cleaned) if _LEGACY_RULES and cleaned else None
+    record = note_rules.encode_record(cleaned, legacy)
+
+    if base is None:
+        base = Baseline("NoteRules", {}, *_REF_CACHE.version_info("NoteRules"))
+    new_version = uuid.uuid4().hex
+    meta = f"[{DB_NAME}].[dbo].[AppMeta]"
     try:
+        current = _note_rule_rows() if _LEGACY_RULES and _note_rules_table_exists() else None
+        # RuleData varbinary: bytes bağlanır ({"$b64": ...}); str olarak nvarchar -> varbinary dönüşümü hata verir
+        blobs = [base64.b64decode(note_rules.encode_legacy_rule(r)) for r in cleaned] if current is not None else []
         with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute("DELETE FROM dbo.NoteRules;")
+            with c.batch() as b:
+                _version_guard(b, base, new_version)
+                for key, value in ((_RULES_KEY, record), (_LEGACY_RULES_KEY, legacy)):
+                    b.execute(
+                        f"UPDATE {meta} SET MetaValue = ?, UpdatedAt = SYSUTCDATETIME() WHERE MetaKey = ?;",
+                        (value, key),
+                    )
+                    b.execute(
+                        f"INSERT INTO {meta} (MetaKey, MetaValue, UpdatedAt) SELECT ?, ?, SYSUTCDATETIME() "
+                        f"WHERE NOT EXISTS (SELECT 1 FROM {meta} WHERE MetaKey = ?);",
+                        (key, value, key),
+                    )
+                if current is not None:
+                    ids = [rid for rid, _ in current]
+                    b.executemany(
+                        "UPDATE dbo.NoteRules SET RuleData = ? WHERE Id = ?;",
+                        [(blob, ids[i]) for i, blob in enumerate(blobs[: len(ids)]) if current[i][1] != blob],
+                    )
+                    b.executemany("DELETE FROM dbo.NoteRules WHERE Id = ?;", [(rid,) for rid in ids[len(blobs):]])
+                    b.executemany("INSERT INTO dbo.NoteRules (RuleData) VALUES (?);", [(blob,) for blob in blobs[len(ids):]])
+    except WriteConflict as e:
+        raise _conflict("NoteRules") from e
+    except Exception as e:
+        print(f"[NoteRules] yazma hatası: {e!r}")
+        return False
 
-            for rule in cleaned:
-                try:
-                    blob = pickle.dumps(rule)
-                except Exception:
-                    continue
-                payload_blob = base64.b64encode(blob).decode("ascii")
-                cur.execute(
-                    "INSERT INTO dbo.NoteRules (RuleData) VALUES (?);",
-                    (payload_blob,),
-                )
-            c.commit()
-    except Exception:
-        pass
+    base.version, base.checked = new_version, True
+    _REF_CACHE.invalidate("NoteRules", new_version)
+    return True
 
 
 # ============================================================
@@ -230,61 +508,132 @@ def save_last_update(dt: datetime) -> None:
 # ============================================================
 #  SNAPSHOTS
 #  Not: API modunda DDL yok. [{DB_NAME}].[dbo].[Snapshots] SSMS’de hazır olmalı.
+#  Yeni biçim (app.snapshot_codec) varbinary kolona yazılır:
+#      ALTER TABLE dbo.Snapshots ADD Data varbinary(max) NULL;
+#  Kolon henüz yoksa aynı biçim hex olarak DataHex'e yazılır; eski pickle kayıtları okunmaya devam eder.
+#  Geçiş dönemi: güncellenmemiş client'lar yalnız DataHex'teki zlib(pickle) biçimini okuyabilir.
+#  UZMANRAPOR_LEGACY_SNAPSHOTS=1 ile bu biçim de DataHex'e yazılır (varsayılan kapalı: eski biçim
+#  yeni blob'un ~5 katı boyutta ve kodlaması ~3 kat yavaş).
 # ============================================================
 
+_LEGACY_SNAPSHOTS = (os.getenv("UZMANRAPOR_LEGACY_SNAPSHOTS") or "0").lower() in {"1", "true", "yes"}
+
+# Snapshots.Data kolonu yoksa oturum boyunca DataHex yoluna düşülür
+_SNAPSHOT_BINARY_OK = True
+# Bu kurulumda çözülemeyen snapshot'lar (ör. pyarrow yok): which -> hata metni
+_SNAPSHOT_DECODE_ERRORS: dict[str, str] = {}
+
+
 def _ensure_snapshot_table() -> None:
     return
 
 
+def _is_missing_column(exc: Exception, column: str) -> bool:
+    return "invalid column name" in str(exc).lower() and column.lower() in str(exc).lower()
+
+
 def save_df_snapshot(df: pd.DataFrame | None, which: str) -> None:
+    global _SNAPSHOT_BINARY_OK
     if df is None:
         return
 
     _ensure_snapshot_table()
 
     try:
-        buf = io.BytesIO()
-        df.to_pickle(buf)
-        raw_bytes = buf.getvalue()
-
-        compressed = zlib.compress(raw_bytes, level=9)
-        hex_str = compressed.hex()
+        t0 = time.perf_counter()
+        blob = snapshot_codec.encode_frame(df)
+        legacy_hex = snapshot_codec.encode_legacy_frame(df).hex() if _LEGACY_SNAPSHOTS else None
+        t1 = time.perf_counter()
 
         with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"DELETE FROM [{DB_NAME}].[dbo].[Snapshots] WHERE Name = ?;", (which,))
-            cur.execute(
-                f"INSERT INTO [{DB_NAME}].[dbo].[Snapshots] (Name, DataHex) VALUES (?, ?);",
-                (which, hex_str),
-            )
-            c.commit()
+            if _SNAPSHOT_BINARY_OK:
+                try:
+                    with c.batch() as b:
+                        b.execute(f"DELETE FROM [{DB_NAME}].[dbo].[Snapshots] WHERE Name = ?;", (which,))
+                        b.execute(
+                            f"INSERT INTO [{DB_NAME}].[dbo].[Snapshots] (Name, Data, DataHex) VALUES (?, ?, ?);",
+                            (which, blob, legacy_hex or ""),
+                        )
+                except SqlApiError as e:
+                    if not _is_missing_column(e, "Data"):
+                        raise
+                    _SNAPSHOT_BINARY_OK = False
+            if not _SNAPSHOT_BINARY_OK:
+                with c.batch() as b:
+                    b.execute(f"DELETE FROM [{DB_NAME}].[dbo].[Snapshots] WHERE Name = ?;", (which,))
+                    b.execute(
+                        f"INSERT INTO [{DB_NAME}].[dbo].[Snapshots] (Name, DataHex) VALUES (?, ?);",
+                        (which, legacy_hex or blob.hex()),
+                    )
+        t2 = time.perf_counter()
+        print(
+            f"[SNAPSHOT] {which}: {snapshot_codec.describe(blob)} {len(blob) / 1e6:.2f} MB, "
+            f"kodlama {(t1 - t0) * 1000:.0f} ms, yazma {(t2 - t1) * 1000:.0f} ms{_api_trace()}"
+        )
     except Exception as e:
         print(f"[SNAPSHOT] {which}: KAYIT HATASI -> {e!r}")
 
 
+def _read_snapshot_blob(cur, which: str) -> bytes | None:
+    global _SNAPSHOT_BINARY_OK
+    if _SNAPSHOT_BINARY_OK:
+        try:
+            # DataHex (eski kayıtların büyük hex'i) yalnız Data boşsa ayrıca okunur
+            cur.execute(f"SELECT Data FROM [{DB_NAME}].[dbo].[Snapshots] WHERE Name = ?;", (which,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            data = row[0]
+            if data:
+                # JSON yolunda varbinary base64 string olarak gelir
+                return base64.b64decode(data) if isinstance(data, str) else bytes(data)
+        except SqlApiError as e:
+            if not _is_missing_column(e, "Data"):
+                raise
+            _SNAPSHOT_BINARY_OK = False
+
+    cur.execute(f"SELECT DataHex FROM [{DB_NAME}].[dbo].[Snapshots] WHERE Name = ?;", (which,))
+    row = cur.fetchone()
+    if not row or not row[0]:
+        return None
+    return bytes.fromhex(row[0])
+
+
 def load_df_snapshot(which: str) -> pd.DataFrame | None:
     _ensure_snapshot_table()
 
     try:
+        t0 = time.perf_counter()
         with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"SELECT DataHex FROM [{DB_NAME}].[dbo].[Snapshots] WHERE Name = ?;", (which,))
-            row = cur.fetchone()
-
-        if not row or row[0] is None:
+            blob = _read_snapshot_blob(c.cursor(), which)
+        if blob is None:
             return None
+        t1 = time.perf_counter()
+        trace = _api_trace()
 
-        compressed = bytes.fromhex(row[0])
-        raw_bytes = zlib.decompress(compressed)
-        buf = io.BytesIO(raw_bytes)
-
-        df = pd.read_pickle(buf)
+        try:
+            df = snapshot_codec.decode_frame(blob)
+        except snapshot_codec.SnapshotFormatError as e:
+            _SNAPSHOT_DECODE_ERRORS[which] = str(e)
+            print(f"[SNAPSHOT] {which}: {snapshot_codec.describe(blob)} bu kurulumda çözülemedi -> {e}")
+            return None
+        _SNAPSHOT_DECODE_ERRORS.pop(which, None)
+        t2 = time.perf_counter()
+        print(
+            f"[SNAPSHOT] {which}: {snapshot_codec.describe(blob)} {len(blob) / 1e6:.2f} MB, "
+            f"okuma {(t1 - t0) * 1000:.0f} ms, çözme {(t2 - t1) * 1000:.0f} ms{trace}"
+        )
         return df if isinstance(df, pd.DataFrame) else None
     except Exception as e:
         print(f"[SNAPSHOT] {which}: YÜKLEME HATASI -> {e!r}")
         return None
 
 
+def snapshot_decode_error(which: str) -> str | None:
+    """Son load_df_snapshot(which) kayıt bulup çözemediyse nedeni; yoksa None."""
+    return _SNAPSHOT_DECODE_ERRORS.get(which)
+
+
 # ============================================================
 #  KULLANICI VARSAYILANI
 # ============================================================
@@ -342,89 +691,109 @@ def ensure_user_db() -> None:
         pass
 
 
+def _user_row(u: dict) -> tuple[tuple, tuple] | None:
+    """Kullanıcı sözlüğü -> ((Username,), (Salt, PasswordHash, Permissions, IsActive)); eksikse None."""
+    username = str(u.get("username", "")).strip()
+    salt = str(u.get("salt", "")).strip()
+    pwd_hash = str(u.get("password_hash", "")).strip()
+    perms = u.get("permissions", [])
+
+    if not username or not salt or not pwd_hash:
+        return None
+
+    perms_raw = ",".join([str(p).strip() for p in perms]) if isinstance(perms, list) else str(perms)
+    is_active_bit = 1 if u.get("is_active", True) else 0
+    return (username,), (salt, pwd_hash, perms_raw, is_active_bit)
+
+
+def _user_rows(users: list[dict]) -> dict[tuple, tuple]:
+    return dict(r for r in map(_user_row, users or []) if r is not None)
+
+
 def load_users() -> list[dict]:
+    return load_users_for_edit()[0]
+
+
+def load_users_for_edit() -> tuple[list[dict], Baseline | None]:
+    """Kullanıcılar ve save_users'a geri verilecek taban; okunamazsa ([], None)."""
     ensure_user_db()
+    try:
+        return _load_tracked("AppUsers", _read_users, _user_rows)
+    except Exception as e:
+        print("[load_users] ERROR:", e)
+        return [], None
+
+
+def _read_users() -> list[dict]:
     users: list[dict] = []
+    with _sql_conn() as c:
+        cur = c.cursor()
+        cur.execute(
+            f"SELECT Username, Salt, PasswordHash, Permissions, IsActive, CreatedAt "
+            f"FROM [{DB_NAME}].[dbo].[AppUsers];"
+        )
+        rows = cur.fetchall()
 
-    try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(
-                f"SELECT Username, Salt, PasswordHash, Permissions, IsActive, CreatedAt "
-                f"FROM [{DB_NAME}].[dbo].[AppUsers];"
-            )
-            rows = cur.fetchall()
+    for row in rows:
+        username = row[0]
+        salt = row[1]
+        pwd_hash = row[2]
+        perms_raw = row[3]
+        is_active = bool(row[4])
+        created_at = row[5]
 
-        for row in rows:
-            username = row[0]
-            salt = row[1]
-            pwd_hash = row[2]
-            perms_raw = row[3]
-            is_active = bool(row[4])
-            created_at = row[5]
-
-            if isinstance(perms_raw, str):
-                try:
-                    tmp = ast.literal_eval(perms_raw)
-                    parsed = tmp if isinstance(tmp, list) else perms_raw
-                except Exception:
-                    parsed = perms_raw
-                if isinstance(parsed, list):
-                    perms = [str(p).strip() for p in parsed if str(p).strip()]
-                else:
-                    perms = [p.strip() for p in str(parsed).split(",") if p.strip()]
+        if isinstance(perms_raw, str):
+            try:
+                tmp = ast.literal_eval(perms_raw)
+                parsed = tmp if isinstance(tmp, list) else perms_raw
+            except Exception:
+                parsed = perms_raw
+            if isinstance(parsed, list):
+                perms = [str(p).strip() for p in parsed if str(p).strip()]
             else:
-                perms = []
-
-            users.append(
-                {
-                    "username": username,
-                    "salt": salt,
-                    "password_hash": pwd_hash,
-                    "permissions": perms,
-                    "is_active": is_active,
-                    "created_at": created_at.isoformat()
-                    if isinstance(created_at, datetime)
-                    else str(created_at),
-                }
-            )
-    except Exception as e:
-        print("[load_users] ERROR:", e)
+                perms = [p.strip() for p in str(parsed).split(",") if p.strip()]
+        else:
+            perms = []
 
+        users.append(
+            {
+                "username": username,
+                "salt": salt,
+                "password_hash": pwd_hash,
+                "permissions": perms,
+                "is_active": is_active,
+                "created_at": created_at.isoformat()
+                if isinstance(created_at, datetime)
+                else str(created_at),
+            }
+        )
     return users
 
 
-def save_users(users: list[dict]) -> None:
+def save_users(users: list[dict], base: Baseline | None = None) -> bool:
+    """
+    Yalnız eklenen / değişen / silinen kullanıcılar yazılır (base: load_users_for_edit tabanı).
+    Dönüş: kaydedildi mi; çakışmada SaveConflict.
+    """
     ensure_user_db()
     if not isinstance(users, list):
-        return
+        return False
 
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"DELETE FROM [{DB_NAME}].[dbo].[AppUsers];")
-
-            for u in users:
-                username = str(u.get("username", "")).strip()
-                salt = str(u.get("salt", "")).strip()
-                pwd_hash = str(u.get("password_hash", "")).strip()
-                perms = u.get("permissions", [])
-
-                if not username or not salt or not pwd_hash:
-                    continue
-
-                perms_raw = ",".join([str(p).strip() for p in perms]) if isinstance(perms, list) else str(perms)
-                is_active_bit = 1 if u.get("is_active", True) else 0
-
-                cur.execute(
-                    f"INSERT INTO [{DB_NAME}].[dbo].[AppUsers] (Username, Salt, PasswordHash, Permissions, IsActive) "
-                    "VALUES (?, ?, ?, ?, ?);",
-                    (username, salt, pwd_hash, perms_raw, is_active_bit),
-                )
-
-            c.commit()
-    except Exception:
-        pass
+        _save_diff(
+            "AppUsers",
+            ("Username",),
+            ("Salt", "PasswordHash", "Permissions", "IsActive"),
+            _user_rows(users),
+            base,
+            load_users_for_edit,
+        )
+        return True
+    except SaveConflict:
+        raise
+    except Exception as e:
+        print(f"[AppUsers] yazma hatası: {e!r}")
+        return False
 
 
 def find_user(username: str) -> dict | None:
@@ -485,90 +854,152 @@ def verify_user(username: str, password: str) -> bool:
 # ============================================================
 
 def load_blocked_looms() -> list[str]:
-    try:
+    return load_blocked_looms_for_edit()[0]
+
+
+def load_blocked_looms_for_edit() -> tuple[list[str], Baseline | None]:
+    """Liste ve save_blocked_looms'a geri verilecek taban; okunamazsa ([], None)."""
+
+    def _load() -> list[str]:
         with _sql_conn() as c:
             cur = c.cursor()
-            cur.execute(f"SELECT LoomNo FROM [{DB_NAME}].[dbo].[BlockedLooms] ORDER BY LoomNo;")
+            cur.execute_stmt(
+                "looms.blocked", (),
+                f"SELECT LoomNo FROM [{DB_NAME}].[dbo].[BlockedLooms] ORDER BY LoomNo;", DB_NAME,
+            )
             rows = cur.fetchall()
         return [str(r[0]) for r in rows]
+
+    try:
+        return _load_tracked("BlockedLooms", _load, _loom_rows)
     except Exception:
-        return []
+        return [], None
 
 
-def save_blocked_looms(items: list[str]) -> None:
+def save_blocked_looms(items: list[str], base: Baseline | None = None) -> bool:
+    """
+    Yalnız eklenen / çıkarılan tezgahlar yazılır (base: load_blocked_looms_for_edit tabanı).
+    Dönüş: kaydedildi mi; çakışmada SaveConflict.
+    """
     vals = [re.findall(r"\d+", str(x))[0] for x in (items or []) if re.findall(r"\d+", str(x))]
     uniq = sorted(set(vals))
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"DELETE FROM [{DB_NAME}].[dbo].[BlockedLooms];")
-            for loom in uniq:
-                cur.execute(f"INSERT INTO [{DB_NAME}].[dbo].[BlockedLooms] (LoomNo) VALUES (?);", (loom,))
-            c.commit()
-    except Exception:
-        pass
+        version = _save_diff("BlockedLooms", ("LoomNo",), (), _loom_rows(uniq), base, load_blocked_looms_for_edit)
+        if version is not None:
+            _REF_CACHE.put("BlockedLooms", "", uniq, version)
+        return True
+    except SaveConflict:
+        raise
+    except Exception as e:
+        print(f"[BlockedLooms] yazma hatası: {e!r}")
+        return False
 
 
 def load_dummy_looms() -> list[str]:
-    try:
+    return load_dummy_looms_for_edit()[0]
+
+
+def load_dummy_looms_for_edit() -> tuple[list[str], Baseline | None]:
+    """Liste ve save_dummy_looms'a geri verilecek taban; okunamazsa ([], None)."""
+
+    def _load() -> list[str]:
         with _sql_conn() as c:
             cur = c.cursor()
-            cur.execute(f"SELECT LoomNo FROM [{DB_NAME}].[dbo].[DummyLooms] ORDER BY LoomNo;")
+            cur.execute_stmt(
+                "looms.dummy", (),
+                f"SELECT LoomNo FROM [{DB_NAME}].[dbo].[DummyLooms] ORDER BY LoomNo;", DB_NAME,
+            )
             rows = cur.fetchall()
         return [str(r[0]) for r in rows]
+
+    try:
+        return _load_tracked("DummyLooms", _load, _loom_rows)
     except Exception:
-        return []
+        return [], None
 
 
-def save_dummy_looms(items: list[str]) -> None:
+def save_dummy_looms(items: list[str], base: Baseline | None = None) -> bool:
+    """
+    Yalnız eklenen / çıkarılan tezgahlar yazılır (base: load_dummy_looms_for_edit tabanı).
+    Dönüş: kaydedildi mi; çakışmada SaveConflict.
+    """
     vals = [re.findall(r"\d+", str(x))[0] for x in (items or []) if re.findall(r"\d+", str(x))]
     uniq = sorted(set(vals))
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"DELETE FROM [{DB_NAME}].[dbo].[DummyLooms];")
-            for loom in uniq:
-                cur.execute(f"INSERT INTO [{DB_NAME}].[dbo].[DummyLooms] (LoomNo) VALUES (?);", (loom,))
-            c.commit()
-    except Exception:
-        pass
+        version = _save_diff("DummyLooms", ("LoomNo",), (), _loom_rows(uniq), base, load_dummy_looms_for_edit)
+        if version is not None:
+            _REF_CACHE.put("DummyLooms", "", uniq, version)
+        return True
+    except SaveConflict:
+        raise
+    except Exception as e:
+        print(f"[DummyLooms] yazma hatası: {e!r}")
+        return False
 
 
 def load_loom_cut_map() -> dict:
-    try:
+    return load_loom_cut_map_for_edit()[0]
+
+
+def load_loom_cut_map_for_edit() -> tuple[dict, Baseline | None]:
+    """Harita ve save_loom_cut_map'e geri verilecek taban; okunamazsa ({}, None)."""
+
+    def _load() -> dict:
         with _sql_conn() as c:
             cur = c.cursor()
-            cur.execute(f"SELECT LoomNo, CutType FROM [{DB_NAME}].[dbo].[LoomCutMap];")
+            cur.execute_stmt(
+                "loom_cut_map.all", (),
+                f"SELECT LoomNo, CutType FROM [{DB_NAME}].[dbo].[LoomCutMap];", DB_NAME,
+            )
             rows = cur.fetchall()
         return {str(r[0]): str(r[1]) for r in rows}
+
+    try:
+        return _load_tracked("LoomCutMap", _load, lambda d: {(k,): (v,) for k, v in d.items()})
     except Exception:
-        return {}
+        return {}, None
 
 
-def save_loom_cut_map(d: dict) -> None:
+def save_loom_cut_map(d: dict, base: Baseline | None = None) -> bool:
+    """
+    Yalnız değişen tezgahlar yazılır (base: load_loom_cut_map_for_edit tabanı).
+    Dönüş: kaydedildi mi; çakışmada SaveConflict.
+    """
     if not isinstance(d, dict):
-        return
+        return False
+    rows: dict[str, str] = {}
+    for loom, ctype in d.items():
+        loom_str = str(loom).strip()
+        cut_str = str(ctype).strip()
+        if loom_str and cut_str:
+            rows[loom_str] = cut_str
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"DELETE FROM [{DB_NAME}].[dbo].[LoomCutMap];")
-            for loom, ctype in d.items():
-                loom_str = str(loom).strip()
-                cut_str = str(ctype).strip()
-                if loom_str and cut_str:
-                    cur.execute(f"INSERT INTO [{DB_NAME}].[dbo].[LoomCutMap] (LoomNo, CutType) VALUES (?, ?);", (loom_str, cut_str))
-            c.commit()
-    except Exception:
-        pass
+        version = _save_diff(
+            "LoomCutMap", ("LoomNo",), ("CutType",), {(k,): (v,) for k, v in rows.items()}, base, load_loom_cut_map_for_edit
+        )
+        if version is not None:
+            _REF_CACHE.put("LoomCutMap", "", rows, version)
+        return True
+    except SaveConflict:
+        raise
+    except Exception as e:
+        print(f"[LoomCutMap] yazma hatası: {e!r}")
+        return False
 
 
 def load_type_selvedge_map() -> dict:
-    try:
+    def _load() -> dict:
         with _sql_conn() as c:
             cur = c.cursor()
-            cur.execute(f"SELECT RootType, Selvedge FROM [{DB_NAME}].[dbo].[TypeSelvedgeMap];")
+            cur.execute_stmt(
+                "type_selvedge_map.all", (),
+                f"SELECT RootType, Selvedge FROM [{DB_NAME}].[dbo].[TypeSelvedgeMap];", DB_NAME,
+            )
             rows = cur.fetchall()
         return {str(r[0]): str(r[1]) for r in rows}
+
+    try:
+        return cached_ref("TypeSelvedgeMap", "", _load)
     except Exception:
         return {}
 
@@ -576,37 +1007,17 @@ def load_type_selvedge_map() -> dict:
 def save_type_selvedge_map(d: dict) -> None:
     if not isinstance(d, dict):
         return
+    rows: list[tuple[str, str]] = []
+    for root, sel in d.items():
+        root_str = str(root).strip().upper()
+        sel_str = str(sel).strip()
+        if root_str and sel_str:
+            rows.append((root_str, sel_str))
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-
-            for root, sel in d.items():
-                root_str = str(root).strip().upper()
-                sel_str = str(sel).strip()
-                if not root_str or not sel_str:
-                    continue
-
-                # UPDATE dene
-                cur.execute(
-                    f"UPDATE [{DB_NAME}].[dbo].[TypeSelvedgeMap] "
-                    "SET Selvedge = ? "
-                    "WHERE RootType = ?",
-                    (sel_str, root_str),
-                )
-
-                # Var mı kontrol et; yoksa INSERT
-                cur.execute(
-                    f"SELECT COUNT(*) FROM [{DB_NAME}].[dbo].[TypeSelvedgeMap] WHERE RootType = ?",
-                    (root_str,),
-                )
-                cnt = cur.fetchone()[0]
-                if cnt == 0:
-                    cur.execute(
-                        f"INSERT INTO [{DB_NAME}].[dbo].[TypeSelvedgeMap] (RootType, Selvedge) VALUES (?, ?)",
-                        (root_str, sel_str),
-                    )
-
-            c.commit()
+        # Tüm kök tipler tek istekte, tek transaction'da
+        _upsert("TypeSelvedgeMap", ("RootType",), ["RootType", "Selvedge"], rows)
+        # Upsert mevcut diğer satırları silmez: tablo içeriği bilinmiyor, yeniden yüklensin
+        touch_ref("TypeSelvedgeMap")
     except Exception as e:
         print(f"[TypeSelvedgeMap] yazma hatası: {e!r}")
 
@@ -618,17 +1029,19 @@ def save_type_selvedge_map(d: dict) -> None:
 
 def load_usta_dataframe(sqlite_path: str | None = None) -> pd.DataFrame:
     try:
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(f"SELECT Id, Tarih, IsTanimi FROM [{DB_NAME}].[dbo].[UstaDefteri];")
-            rows = cur.fetchall()
-            cols = [d[0] for d in cur.description] if cur.description else ["Id", "Tarih", "IsTanimi"]
-            df = pd.DataFrame.from_records(rows, columns=cols)
+        # Tablo sürekli büyüyor: Arrow (tipli) ya da Id'ye göre sayfalı JSON
+        df = _fetch_dataframe(
+            f"SELECT Id, Tarih, IsTanimi FROM [{DB_NAME}].[dbo].[UstaDefteri]",
+            keyset_key="Id",
+        )
+        if df.empty and not len(df.columns):
+            df = pd.DataFrame(columns=["Id", "Tarih", "IsTanimi"])
     except Exception:
         return pd.DataFrame(columns=["_ts", "_what", "_dir"])
 
     try:
-        ts = pd.to_datetime(df["Tarih"], errors="coerce")
+        # Arrow modunda Tarih zaten datetime64; JSON modunda string -> parse
+        ts = df["Tarih"] if pd.api.types.is_datetime64_any_dtype(df["Tarih"]) else pd.to_datetime(df["Tarih"], errors="coerce")
     except Exception:
         ts = pd.NaT
 
@@ -638,67 +1051,136 @@ def load_usta_dataframe(sqlite_path: str | None = None) -> pd.DataFrame:
     return df[["_ts", "_what", "_dir"]]
 
 
-def count_usta_between(start_dt: datetime, end_dt: datetime, what: str = "DÜĞÜM", direction: str = "ALINDI") -> int:
-    try:
-        s_date = start_dt.date()
-        e_date = end_dt.date()
-        w = str(what).upper().strip()
+# Kayıt anı: Tarih (date) + Vardiya metnindeki saat ("(07:00)|14:25"); saat yoksa vardiya başlangıcı
+_USTA_TS_SQL = (
+    "DATEADD(minute, DATEDIFF(minute, CAST('00:00' AS time), "
+    "COALESCE(TRY_CAST(RIGHT(u.Vardiya, 5) AS time), TRY_CAST(SUBSTRING(u.Vardiya, 2, 5) AS time), "
+    "CAST('00:00' AS time))), CAST(u.Tarih AS datetime))"
+)
 
-        sql = f"SELECT COUNT(*) FROM [{DB_NAME}].[dbo].[UstaDefteri] WHERE Tarih >= ? AND Tarih < ?"
-        params: list[object] = [s_date, e_date]
 
-        if w:
-            sql += " AND UPPER(IsTanimi) = ?"
-            params.append(w)
-
-        with _sql_conn() as c:
-            cur = c.cursor()
-            cur.execute(sql, tuple(params))
-            row = cur.fetchone()
-            if row and row[0] is not None:
-                return int(row[0])
-    except Exception:
-        pass
-    return 0
+def _sql_local_ts(dt: datetime) -> str:
+    # JSON'a uygun, dil ayarından bağımsız ISO 8601 (İstanbul yerel saati)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(ZoneInfo("Europe/Istanbul")).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S")
 
 
-def load_usta_etiket_tezgah_map() -> dict[str, str]:
-    def _clean(val) -> str:
-        if val is None:
-            return ""
-        try:
-            if isinstance(val, float) and pd.isna(val):
-                return ""
-        except Exception:
-            pass
-        s = str(val).strip()
-        if not s:
-            return ""
-        s = re.sub(r"\.0+$", "", s)
-        return s
-
+def count_usta_matrix(
+    windows: list[tuple[datetime, datetime]], whats: list[str] | None
+) -> dict[tuple[int, str], int]:
+    """
+    N zaman penceresi × M iş tanımı için Usta Defteri sayımları, tek gruplu sorguda.
+    Dönüş: {(pencere_index, İŞ_TANIMI): adet}; kaydı olmayan hücreler 0.
+    whats=None: iş tanımı filtresi yok, kayıtlı tüm iş tanımları (boş tanım "" anahtarıyla) döner.
+    """
+    every = whats is None
+    whats = [] if every else [str(w).upper().strip() for w in whats if str(w).strip()]
+    out = {(i, w): 0 for i in range(len(windows)) for w in whats}
+    if not windows or not (whats or every):
+        return out
+
+    win_sql = ", ".join(f"({i}, ?, ?)" for i in range(len(windows)))
+    params: list[object] = []
+    for s, e in windows:
+        params += [_sql_local_ts(s), _sql_local_ts(e)]
+    # Tarih üzerinden indeks kullanılabilir ön filtre (gece vardiyası ertesi güne taşar)
+    first = min(_sql_local_ts(s) for s, _ in windows)[:10]
+    last = max(_sql_local_ts(e) for _, e in windows)[:10]
+    params += [first, last] + whats
+
+    # IsTanimi sabit listeden seçilir; varsayılan collation büyük/küçük harf duyarsız
+    type_filter = "" if every else f" AND u.IsTanimi IN ({', '.join('?' * len(whats))})"
     sql = f"""
-    SELECT EtiketNo, Tezgah
-    FROM [{DB_NAME}].[dbo].[UstaDefteri]
-    WHERE EtiketNo IS NOT NULL AND LTRIM(RTRIM(EtiketNo)) <> ''
-    ORDER BY Id DESC;
+    SELECT w.Idx, u.IsTanimi, COUNT(*)
+    FROM [{DB_NAME}].[dbo].[UstaDefteri] AS u
+    CROSS APPLY (SELECT {_USTA_TS_SQL} AS Ts) AS t
+    JOIN (VALUES {win_sql}) AS w(Idx, WinStart, WinStop)
+      ON t.Ts >= CAST(w.WinStart AS datetime) AND t.Ts < CAST(w.WinStop AS datetime)
+    WHERE u.Tarih >= ? AND u.Tarih <= ?{type_filter}
+    GROUP BY w.Idx, u.IsTanimi
     """
-
     try:
         with _sql_conn() as c:
             cur = c.cursor()
-            cur.execute(sql)
+            cur.execute(sql, params)
             rows = cur.fetchall()
-    except Exception:
-        return {}
+    except Exception as e:
+        print(f"[USTA] sayım hatası: {e!r}")
+        return out
 
-    mapping: dict[str, str] = {}
-    for row in rows:
-        etiket = _clean(row[0] if len(row) > 0 else None)
-        tezgah = _clean(row[1] if len(row) > 1 else None)
-        if etiket and tezgah:
-            mapping.setdefault(etiket, tezgah)
-    return mapping
+    for idx, what, cnt in rows:
+        key = (int(idx), str(what or "").upper().strip())
+        if every or key in out:
+            out[key] = out.get(key, 0) + int(cnt or 0)
+    return out
+
+
+def count_usta_between(start_dt: datetime, end_dt: datetime, what: str = "DÜĞÜM") -> int:
+    """[start_dt, end_dt) aralığındaki Usta Defteri kayıtları; what boşsa tüm iş tanımlarının toplamı."""
+    w = str(what or "").upper().strip()
+    if not w:
+        return sum(count_usta_matrix([(start_dt, end_dt)], None).values())
+    return count_usta_matrix([(start_dt, end_dt)], [w]).get((0, w), 0)
+
+
+_ETIKET_FILTER = "EtiketNo IS NOT NULL AND LTRIM(RTRIM(EtiketNo)) <> ''"
+
+
+# İlk kurulum / yeniden kurulum tüm tabloyu okur: API'nin MAX_ROWS (413) sınırının altında sayfalar
+_ETIKET_PAGE_ROWS = int(os.getenv("UZMANRAPOR_ETIKET_PAGE_ROWS") or "5000")
+
+
+def _fetch_etiket_rows(after_id: int) -> list[tuple]:
+    out: list[tuple] = []
+    with _sql_conn() as c:
+        cur = c.cursor()
+        while True:
+            cur.execute_stmt(
+                "usta.etiket_page", (_ETIKET_PAGE_ROWS, after_id),
+                f"SELECT TOP (?) Id, EtiketNo, Tezgah FROM [{DB_NAME}].[dbo].[UstaDefteri] "
+                f"WHERE Id > ? AND {_ETIKET_FILTER} ORDER BY Id;", DB_NAME,
+            )
+            page = [tuple(r) for r in cur.fetchall()]
+            out.extend(page)
+            if len(page) < _ETIKET_PAGE_ROWS:
+                return out
+            after_id = int(page[-1][0])
+
+
+def _count_etiket_rows(upto_id: int) -> int:
+    with _sql_conn() as c:
+        cur = c.cursor()
+        cur.execute_stmt(
+            "usta.etiket_count", (upto_id,),
+            f"SELECT COUNT_BIG(*) FROM [{DB_NAME}].[dbo].[UstaDefteri] WHERE Id <= ? AND {_ETIKET_FILTER};", DB_NAME,
+        )
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def _etiket_index_path() -> Path | None:
+    if (os.getenv("UZMANRAPOR_ETIKET_INDEX_DISK") or "1").lower() in {"0", "false", "no"}:
+        return None
+    return parse_cache.cache_dir().parent / f"etiket_index_{DB_NAME}.json"
+
+
+_ETIKET_INDEX = EtiketIndex(
+    _fetch_etiket_rows,
+    _count_etiket_rows,
+    lambda: _REF_CACHE.version("UstaDefteri"),
+    path=_etiket_index_path(),
+    verify_sec=float(os.getenv("UZMANRAPOR_ETIKET_VERIFY_SEC") or "300"),
+)
+
+
+def load_usta_etiket_tezgah_map() -> dict[str, str]:
+    """Usta Defteri'ndeki etiket -> tezgah (en yeni kayıt); yalnız son görülen Id'den sonrası sorgulanır."""
+    return _ETIKET_INDEX.mapping()
+
+
+def etiket_index_stats() -> dict:
+    return _ETIKET_INDEX.snapshot()
 
 
 def fetch_tip_buzulme_model(tip_kodlari: list[str]) -> pd.DataFrame:
@@ -207,7 +207,7 @@ class UserManagementWidget(QWidget):
         self._load_users()
 
     def _load_users(self):
-        self._users = storage.load_users()
+        self._users, self._baseline = storage.load_users_for_edit()
         self.table.setRowCount(len(self._users))
         for row_idx, user in enumerate(self._users):
             username = str(user.get("username", ""))
@@ -221,6 +221,24 @@ class UserManagementWidget(QWidget):
             self.table.setItem(row_idx, 3, QTableWidgetItem(created))
         self.table.resizeColumnsToContents()
 
+    def _save_users(self) -> bool:
+        """Listeyi kaydeder; başka bir yönetici arada değiştirdiyse uyarır ve listeyi yeniden yükler."""
+        try:
+            saved = storage.save_users(self._users, self._baseline)
+        except storage.SaveConflict:
+            QMessageBox.warning(
+                self,
+                "Kayıt çakışması",
+                "Kullanıcı listesi başka bir oturumda değiştirilmiş.\n"
+                "Güncel liste yüklendi; lütfen işlemi tekrar yapınız.",
+            )
+            self._load_users()
+            return False
+        if not saved:
+            QMessageBox.critical(self, "Hata", "Kullanıcı listesi kaydedilemedi.")
+            self._load_users()
+        return saved
+
     def _selected_username(self) -> str | None:
         row = self.table.currentRow()
         if row < 0 or row >= len(self._users):
@@ -243,7 +261,8 @@ class UserManagementWidget(QWidget):
             "is_active": dlg.result.get("is_active", True),
         }
         self._users.append(new_user)
-        storage.save_users(self._users)
+        if not self._save_users():
+            return
         QMessageBox.information(self, "Kullanıcı eklendi", f"{new_user['username']} başarıyla eklendi.")
         self._load_users()
 
@@ -270,7 +289,8 @@ class UserManagementWidget(QWidget):
             QMessageBox.warning(self, "Bulunamadı", "Kullanıcı listede bulunamadı.")
             return
 
-        storage.save_users(self._users)
+        if not self._save_users():
+            return
         QMessageBox.information(self, "Parola güncellendi", "Yeni parola kaydedildi.")
         self._load_users()
 
@@ -295,6 +315,7 @@ class UserManagementWidget(QWidget):
                 u["permissions"] = dlg.permissions
                 break
 
-        storage.save_users(self._users)
+        if not self._save_users():
+            return
         QMessageBox.information(self, "Yetkiler güncellendi", "Kullanıcı yetkileri kaydedildi.")
         self._load_users()
\ No newline at end of file
@@ -4,6 +4,8 @@ from datetime import datetime
 
 import pandas as pd
 from app.sql_api_client import get_sql_connection
+from app.sql_fanout import SqlLatest
+from app.storage import cached_ref, touch_ref
 from PySide6.QtCore import Qt, QDate, QTimer
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QLineEdit, QComboBox,
@@ -16,6 +18,10 @@ from app.db_name import DB_NAME
 
 IS_TANIM_LIST = ["DÜĞÜM", "TAKIM", "BAKIM", "DİĞER"]
 
+# Tablo okumalarının süre sınırı (sn); dolarsa sorgu sunucuda da durdurulur
+LAST_N_TIMEOUT_SEC = 30
+REPORT_TIMEOUT_SEC = 120
+
 
 def _vardiya_str(now_qtime) -> str:
     h = now_qtime.hour()
@@ -80,6 +86,12 @@ class UstaDefteriWidget(QWidget):
         self.df_jobs: Optional[pd.DataFrame] = None
         self.machine_list: List[str] = []
 
+        # Tabloyu dolduran okumalar: yenisi gelince (ör. yeni rapor) eskisi sunucuda iptal edilir
+        self._table_req = SqlLatest(self)
+        self._table_req.ready.connect(self._show_df)
+        self._table_req.failed.connect(self._on_table_failed)
+        self._table_kind = ""
+
         root = QVBoxLayout(self)
 
         top = QHBoxLayout()
@@ -131,14 +143,16 @@ class UstaDefteriWidget(QWidget):
         WHERE ListName = ? AND IsActive = 1
         ORDER BY SortOrder, Value;
         """
-        with self._conn() as c:
-            cur = c.cursor()
-            cur.execute(sql, (list_name,))
-            rows = cur.fetchall()
-        out: List[Dict[str, object]] = []
-        for r in rows:
-            out.append({"id": int(r[0]), "value": str(r[1])})
-        return out
+
+        def _load() -> List[Dict[str, object]]:
+            with self._conn() as c:
+                cur = c.cursor()
+                cur.execute_stmt("lookup.values", (list_name,), sql, DB_NAME)
+                rows = cur.fetchall()
+            return [{"id": int(r[0]), "value": str(r[1])} for r in rows]
+
+        # Liste değişmedikçe (AppMeta sürüm damgası) istek atılmaz
+        return cached_ref("AppLookupValues", list_name, _load)
 
     def _ensure_lookup_value(self, list_name: str, value: str, created_by: str = "AUTO") -> None:
         value = (value or "").strip()
@@ -161,6 +175,7 @@ class UstaDefteriWidget(QWidget):
                 (list_name, value, created_by),
             )
             c.commit()
+        touch_ref("AppLookupValues")
 
     def _update_lookup_value(self, row_id: int, new_value: str, updated_by: str = "UI") -> None:
         new_value = (new_value or "").strip()
@@ -175,6 +190,7 @@ class UstaDefteriWidget(QWidget):
             cur = c.cursor()
             cur.execute(sql, (new_value, updated_by, row_id))
             c.commit()
+        touch_ref("AppLookupValues")
 
     def _deactivate_lookup_value(self, row_id: int, updated_by: str = "UI") -> None:
         sql = f"""
@@ -186,6 +202,7 @@ class UstaDefteriWidget(QWidget):
             cur = c.cursor()
             cur.execute(sql, (updated_by, row_id))
             c.commit()
+        touch_ref("AppLookupValues")
 
     def _refresh_usta_combo(self) -> None:
         if not hasattr(self, "cmb_usta"):
@@ -471,6 +488,12 @@ class UstaDefteriWidget(QWidget):
         self.btn_excel.clicked.connect(self._export_excel)
         self.ed_q.textChanged.connect(self._apply_quick_filter)
 
+        # Filtre değişince süren rapor artık geçersiz: sunucuda boşuna çalışmasın
+        self.dt_ilk.dateChanged.connect(self._cancel_stale_report)
+        self.dt_son.dateChanged.connect(self._cancel_stale_report)
+        self.cmb_field.currentIndexChanged.connect(self._cancel_stale_report)
+        self.ed_value.textEdited.connect(self._cancel_stale_report)
+
         return box
 
     # -------------------- DB ops (UstaDefteri) ------------------------
@@ -532,6 +555,8 @@ class UstaDefteriWidget(QWidget):
             cur = c.cursor()
             cur.execute(f"DELETE FROM [{DB_NAME}].[dbo].[UstaDefteri] WHERE Id = ?", (rowid,))
             c.commit()
+        # Etiket -> Tezgah indeksi yalnız yeni Id'leri izler; silme için baştan kurulmalı
+        touch_ref("UstaDefteri")
 
     def _select(self, start: Optional[str] = None, end: Optional[str] = None,
                 field: Optional[str] = None, value: Optional[str] = None) -> pd.DataFrame:
@@ -590,7 +615,8 @@ class UstaDefteriWidget(QWidget):
 
         with self._conn() as c:
             cur = c.cursor()
-            cur.execute(sql, tuple(params)) if params else cur.execute(sql)
+            # Geniş tarih aralıklarında 413'e takılmamak için Id'ye göre sayfalı oku
+            cur.execute_keyset(sql, key="Id", params=params)
             rows = cur.fetchall()
             cols = [d[0] for d in cur.description]
             df = pd.DataFrame.from_records(rows, columns=cols)
@@ -736,10 +762,23 @@ class UstaDefteriWidget(QWidget):
         end = self.dt_son.date().toString("dd.MM.yyyy")
         field = self.cmb_field.currentText()
         value = self.ed_value.text().strip()
-        df = self._select(start, end, field if value else None, value if value else None)
+        self._table_kind = "report"
+        self._table_req.submit(
+            lambda: self._select(start, end, field if value else None, value if value else None),
+            timeout=REPORT_TIMEOUT_SEC,
+        )
+
+    def _cancel_stale_report(self, *_):
+        if self._table_kind == "report" and self._table_req.is_pending():
+            self._table_req.cancel()
+
+    def _show_df(self, df: pd.DataFrame):
         self._raw_df = df
         _df_to_table(self.tbl, df)
 
+    def _on_table_failed(self, msg: str):
+        QMessageBox.critical(self, "Hata", f"Kayıtlar okunamadı:\n{msg}")
+
     def _export_excel(self):
         if not hasattr(self, "_raw_df") or self._raw_df is None or self._raw_df.empty:
             QMessageBox.information(self, "Bilgi", "Önce raporu alın.")
@@ -782,8 +821,12 @@ class UstaDefteriWidget(QWidget):
         _df_to_table(self.tbl, df[mask])
 
     def _load_last_n(self, n: int = 200):
+        self._table_kind = "last_n"
+        self._table_req.submit(lambda: self._fetch_last_n(n), timeout=LAST_N_TIMEOUT_SEC)
+
+    def _fetch_last_n(self, n: int) -> pd.DataFrame:
         sql = f"""
-        SELECT TOP {n}
+        SELECT TOP (?)
                Id,
                CONVERT(varchar(10), Tarih, 104) AS Tarih,
                Vardiya AS Saat,
@@ -804,20 +847,20 @@ class UstaDefteriWidget(QWidget):
         """
         with self._conn() as c:
             cur = c.cursor()
-            cur.execute(sql)
+            cur.execute_stmt("usta.last_n", (int(n),), sql, DB_NAME)
             rows = cur.fetchall()
             cols = [d[0] for d in cur.description]
-            df = pd.DataFrame.from_records(rows, columns=cols)
-
-        self._raw_df = df
-        _df_to_table(self.tbl, df)
+            return pd.DataFrame.from_records(rows, columns=cols)
 
     def _etiket_exists(self, etiket: str) -> bool:
         if not etiket:
             return False
         with self._conn() as c:
             cur = c.cursor()
-            cur.execute(f"SELECT 1 FROM [{DB_NAME}].[dbo].[UstaDefteri] WHERE EtiketNo = ?;", (etiket,))
+            cur.execute_stmt(
+                "usta.etiket_exists", (etiket,),
+                f"SELECT 1 FROM [{DB_NAME}].[dbo].[UstaDefteri] WHERE EtiketNo = ?;", DB_NAME,
+            )
             return cur.fetchone() is not None
 
     def _configure_table_look(self):
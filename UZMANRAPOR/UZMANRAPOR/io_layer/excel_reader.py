@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping
+
+import pandas as pd
+
+try:
+    import python_calamine  # noqa: F401  (pandas engine="calamine" bunu kullanır)
+    _HAS_CALAMINE = True
+except Exception:  # python-calamine opsiyonel; yoksa openpyxl / pyxlsb
+    _HAS_CALAMINE = False
+
+# UZMANRAPOR_EXCEL_ENGINE=auto|calamine|openpyxl|pyxlsb
+ENGINE_ENV = "UZMANRAPOR_EXCEL_ENGINE"
+
+ColumnFilter = Callable[[str], bool]
+
+
+def engine_order(path: str | Path) -> list[str]:
+    """Dosya uzantısına göre denenecek motorlar (hızlıdan yavaşa)."""
+    classic = "pyxlsb" if str(path).lower().endswith(".xlsb") else "openpyxl"
+    forced = (os.getenv(ENGINE_ENV) or "auto").strip().lower()
+    if forced in ("calamine", "openpyxl", "pyxlsb"):
+        order = [forced]
+    else:
+        order = ["calamine"] if _HAS_CALAMINE else []
+    if classic not in order:
+        order.append(classic)
+    return order
+
+
+def column_filter(names: Iterable[str], keywords: Iterable[str] = (), norm: Callable[[str], str] | None = None) -> ColumnFilter:
+    """
+    usecols için sütun seçici: başlığı ``names`` içinde olan ya da normalize edilmiş başlığı
+    ``keywords``'ten birini içeren sütunlar okunur.
+    """
+    wanted = {str(n).strip() for n in names}
+    keys = [k for k in keywords if k]
+    norm = norm or (lambda s: str(s).strip().upper())
+
+    def _keep(col: Any) -> bool:
+        c = str(col).strip()
+        if c in wanted:
+            return True
+        cn = norm(c)
+        return any(k in cn for k in keys)
+
+    return _keep
+
+
+def read_excel_fast(
+    path: str | Path,
+    usecols: ColumnFilter | None = None,
+    dtype: Mapping[str, Any] | None = None,
+    sheet_name: int | str = 0,
+) -> pd.DataFrame:
+    """
+    İlk sayfayı en hızlı kullanılabilir motorla okur (calamine > openpyxl/pyxlsb).
+    usecols: yalnız gereken sütunlar DataFrame'e çevrilir (tip çıkarımı bu sütunlarla sınırlı kalır).
+    dtype: açık sütun tipleri; dosyada olmayan sütunlar sessizce atlanır.
+    Hızlı motor kurulu değilse ya da dosyayı açamazsa mevcut motorlara düşülür.
+    """
+    last_exc: Exception | None = None
+    for engine in engine_order(path):
+        try:
+            return _read(path, engine, usecols, dtype, sheet_name)
+        except Exception as exc:
+            # motor kurulu değil / dosyayı açamadı -> sıradaki; hepsi düşerse son hata çıkar
+            last_exc = exc
+    assert last_exc is not None
+    raise last_exc
+
+
+def _read(
+    path: str | Path,
+    engine: str,
+    usecols: ColumnFilter | None,
+    dtype: Mapping[str, Any] | None,
+    sheet_name: int | str,
+) -> pd.DataFrame:
+    kwargs: dict[str, Any] = {"sheet_name": sheet_name, "engine": engine}
+    if usecols is not None:
+        kwargs["usecols"] = usecols
+    if dtype:
+        # pandas dtype sözlüğünde olmayan sütun için hata vermez; usecols ile elenenleri de at
+        kwargs["dtype"] = {k: v for k, v in dtype.items() if usecols is None or usecols(k)}
+    return pd.read_excel(path, **kwargs)
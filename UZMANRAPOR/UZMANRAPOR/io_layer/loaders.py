@@ -5,6 +5,9 @@ import re
 from pathlib import Path
 from PySide6.QtWidgets import QMessageBox
 
+from io_layer.excel_reader import column_filter, read_excel_fast
+from io_layer.parse_cache import cached_load
+
 
 VISIBLE_COLUMNS = [
     "Tezgah Numarası", "Kök Tip Kodu",
@@ -38,6 +41,27 @@ HEADER_ALIASES = {
     # "Tezgah No": "Tezgah Numarası",
 }
 
+# Dinamik'ten okunacak sütunlar: görünür sütunlar + hesaplarda kaynak olanlar.
+# Başlığı bu anahtar kelimelerden birini içeren sütunlar da okunur (diğer sekmeler farklı adlar arar).
+DINAMIK_SOURCE_COLUMNS = VISIBLE_COLUMNS + [
+    "Atkı-1 İşletme Depoları", "Atkı-1 İşletme Diğer Depoları",
+    "Atkı-2 İşletme Depoları", "Atkı-2 İşletme Diğer Depoları",
+    "Atkı İplik No 1", "Atkı İplik No 2", "Çözgü İplik No 1", "Çözgü İplik No 2",
+]
+DINAMIK_KEYWORDS = [
+    "LEVENT", "TEZGAH", "TARAK", "TIP", "ORGU", "ZEMIN", "ATKI", "COZGU", "IPLIK",
+    "IHZARAT", "IHRAZAT", "BOYA", "HASIL", "SUS KENAR", "SELVEDGE", "TERMIN", "METRE",
+    "ETIKET", "DURUM", "KESIM", "SIPARIS", "IS EMRI", "MAMUL", "PARTI", "BOLUM",
+    "KATEGORI", "CERCEVE", "NOT",
+]
+# Metin olarak kalması gereken kimlik sütunları (float'a dönüp ".0" almasın)
+DINAMIK_DTYPES = {"Levent Etiket FA": str, "Haşıl İş Emri": str}
+
+# Parse önbelleği anahtarı; loader çıktısını değiştiren her düzenlemede artırın
+DINAMIK_LOADER_VERSION = 1
+RUNNING_LOADER_VERSION = 1
+
+
 def _norm(s: str) -> str:
     if s is None: return ""
     return str(s).translate(TR_MAP).strip()
@@ -118,15 +142,22 @@ def _pick_levent_no_fa(df: pd.DataFrame):
     return pd.Series([""]*len(df)), ""
 
 def load_dinamik_any(path: str|Path) -> pd.DataFrame:
-    p = str(path).lower()
-    if p.endswith(".xlsb"):
-        df = pd.read_excel(path, engine="pyxlsb")
-    else:
-        df = pd.read_excel(path, sheet_name=0, engine="openpyxl")
+    # Aynı dosya (içerik hash'i) tekrar açılırsa parse edilmiş hali yerel önbellekten gelir
+    return cached_load(path, "dinamik", DINAMIK_LOADER_VERSION, _load_dinamik_uncached)
+
+
+def _load_dinamik_uncached(path: str|Path) -> pd.DataFrame:
+    usecols = column_filter(DINAMIK_SOURCE_COLUMNS, DINAMIK_KEYWORDS, norm=_norm_upper)
+    df = read_excel_fast(path, usecols=usecols, dtype=DINAMIK_DTYPES)
     df = df.copy()
     df.columns = [str(c).strip() for c in df.columns]
 
     lev_series, lev_col = _pick_levent_no_fa(df)
+    if "LEVENT" not in _norm_upper(lev_col):
+        # Levent sütunu adından bulunamadı -> konuma göre (14. sütun) seçim gerekir; tüm sütunlarla tekrar oku
+        df = read_excel_fast(path, dtype=DINAMIK_DTYPES)
+        df.columns = [str(c).strip() for c in df.columns]
+        lev_series, lev_col = _pick_levent_no_fa(df)
     lev_series_clean = pd.to_numeric(lev_series, errors="coerce").astype("Int64").astype(str).replace("<NA>", "")
     df["Levent No"] = lev_series_clean
     df["_LeventSource"] = lev_col
@@ -241,7 +272,12 @@ def _combine_yarn_with_number(df: pd.DataFrame, yarn_col: str, num_col: str) ->
 
 
 def load_running_orders(path: str|Path) -> pd.DataFrame:
-    df = pd.read_excel(path, sheet_name=0, engine="openpyxl")
+    return cached_load(path, "running", RUNNING_LOADER_VERSION, _load_running_uncached)
+
+
+def _load_running_uncached(path: str|Path) -> pd.DataFrame:
+    # Tarak / durum tespiti tüm sütunları taradığı için burada sütun elenmez
+    df = read_excel_fast(path)
     df = df.copy()
     df.columns = [str(c).strip() for c in df.columns]
 
@@ -275,12 +311,13 @@ def load_running_orders(path: str|Path) -> pd.DataFrame:
         cn = _norm_upper(c)
         if any(k in cn for k in ["SIPARIS","DURUM","DURUS","DURUŞ"]):
             flags.append(c)
-    def has_siparis_yok(row)->bool:
-        for c in flags:
-            val = _norm_upper(row.get(c, ""))
-            if "SIPARIS YOK" in val: return True
-        return False
-    df["_OpenTezgahFlag"] = df.apply(has_siparis_yok, axis=1)
+    # Satır satır apply yerine yalnız bayrak sütunlarında vektörel arama
+    open_flag = pd.Series(False, index=df.index)
+    for c in flags:
+        col = df[c]
+        val = col.where(col.notna(), "").astype(str).str.translate(TR_MAP).str.strip().str.upper()
+        open_flag |= val.str.contains("SIPARIS YOK", regex=False)
+    df["_OpenTezgahFlag"] = open_flag
 
     kalan_col = None
     for name in ["Kalan", "Kalan Mt", "Kalan Metre", "Kalan_Metre"]:
@@ -293,7 +330,7 @@ import pandas as pd
 from app.storage import (
     load_loom_cut_map, load_type_selvedge_map, save_type_selvedge_map
 )
-def enrich_running_with_loom_cut(df_run: pd.DataFrame) -> pd.DataFrame:
+def enrich_running_with_loom_cut(df_run: pd.DataFrame, cut_map: dict | None = None) -> pd.DataFrame:
     if df_run is None or df_run.empty:
         return df_run
     col_tz = None
@@ -312,14 +349,19 @@ def enrich_running_with_loom_cut(df_run: pd.DataFrame) -> pd.DataFrame:
             return "ISAVERKit"
         return None
 
-    d = load_loom_cut_map()  # {"2201":"ISAVER", ...}
+    # cut_map: açılışta paralel okunmuş harita verilebilir; yoksa SQL'den okunur
+    d = cut_map if cut_map is not None else load_loom_cut_map()  # {"2201":"ISAVER", ...}
     df_run = df_run.copy()
     df_run["ISAVER/ROTOCUT"] = df_run[col_tz].astype(str).map(lambda x: _norm_choice(d.get(x, None)))
     return df_run
 
 
 
-def enrich_running_with_selvedge(df_run: pd.DataFrame, df_dinamik: pd.DataFrame) -> pd.DataFrame:
+def enrich_running_with_selvedge(
+    df_run: pd.DataFrame,
+    df_dinamik: pd.DataFrame,
+    lib: dict | None = None,
+) -> pd.DataFrame:
     """
     Kök Tip → Süs Kenar kütüphanesini günceller ve df_run'a 'Süs Kenar' sütununu oluşturur.
 
@@ -331,12 +373,13 @@ def enrich_running_with_selvedge(df_run: pd.DataFrame, df_dinamik: pd.DataFrame)
           - EVET: lib'teki değer yeni değere güncellenir.
           - HAYIR: lib'teki eski değer korunur.
     - Running'de KökTip kolonu bulunursa, kütüphaneden 'Süs Kenar' doldurulur.
+    - lib verilirse (önceden okunmuş kütüphane) SQL'e tekrar gidilmez.
     """
     if df_run is None or df_run.empty:
         return df_run
 
     # 1) Kütüphaneyi SQL'den oku
-    lib = load_type_selvedge_map()  # {"KOKTIP":"SÜS", ...}
+    lib = dict(lib) if lib is not None else load_type_selvedge_map()  # {"KOKTIP":"SÜS", ...}
 
     # 1.a) Dinamik'ten yeni / revize bilgileri topla
     if df_dinamik is not None and not df_dinamik.empty:
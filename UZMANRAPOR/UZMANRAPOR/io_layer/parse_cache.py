@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pyarrow bağımlılıklarda tanımlı; kurulu değilse yalnız pickle biçimi kullanılır (ilk yazmada uyarılır)
+    pa = None
+    pq = None
+
+# Aynı Excel dosyası vardiya içinde tekrar tekrar açılıyor: parse sonucunu yerel diskte,
+# dosya içeriğinin hash'i + loader sürümüyle saklarız. Boyut sınırı aşılınca en eski
+# kullanılan (LRU) girdiler silinir.
+CACHE_DIR_ENV = "UZMANRAPOR_CACHE_DIR"
+CACHE_MB_ENV = "UZMANRAPOR_PARSE_CACHE_MB"
+DISABLE_ENV = "UZMANRAPOR_PARSE_CACHE_OFF"
+
+_NAN_COLS_KEY = b"uzmanrapor_nan_cols"
+_lock = threading.Lock()
+_arrow_missing_reported = False
+
+
+def cache_dir() -> Path:
+    raw = os.getenv(CACHE_DIR_ENV)
+    if raw:
+        base = Path(raw)
+    elif os.getenv("LOCALAPPDATA"):
+        base = Path(os.environ["LOCALAPPDATA"]) / "UZMANRAPOR"
+    else:
+        base = Path.home() / ".cache" / "uzmanrapor"
+    return base / "parse_cache"
+
+
+def _max_bytes() -> int:
+    try:
+        return int(float(os.getenv(CACHE_MB_ENV, "500")) * 1024 * 1024)
+    except ValueError:
+        return 500 * 1024 * 1024
+
+
+def file_digest(path: str | Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ------------------------------------------------------------------
+# Biçimler: Parquet (tercih) / pickle (Arrow'un temsil edemediği karışık tipli sütunlar)
+# ------------------------------------------------------------------
+
+def frame_to_table(df: pd.DataFrame):
+    """
+    DataFrame -> Arrow tablosu. Arrow None ile NaN'ı ayırt etmez (ikisi de null); okurken aynı
+    eksik değeri geri vermek için NaN kullanan object sütunlarını şemaya not ederiz.
+    Aynı sütunda ikisi birden varsa ValueError (çağıran pickle'a düşer).
+    """
+    nan_cols: list[str] = []
+    for col in df.columns:
+        ser = df[col]
+        if ser.dtype != object:
+            continue
+        missing = ser.isna()
+        if not missing.any():
+            continue
+        is_none = ser.map(lambda v: v is None)
+        if is_none[missing].all():
+            continue  # eksikler yalnız None -> Arrow zaten None döndürür
+        if is_none.any():
+            raise ValueError(f"'{col}' sütununda None ve NaN karışık")
+        nan_cols.append(str(col))
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    meta = dict(table.schema.metadata or {})
+    meta[_NAN_COLS_KEY] = json.dumps(nan_cols).encode("utf-8")
+    return table.replace_schema_metadata(meta)
+
+
+def table_to_frame(table) -> pd.DataFrame:
+    raw = (table.schema.metadata or {}).get(_NAN_COLS_KEY, b"[]")
+    df = table.to_pandas()
+    # pandas 3: metin sütunları str dtype'a dönüşür (None -> NaN); kaydedilen object dtype geri verilir
+    for meta in (table.schema.pandas_metadata or {}).get("columns", []):
+        name = meta.get("name")
+        if meta.get("numpy_type") == "object" and name in df.columns and df[name].dtype != object:
+            values = table.column(meta["field_name"]).to_numpy(zero_copy_only=False)
+            df[name] = pd.Series(values, index=df.index, dtype=object)
+    for col in json.loads(raw.decode("utf-8")):
+        if col in df.columns:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return df
+
+
+def _write_parquet(df: pd.DataFrame, target: Path) -> None:
+    pq.write_table(frame_to_table(df), target)
+
+
+def _read_parquet(source: Path) -> pd.DataFrame:
+    return table_to_frame(pq.read_table(source))
+
+
+def _entry_name(kind: str, version: int | str, digest: str) -> str:
+    return f"{kind}-v{version}-{digest}"
+
+
+def _formats() -> tuple[str, ...]:
+    # pyarrow yoksa .parquet girdileri okunamaz: isabet sayılmaz (silinmez de, pyarrow'lu kurulumda işe yarar)
+    return (".parquet", ".pkl") if pq is not None else (".pkl",)
+
+
+def _find(directory: Path, stem: str) -> Path | None:
+    for ext in _formats():
+        p = directory / f"{stem}{ext}"
+        if p.exists():
+            return p
+    return None
+
+
+def _store(df: pd.DataFrame, directory: Path, stem: str) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f".{stem}.{os.getpid()}.{threading.get_ident()}.tmp"
+    global _arrow_missing_reported
+    if pa is None and not _arrow_missing_reported:
+        _arrow_missing_reported = True
+        print("[ParseCache] pyarrow kurulu değil: önbellek pickle biçiminde tutulacak (pip install pyarrow)")
+    try:
+        if pa is not None and df.columns.is_unique:
+            try:
+                _write_parquet(df, tmp)
+                os.replace(tmp, directory / f"{stem}.parquet")
+                return
+            except (ValueError, TypeError, pa.ArrowException):
+                pass
+        with open(tmp, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, directory / f"{stem}.pkl")
+    finally:
+        if tmp.exists():
+            tmp.unlink(missing_ok=True)
+
+
+def _evict(directory: Path, keep: Path | None = None) -> None:
+    limit = _max_bytes()
+    entries = []
+    for p in directory.iterdir():
+        if p.suffix in (".parquet", ".pkl") and p.is_file():
+            st = p.stat()
+            entries.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries, key=lambda e: e[0]):
+        if total <= limit:
+            break
+        if keep is not None and p == keep:
+            continue
+        try:
+            p.unlink()
+            total -= size
+        except OSError:
+            pass
+
+
+def cached_load(
+    path: str | Path,
+    kind: str,
+    version: int | str,
+    loader: Callable[[str | Path], pd.DataFrame],
+) -> pd.DataFrame:
+    """
+    loader(path) sonucunu dosya içeriği hash'i + (kind, version) anahtarıyla önbellekler.
+    Loader mantığı değiştiğinde ``version`` artırılmalıdır; eski girdiler LRU ile silinir.
+    Önbellek okunamaz/yazılamazsa sessizce loader'a düşülür.
+    """
+    if os.getenv(DISABLE_ENV):
+        return loader(path)
+    directory = cache_dir()
+    try:
+        stem = _entry_name(kind, version, file_digest(path))
+    except OSError:
+        return loader(path)
+
+    hit = _find(directory, stem)
+    if hit is not None:
+        try:
+            if hit.suffix == ".parquet":
+                df = _read_parquet(hit)
+            else:
+                with open(hit, "rb") as f:
+                    df = pickle.load(f)
+            os.utime(hit)  # LRU: son kullanım
+            return df
+        except Exception:
+            hit.unlink(missing_ok=True)
+
+    df = loader(path)
+    try:
+        with _lock:
+            _store(df, directory, stem)
+            _evict(directory, keep=_find(directory, stem))
+    except Exception:
+        pass
+    return df
+
+
+def clear() -> None:
+    directory = cache_dir()
+    if not directory.exists():
+        return
+    for p in directory.iterdir():
+        if p.is_file():
+            p.unlink(missing_ok=True)
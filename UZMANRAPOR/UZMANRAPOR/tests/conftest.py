@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Testler proje kökünden (app/, io_layer/) import eder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,109 @@
+from app.etiket_index import EtiketIndex
+
+
+class _Source:
+    """UstaDefteri yerine: (Id, EtiketNo, Tezgah) satırları, damga ve sorgu kaydı."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.stamp = "v1"
+        self.fetches = []
+
+    def fetch(self, after_id):
+        self.fetches.append(after_id)
+        return [r for r in self.rows if r[0] > after_id]
+
+    def count(self, upto_id):
+        return sum(1 for r in self.rows if r[0] <= upto_id)
+
+    def index(self, path=None, verify_sec=300.0):
+        return EtiketIndex(self.fetch, self.count, lambda: self.stamp, path=path, verify_sec=verify_sec)
+
+
+ROWS = [(1, "E100", "2201"), (2, "E200", 2202.0), (3, "E100", "2205"), (4, " ", "2209"), (5, 300.0, None)]
+
+
+def test_initial_build_keeps_newest_row_per_etiket():
+    src = _Source(ROWS)
+    assert src.index().mapping() == {"E100": "2205", "E200": "2202"}
+    assert src.fetches == [0]
+
+
+def test_delta_after_high_water_mark():
+    src = _Source(ROWS)
+    idx = src.index()
+    idx.mapping()
+    src.rows += [(6, "E200", "2301"), (7, "E300", "2302")]
+
+    assert idx.mapping() == {"E100": "2205", "E200": "2301", "E300": "2302"}
+    assert src.fetches == [0, 5]  # yalnız son görülen Id'den sonrası
+    snap = idx.snapshot()
+    assert snap["high_water"] == 7 and snap["rebuilds"] == 1 and snap["delta_rows"] == 7
+
+
+def test_stamp_change_rebuilds():
+    src = _Source(ROWS)
+    idx = src.index()
+    idx.mapping()
+    src.rows = [r for r in src.rows if r[0] != 3]  # uygulamadan silme damgayı yeniler
+    src.stamp = "v2"
+
+    assert idx.mapping() == {"E100": "2201", "E200": "2202"}
+    assert src.fetches == [0, 0]
+    assert idx.snapshot()["rebuilds"] == 2
+
+
+def test_count_mismatch_rebuilds():
+    src = _Source(ROWS)
+    idx = src.index(verify_sec=0)
+    idx.mapping()
+    # Uygulama dışı silme: damga değişmez, Id <= high-water sayısı tutmaz
+    src.rows = [r for r in src.rows if r[0] != 3]
+
+    assert idx.mapping() == {"E100": "2201", "E200": "2202"}
+    assert src.fetches == [0, 0]
+    snap = idx.snapshot()
+    assert snap["verifies"] == 1 and snap["rebuilds"] == 2
+
+
+def test_count_match_does_not_rebuild():
+    src = _Source(ROWS)
+    idx = src.index(verify_sec=0)
+    idx.mapping()
+    idx.mapping()
+    assert src.fetches == [0, 5]
+    assert idx.snapshot()["rebuilds"] == 1
+
+
+def test_disk_round_trip(tmp_path):
+    path = tmp_path / "etiket_index.json"
+    src = _Source(ROWS)
+    first = src.index(path=path).mapping()
+    assert path.exists()
+
+    src.rows.append((6, "E400", "2401"))
+    fresh = src.index(path=path)  # yeniden başlatma: diskteki indeks + yalnız fark
+    assert fresh.mapping() == {**first, "E400": "2401"}
+    assert src.fetches == [0, 5]
+    assert fresh.snapshot()["disk_loads"] == 1
+
+
+def test_corrupt_disk_file_rebuilds(tmp_path):
+    path = tmp_path / "etiket_index.json"
+    path.write_text("{bozuk", encoding="utf-8")
+    src = _Source(ROWS)
+    assert src.index(path=path).mapping() == {"E100": "2205", "E200": "2202"}
+    assert src.fetches == [0]
+
+
+def test_query_error_keeps_last_known_map():
+    src = _Source(ROWS)
+    idx = src.index()
+    idx.mapping()
+
+    def _boom(after_id):
+        raise RuntimeError("413 Result too large")
+
+    idx.fetch_rows = _boom
+    assert idx.mapping() == {"E100": "2205", "E200": "2202"}
+    assert idx.snapshot()["errors"] == 1
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from app.note_engine import NoteEngine, _changed
+
+
+def test_changed_handles_missing_values():
+    old = pd.Series([pd.NA, 1, "a", None, np.nan, pd.NaT, 2], dtype=object)
+    new = pd.Series([pd.NA, pd.NA, "a", np.nan, 3, pd.NaT, 2], dtype=object)
+    assert _changed(old, new).tolist() == [False, True, False, False, True, False, False]
+
+
+def test_changed_nullable_dtypes():
+    old = pd.Series(["x", pd.NA, "y"], dtype="string")
+    new = pd.Series(["x", "z", pd.NA], dtype="string")
+    assert _changed(old, new).tolist() == [False, True, True]
+    ints = pd.Series([1, pd.NA, 3], dtype="Int64")
+    assert not _changed(ints, ints.copy()).any()
+
+
+def test_incremental_update_with_nullable_rule_column():
+    df = pd.DataFrame({"NOTLAR": ["", "", ""], "Tip": pd.Series(["A", pd.NA, "B"], dtype="string")})
+    rules = [{"col": "Tip", "val": "A", "text": "ACİL"}]
+    engine = NoteEngine(lambda v: "" if v is None or pd.isna(v) else str(v).strip())
+    engine.update(df, rules, {}, {})
+    assert df["NOTLAR"].tolist() == ["ACİL", "", ""]
+
+    df.loc[1, "Tip"] = "A"
+    engine.update(df, rules, {}, {})
+    assert df["NOTLAR"].tolist() == ["ACİL", "ACİL", ""]
+    assert engine.stats.incremental == 1
+    assert engine.stats.last_rows == 1
@@ -0,0 +1,44 @@
+import base64
+import os
+import pickle
+
+import pytest
+
+from app import note_rules
+
+RULES = [
+    {"col": "Tip", "val": "A1", "text": "ACİL", "user": "ali", "created_at": "2024-01-02 10:00:00"},
+    {"col": "Tezgah", "val": "2201", "text": "KONTROL", "user": "veli", "created_at": "2024-01-03 11:00:00"},
+]
+
+
+class _Evil:
+    def __reduce__(self):
+        return (os.system, ("echo pwned",))
+
+
+def test_record_roundtrip_keeps_legacy_fingerprint():
+    legacy = note_rules.encode_legacy_rules(RULES)
+    rules, fp = note_rules.decode_record(note_rules.encode_record(RULES, legacy))
+    assert rules == RULES
+    assert fp == note_rules.fingerprint(legacy)
+    assert note_rules.decode_record(note_rules.encode_record(RULES, None))[1] is None
+
+
+def test_record_reader_never_unpickles():
+    legacy = note_rules.encode_legacy_rules(RULES)
+    assert note_rules.decode_record(legacy) is None
+    assert note_rules.decode_record(base64.b64decode(legacy)) is None
+
+
+def test_legacy_records_migrate():
+    assert note_rules.migrate_rules(note_rules.encode_legacy_rules(RULES)) == RULES
+    assert note_rules.migrate_rules(pickle.dumps(RULES)) == RULES
+    assert note_rules.migrate_rule(note_rules.encode_legacy_rule(RULES[0])) == RULES[0]
+
+
+@pytest.mark.parametrize("raw", [pickle.dumps([_Evil()]), base64.b64encode(pickle.dumps({"x": _Evil()})).decode()])
+def test_migration_rejects_globals(raw, monkeypatch):
+    monkeypatch.setattr(os, "system", lambda *_: pytest.fail("pickle payload executed"))
+    assert note_rules.migrate_rules(raw) == []
+    assert note_rules.migrate_rule(raw) is None
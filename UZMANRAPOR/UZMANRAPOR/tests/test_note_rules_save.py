@@ -0,0 +1,92 @@
+import base64
+import pickle
+from contextlib import contextmanager
+
+import pytest
+
+from app import note_rules, storage
+from app.sql_api_client import ApiBatch
+
+OLD = [{"col": "Tip", "val": "A1", "text": "ACİL"}, {"col": "Tezgah", "val": "2201", "text": "KONTROL"}]
+NEW = [{"col": "Tip", "val": "A1", "text": "ACİL"}, {"col": "Tezgah", "val": "2201", "text": "BEKLE"}]
+
+# API NoteRules satırlarını {"Id", "RuleData": base64} olarak döner; batch, istek gövdesi olarak yakalanır
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def execute(self, query, params=None):
+        return self
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    def cursor(self):
+        return _Cursor(self.rows)
+
+    def batch(self):
+        return ApiBatch(self)
+
+    def execute_batch(self, statements):
+        self.statements.extend(statements)
+        return [{} for _ in statements]
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    rows = [(i + 1, base64.b64encode(pickle.dumps(r)).decode("ascii")) for i, r in enumerate(OLD)]
+    c = _Conn(rows)
+
+    @contextmanager
+    def _sql_conn():
+        yield c
+
+    monkeypatch.setattr(storage, "_sql_conn", _sql_conn)
+    monkeypatch.setattr(storage, "_note_rules_table_exists", lambda: True)
+    monkeypatch.setattr(storage, "_LEGACY_RULES", True)
+    return c
+
+
+def _rule_statements(conn, verb):
+    return [st for st in conn.statements if st["query"].upper().startswith(verb) and "NoteRules" in st["query"]]
+
+
+def test_changed_rule_is_sent_as_varbinary(conn):
+    assert storage.save_rules(NEW, storage.Baseline("NoteRules", {}, "v1"))
+
+    (update,) = _rule_statements(conn, "UPDATE")
+    (row,) = update["many"]
+    blob, rid = row
+    assert rid == 2
+    # str değil, {"$b64": ...}: API bunu bytes olarak varbinary'ye bağlar
+    assert isinstance(blob, dict)
+    assert note_rules.migrate_rule(base64.b64decode(blob["$b64"])) == NEW[1]
+    assert not _rule_statements(conn, "INSERT INTO DBO")
+
+
+def test_unchanged_rules_are_not_rewritten(conn):
+    assert storage.save_rules(OLD + [{"col": "Tip", "val": "B2", "text": "YENİ"}], storage.Baseline("NoteRules", {}, "v1"))
+
+    assert not _rule_statements(conn, "UPDATE")
+    (insert,) = _rule_statements(conn, "INSERT INTO DBO")
+    assert all(isinstance(r[0], dict) and "$b64" in r[0] for r in insert["many"])
+
+
+def test_default_save_writes_no_pickle(conn, monkeypatch):
+    monkeypatch.setattr(storage, "_LEGACY_RULES", False)
+    monkeypatch.setattr(note_rules, "encode_legacy_rule", lambda rule: pytest.fail("pickle yazılmamalı"))
+    assert storage.save_rules(NEW, storage.Baseline("NoteRules", {}, "v1"))
+
+    assert not _rule_statements(conn, "UPDATE") and not _rule_statements(conn, "INSERT INTO DBO")
+    # Eski AppMeta anahtarı boşaltılır (UPDATE ... MetaValue = ? WHERE MetaKey = ?)
+    (legacy,) = [st["params"] for st in conn.statements if "AppMeta" in st["query"] and st["query"].startswith("UPDATE")
+                 and list(st.get("params") or [])[-1:] == [storage._LEGACY_RULES_KEY]]
+    assert legacy[0] is None
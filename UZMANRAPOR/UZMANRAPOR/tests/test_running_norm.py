@@ -0,0 +1,193 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.running_norm import normalize_df_running, norm_tarak_series, parse_number_loose_series
+
+# ------------------------------------------------------------
+#  Eski satır bazlı normalizasyon (gui.py'den taşınmadan önceki hali): altın referans
+# ------------------------------------------------------------
+
+def _parse_number_loose(x):
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return pd.NA
+    s = str(x).strip()
+    if s == "" or s == "-":
+        return pd.NA
+    s = re.sub(r"[^0-9,.\-]", "", s)
+
+    if "," in s and "." in s:
+        if s.rfind(",") > s.rfind("."):
+            s = s.replace(".", "")
+            s = s.replace(",", ".")
+        else:
+            s = s.replace(",", "")
+    else:
+        if "," in s:
+            parts = s.split(",")
+            if len(parts[-1]) <= 2:
+                s = s.replace(".", "")
+                s = s.replace(",", ".")
+            else:
+                s = s.replace(",", "")
+        elif "." in s:
+            parts = s.split(".")
+            if len(parts[-1]) > 2:
+                s = s.replace(".", "")
+
+    try:
+        return float(s)
+    except Exception:
+        return pd.NA
+
+
+def _extract_nums_keep_decimal(text):
+    if text is None:
+        return []
+    nums = re.findall(r"[\d]+(?:[.,]\d+)?", str(text))
+    out = []
+    for n in nums:
+        n = n.replace(",", ".")
+        if re.fullmatch(r"\d+\.0+", n):
+            n = n.split(".", 1)[0]
+        out.append(n)
+    return out
+
+
+def _norm_tarak_generic(val):
+    if val is None or (isinstance(val, float) and pd.isna(val)):
+        return ""
+    parts = _extract_nums_keep_decimal(str(val))
+    if not parts:
+        return str(val).strip()
+    return "/".join(parts[:3])
+
+
+def _detect_94_row(row):
+    for c in row.index:
+        u = str(row.get(c, "")).strip().upper()
+        if "SİPARİŞ YOK" in u or "SIPARIS YOK" in u or u == "94" or " 94" in u:
+            return True
+    return False
+
+
+def _old_normalize(df_running):
+    kalan_cols = ["Kalan", "Kalan Mt", "Kalan Metre", "Kalan_Metre", "_KalanMetre"]
+    kal_col = next((c for c in kalan_cols if c in df_running.columns), None)
+    if kal_col:
+        df_running["_KalanMetreNorm"] = df_running[kal_col].apply(_parse_number_loose)
+    else:
+        df_running["_KalanMetreNorm"] = pd.NA
+
+    tg_col = next((c for c in ["Tarak Grubu", "Tarak", "TarakGrubu"] if c in df_running.columns), None)
+    if tg_col:
+        df_running["_TG_norm"] = df_running[tg_col].astype(str).apply(_norm_tarak_generic)
+    else:
+        df_running["_TG_norm"] = ""
+
+    df_running["_OpenTezgahFlag"] = df_running.apply(_detect_94_row, axis=1)
+
+    durum_col = next((c for c in ["Durum", "Durumu", "Durum Açıklaması", "Durum Tanım"] if c in df_running.columns), None)
+    if durum_col:
+        def _is_bitti(val):
+            s = str(val or "").strip().upper()
+            return ("BİTTİ" in s) or ("BITTI" in s)
+        bitti_series = df_running[durum_col].apply(_is_bitti)
+    else:
+        bitti_series = pd.Series(False, index=df_running.index)
+
+    df_running["_OpenTezgahFlag"] = df_running["_OpenTezgahFlag"].astype(bool) | bitti_series.astype(bool)
+    return df_running
+
+
+# ------------------------------------------------------------
+#  Temsilî Running çerçeveleri
+# ------------------------------------------------------------
+
+KALAN_VALUES = [
+    "92,7", "1.234,56", "1,234.56", " 300 ", "92,7 m", "-", "", "abc", "1.234", "1,234",
+    "12.5", "0,05", "-15,5", "1.2.3", "--", "m", None, np.nan, 1500, 12.25, "7,", ",5",
+]
+TARAK_VALUES = [
+    "120/2/4", "120,0 / 2 / 4", "Tarak 110.5-3-2-9", "yok", "  ABC ", "", None, np.nan, 120, 12.0, "5,00/3",
+]
+DURUM_VALUES = ["Çalışıyor", "BİTTİ", "bitti", "Bitti ", "", None, np.nan, 0, False, "Duruş 94", "94"]
+NOTE_VALUES = ["", "SİPARİŞ YOK", "siparis yok", "x 94", "194", "94", "A94", None, np.nan]
+
+
+def _frame(n: int, seed: int, kalan_col: str = "Kalan", with_int94: bool = True) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    pick = lambda vals: [vals[i] for i in rng.integers(0, len(vals), n)]  # noqa: E731
+    df = pd.DataFrame({
+        "Tezgah No": rng.integers(1, 400, n),
+        kalan_col: pick(KALAN_VALUES),
+        "Tarak Grubu": pick(TARAK_VALUES),
+        "Durum": pick(DURUM_VALUES),
+        "Not": pick(NOTE_VALUES),
+        "Verim": rng.random(n) * 100,
+        "Başlangıç": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 100, n), unit="D"),
+        "Aktif": rng.integers(0, 2, n).astype(bool),
+    })
+    if with_int94:
+        df["Kod"] = rng.choice([93, 94, 194, 940], n)
+    return df
+
+
+def _assert_same(new: pd.DataFrame, old: pd.DataFrame) -> None:
+    assert new["_KalanMetreNorm"].dtype == old["_KalanMetreNorm"].dtype
+    pd.testing.assert_series_equal(new["_KalanMetreNorm"], old["_KalanMetreNorm"])
+    # pandas 3: eski astype(str).apply çıktısı str dtype olabilir; değerler aynı olmalı
+    pd.testing.assert_series_equal(new["_TG_norm"], old["_TG_norm"], check_dtype=False)
+    pd.testing.assert_series_equal(new["_OpenTezgahFlag"], old["_OpenTezgahFlag"])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_normalize_matches_row_wise(seed):
+    df = _frame(500, seed)
+    _assert_same(normalize_df_running(df.copy()), _old_normalize(df.copy()))
+
+
+@pytest.mark.parametrize("kalan_col", ["Kalan Mt", "_KalanMetre"])
+def test_normalize_alternate_columns(kalan_col):
+    df = _frame(200, 42, kalan_col=kalan_col, with_int94=False)
+    _assert_same(normalize_df_running(df.copy()), _old_normalize(df.copy()))
+
+
+def test_normalize_without_optional_columns():
+    df = pd.DataFrame({"Tezgah No": [1, 2, 3], "Açıklama": ["SIPARIS YOK", "", None]})
+    _assert_same(normalize_df_running(df.copy()), _old_normalize(df.copy()))
+
+
+def test_all_numbers_parseable_stays_float():
+    ser = pd.Series(["92,7", "1.234,56", "300", 12.5])
+    out = parse_number_loose_series(ser)
+    assert out.dtype == "float64"
+    assert out.tolist() == [92.7, 1234.56, 300.0, 12.5]
+
+
+def test_unparseable_and_nan_become_na():
+    ser = pd.Series(["abc", np.nan, None, "-", "92,7"])
+    out = parse_number_loose_series(ser)
+    assert out.dtype == object
+    assert out.iloc[:4].map(lambda v: v is pd.NA).all()
+    assert out.iloc[4] == 92.7
+
+
+def test_tarak_keeps_comma_decimals():
+    ser = pd.Series(["110,5/3/2", "120,0-2-4-6", "yok"])
+    assert norm_tarak_series(ser).tolist() == ["110.5/3/2", "120/2/4", "yok"]
+
+
+def test_empty_frame_passthrough():
+    df = pd.DataFrame(columns=["Kalan", "Durum"])
+    assert normalize_df_running(df) is df
+
+
+def test_blank_tarak_does_not_borrow_another_rows_value():
+    # pandas 3'te astype(str) NaN'ı NA bırakır; factorize -1 kodu son benzersizin sonucunu okuyordu
+    out = norm_tarak_series(pd.Series(["110/3/2", None, "80/2/1"]))
+    assert out.iloc[0] == "110/3/2" and out.iloc[2] == "80/2/1"
+    assert out.iloc[1] not in ("110/3/2", "80/2/1")
+    assert len(norm_tarak_series(pd.Series([None, np.nan]))) == 2
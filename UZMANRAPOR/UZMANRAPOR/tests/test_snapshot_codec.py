@@ -0,0 +1,65 @@
+import zlib
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import snapshot_codec as sc
+
+
+def _frame():
+    return pd.DataFrame({
+        "Tezgah": [2201, 2202, 2203],
+        "Metre": [92.7, np.nan, 1234.56],
+        # object dtype açıkça: pandas 3'ün str dtype'ı None'u NaN'a çevirir
+        "Tip": pd.Series(["A1", None, "B2"], dtype=object, index=[10, 11, 12]),      # eksik: None
+        "Not": pd.Series(["x", np.nan, "y"], dtype=object, index=[10, 11, 12]),      # eksik: NaN
+        "Karisik": [1, "iki", 3.0],                              # karışık tipli sütun
+        "Tarih": pd.to_datetime(["2024-01-01", None, "2024-03-01"]),
+        "Aktif": [True, False, True],
+    }, index=[10, 11, 12])
+
+
+def _assert_round_trip(df, blob):
+    out = sc.decode_frame(blob)
+    pd.testing.assert_frame_equal(out, df)
+    # None / NaN ayrımı korunur
+    assert out["Tip"].iloc[1] is None
+    assert isinstance(out["Not"].iloc[1], float) and np.isnan(out["Not"].iloc[1])
+
+
+def test_round_trip_mixed_and_missing_values():
+    df = _frame()
+    blob = sc.encode_frame(df)
+    assert blob.startswith(sc.MAGIC)
+    _assert_round_trip(df, blob)
+
+
+def test_parquet_round_trip_without_mixed_column():
+    pytest.importorskip("pyarrow")
+    df = _frame().drop(columns=["Karisik"])
+    blob = sc.encode_frame(df)
+    assert sc.describe(blob) == "parquet-zstd"
+    _assert_round_trip(df, blob)
+
+
+def test_pickle_fallback_for_duplicate_columns():
+    df = pd.DataFrame([[1, "a"], [2, None]], columns=["A", "A"])
+    blob = sc.encode_frame(df)
+    assert sc.describe(blob) == "pickle"
+    pd.testing.assert_frame_equal(sc.decode_frame(blob), df)
+
+
+def test_legacy_blob_decodes():
+    df = _frame()
+    legacy = zlib.compress(pickle.dumps(df), level=9)  # eski save_df_snapshot: pickle -> zlib-9
+    assert sc.describe(legacy) == "legacy-pickle-zlib"
+    _assert_round_trip(df, legacy)
+    _assert_round_trip(df, sc.encode_legacy_frame(df))
+
+
+def test_unknown_version_is_reported():
+    blob = sc.MAGIC + bytes([sc.VERSION + 1, sc.FMT_PICKLE, sc.COMP_NONE]) + b"\0" * 8
+    with pytest.raises(sc.SnapshotFormatError):
+        sc.decode_frame(blob)
@@ -0,0 +1,88 @@
+# tools/bench_arrow_vs_json.py
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------------------
+# /sql (JSON) ile /sql/arrow (Arrow IPC) karşılaştırması.
+# UstaDefteri'nden N satır çekip "istek + DataFrame'e çevirme" süresini ölçer.
+# Çalıştırma (UZMANRAPOR/UZMANRAPOR klasöründen):
+#   python tools/bench_arrow_vs_json.py [satir_sayisi] [tekrar]
+# -------------------------------------------------------------------
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd  # noqa: E402
+
+from app.db_name import DB_NAME  # noqa: E402
+from app.sql_api_client import ArrowUnavailable, get_sql_connection  # noqa: E402
+
+ROWS = 20000
+REPEAT = 3
+
+
+def _query(rows: int) -> str:
+    return (
+        f"SELECT TOP ({int(rows)}) * FROM [{DB_NAME}].[dbo].[UstaDefteri] "
+        f"ORDER BY Id"
+    )
+
+
+def _json_df(sql: str) -> pd.DataFrame:
+    conn = get_sql_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql)
+        rows = cur.fetchall()
+        cols = [d[0] for d in cur.description] if cur.description else []
+        df = pd.DataFrame(rows, columns=cols)
+        # JSON'da tarih string gelir; Arrow ile adil kıyas için parse et
+        if "Tarih" in df.columns:
+            df["Tarih"] = pd.to_datetime(df["Tarih"], errors="coerce")
+        return df
+    finally:
+        conn.close()
+
+
+def _arrow_df(sql: str) -> pd.DataFrame:
+    conn = get_sql_connection()
+    try:
+        table = conn.fetch_arrow(sql)
+        return table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+    finally:
+        conn.close()
+
+
+def _best_of(fn, sql: str, repeat: int) -> tuple[float, pd.DataFrame]:
+    best = float("inf")
+    df = pd.DataFrame()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        df = fn(sql)
+        best = min(best, time.perf_counter() - t0)
+    return best, df
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else REPEAT
+    sql = _query(rows)
+
+    t_json, df_json = _best_of(_json_df, sql, repeat)
+    print(f"JSON : {t_json * 1000:8.1f} ms  rows={len(df_json)}  mem={df_json.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+
+    try:
+        t_arrow, df_arrow = _best_of(_arrow_df, sql, repeat)
+    except ArrowUnavailable as exc:
+        print(f"Arrow: kullanılamıyor ({exc})")
+        return
+    print(f"Arrow: {t_arrow * 1000:8.1f} ms  rows={len(df_arrow)}  mem={df_arrow.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    print(f"Hızlanma: x{t_json / t_arrow:.2f}")
+    print("Arrow dtypes:")
+    print(df_arrow.dtypes.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# tools/bench_excel_readers.py
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+# -------------------------------------------------------------------
+# Excel okuma motorlarının karşılaştırması (örnek bir Dinamik dosyası ile).
+# Her motor için: tüm sütunlar / yalnız gereken sütunlar (usecols) ve
+# load_dinamik_any'nin toplam süresi ölçülür.
+# Çalıştırma (UZMANRAPOR/UZMANRAPOR klasöründen):
+#   python tools/bench_excel_readers.py <dinamik.xlsx|xlsb> [tekrar]
+# -------------------------------------------------------------------
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import os  # noqa: E402
+
+from io_layer import excel_reader  # noqa: E402
+from io_layer.excel_reader import column_filter, read_excel_fast  # noqa: E402
+from io_layer.loaders import (  # noqa: E402
+    DINAMIK_DTYPES, DINAMIK_KEYWORDS, DINAMIK_SOURCE_COLUMNS, _norm_upper, load_dinamik_any,
+)
+
+REPEAT = 3
+
+
+def _best_of(fn, repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main() -> None:
+    if len(sys.argv) < 2:
+        print("Kullanım: python tools/bench_excel_readers.py <dinamik.xlsx|xlsb> [tekrar]")
+        return
+    path = sys.argv[1]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else REPEAT
+    usecols = column_filter(DINAMIK_SOURCE_COLUMNS, DINAMIK_KEYWORDS, norm=_norm_upper)
+
+    classic = "pyxlsb" if path.lower().endswith(".xlsb") else "openpyxl"
+    for engine in ["calamine", classic]:
+        os.environ[excel_reader.ENGINE_ENV] = engine
+        if excel_reader.engine_order(path)[0] != engine:
+            print(f"{engine:9s}: kurulu değil, atlandı")
+            continue
+        try:
+            t_all, df_all = _best_of(lambda: read_excel_fast(path), repeat)
+            t_cols, df_cols = _best_of(lambda: read_excel_fast(path, usecols=usecols, dtype=DINAMIK_DTYPES), repeat)
+            t_load, _ = _best_of(lambda: load_dinamik_any(path), repeat)
+        except Exception as exc:
+            print(f"{engine:9s}: hata ({exc})")
+            continue
+        print(
+            f"{engine:9s}: tüm sütunlar {t_all:6.2f} s ({df_all.shape[1]} sütun) | "
+            f"usecols {t_cols:6.2f} s ({df_cols.shape[1]} sütun) | "
+            f"load_dinamik_any {t_load:6.2f} s  satır={len(df_all)}"
+        )
+    os.environ.pop(excel_reader.ENGINE_ENV, None)
+
+
+if __name__ == "__main__":
+    main()
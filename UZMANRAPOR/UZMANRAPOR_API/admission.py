@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+
+class AdmissionRejected(Exception):
+    """Kuyruk dolu ya da bekleme süresi aşıldı; istemci retry_after saniye sonra tekrar denemeli."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class LaneStats:
+    admitted: int = 0         # slot alan istekler
+    immediate: int = 0        # beklemeden slot alanlar
+    rejected_full: int = 0    # kuyruk dolu olduğu için 503
+    rejected_timeout: int = 0 # kuyrukta süre aşımı nedeniyle 503
+    max_queued: int = 0       # görülen en uzun kuyruk
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    busy_ms_total: float = 0.0  # slotta geçen toplam süre (Retry-After tahmini için)
+    completed: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = dict(self.__dict__)
+        data["wait_ms_total"] = round(self.wait_ms_total, 1)
+        data["wait_ms_max"] = round(self.wait_ms_max, 1)
+        data["busy_ms_total"] = round(self.busy_ms_total, 1)
+        data["wait_ms_avg"] = round(self.wait_ms_total / self.admitted, 1) if self.admitted else 0.0
+        return data
+
+
+@dataclass
+class Ticket:
+    lane: str
+    waited_ms: float  # kuyrukta beklenen süre
+    started: float
+    released: bool = False
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.granted = False
+
+
+@dataclass
+class _Lane:
+    name: str
+    slots: int
+    max_queue: int
+    in_use: int = 0
+    queued: int = 0
+    # istemci anahtarı -> bekleyenler; slot boşalınca anahtarlar arasında sırayla (round-robin) verilir
+    queues: "OrderedDict[str, deque[_Waiter]]" = field(default_factory=OrderedDict)
+    recent_waits: "deque[float]" = field(default_factory=lambda: deque(maxlen=512))
+    stats: LaneStats = field(default_factory=LaneStats)
+
+
+class AdmissionController:
+    """
+    Veritabanı işine kabul kontrolü (thread-safe, senkron handler'lar için).
+
+    - Her şerit (ör. "small" kısa okumalar, "bulk" büyük okuma/yazmalar) ayrı eşzamanlılık
+      sınırına sahiptir; büyük işler kısa sorguların slotlarını tüketemez.
+    - Slot yoksa istek kendi istemci anahtarının kuyruğuna girer; boşalan slot istemciler
+      arasında sırayla verilir (tek istemcinin yığını diğerlerini bekletmez).
+    - Kuyruk ``max_queue``'yu aşarsa veya bekleme ``timeout``'u geçerse AdmissionRejected.
+    """
+
+    def __init__(self, lanes: dict[str, tuple[int, int]], timeout: float = 10.0, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.timeout = float(timeout)
+        self._lanes = {
+            name: _Lane(name, max(1, int(slots)), max(0, int(max_queue)))
+            for name, (slots, max_queue) in lanes.items()
+        }
+        self._lock = threading.Lock()
+
+    def acquire(self, lane: str, client: str = "", timeout: float | None = None) -> Ticket:
+        """
+        Slot alınana kadar bekler; dönen bilet işi bitince ``release`` ile geri verilmelidir.
+        timeout: bu istek için daha kısa bekleme sınırı (ör. client'ın kalan süresi).
+        """
+        ln = self._lanes[lane]
+        if not self.enabled:
+            return Ticket(lane, 0.0, time.monotonic())
+        limit = self.timeout if timeout is None else max(0.0, min(self.timeout, timeout))
+        waited_ms = self._acquire(ln, client or "-", limit)
+        return Ticket(lane, waited_ms, time.monotonic())
+
+    def release(self, ticket: Ticket) -> None:
+        if not self.enabled or ticket.released:
+            return
+        ticket.released = True
+        self._release(self._lanes[ticket.lane], (time.monotonic() - ticket.started) * 1000.0)
+
+    @contextmanager
+    def slot(self, lane: str, client: str = "", timeout: float | None = None) -> Iterator[Ticket]:
+        ticket = self.acquire(lane, client, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def capacity(self) -> int:
+        """Aynı anda thread tutabilecek en fazla istek: şeritlerin slot + kuyruk toplamı."""
+        return sum(ln.slots + ln.max_queue for ln in self._lanes.values())
+
+    # ------------------------------------------------------------------
+    def _acquire(self, ln: _Lane, client: str, limit: float) -> float:
+        t0 = time.monotonic()
+        with self._lock:
+            if ln.in_use < ln.slots and not ln.queued:
+                ln.in_use += 1
+                ln.stats.admitted += 1
+                ln.stats.immediate += 1
+                ln.recent_waits.append(0.0)
+                return 0.0
+            if ln.queued >= ln.max_queue:
+                ln.stats.rejected_full += 1
+                raise AdmissionRejected(
+                    f"Server busy ({ln.name} queue full: {ln.queued})", self._retry_after_locked(ln)
+                )
+            waiter = _Waiter()
+            ln.queues.setdefault(client, deque()).append(waiter)
+            ln.queued += 1
+            ln.stats.max_queued = max(ln.stats.max_queued, ln.queued)
+
+        waiter.event.wait(limit)
+
+        with self._lock:
+            if not waiter.granted:
+                # Süre doldu: kuyruktan çık (bu arada slot verilmiş olabilir, yukarıda kontrol edildi)
+                q = ln.queues.get(client)
+                if q is not None:
+                    try:
+                        q.remove(waiter)
+                        ln.queued -= 1
+                    except ValueError:
+                        pass
+                    if not q:
+                        ln.queues.pop(client, None)
+                ln.stats.rejected_timeout += 1
+                raise AdmissionRejected(
+                    f"Server busy ({ln.name} queue wait > {limit:g}s)", self._retry_after_locked(ln)
+                )
+            waited_ms = (time.monotonic() - t0) * 1000.0
+            ln.stats.admitted += 1
+            ln.stats.wait_ms_total += waited_ms
+            ln.stats.wait_ms_max = max(ln.stats.wait_ms_max, waited_ms)
+            ln.recent_waits.append(waited_ms)
+            return waited_ms
+
+    def _release(self, ln: _Lane, busy_ms: float) -> None:
+        with self._lock:
+            ln.stats.completed += 1
+            ln.stats.busy_ms_total += busy_ms
+            # Slotu doğrudan sıradaki istemcinin bekleyenine devret (in_use değişmez)
+            if ln.queues:
+                client, q = next(iter(ln.queues.items()))
+                waiter = q.popleft()
+                ln.queued -= 1
+                if q:
+                    ln.queues.move_to_end(client)  # sıra diğer istemcilere geçer
+                else:
+                    ln.queues.pop(client)
+                waiter.granted = True
+                waiter.event.set()
+                return
+            ln.in_use -= 1
+
+    def _retry_after_locked(self, ln: _Lane) -> int:
+        # Kuyruğun boşalması için kaba tahmin: ortalama iş süresi * (kuyruk / slot)
+        avg_ms = ln.stats.busy_ms_total / ln.stats.completed if ln.stats.completed else 1000.0
+        return max(1, min(30, math.ceil(avg_ms * (ln.queued + 1) / ln.slots / 1000.0)))
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = {"enabled": self.enabled, "timeout_sec": self.timeout, "lanes": {}}
+            for ln in self._lanes.values():
+                data = ln.stats.as_dict()
+                waits = sorted(ln.recent_waits)
+                data.update(
+                    slots=ln.slots,
+                    max_queue=ln.max_queue,
+                    in_use=ln.in_use,
+                    queued=ln.queued,
+                    clients_waiting=len(ln.queues),
+                    wait_ms_p50=round(waits[len(waits) // 2], 1) if waits else 0.0,
+                    wait_ms_p95=round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1) if waits else 0.0,
+                )
+                out["lanes"][ln.name] = data
+        return out
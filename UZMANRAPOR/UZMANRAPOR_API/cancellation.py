@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+
+class QueryCancelled(Exception):
+    """İstek, client'ın iptal çağrısıyla durduruldu (çalışmadan önce ya da çalışırken)."""
+
+
+@dataclass
+class CancelStats:
+    started: int = 0            # kayda alınan (request id'li) sorgular
+    cancel_requests: int = 0    # /sql/cancel çağrıları
+    cancelled_running: int = 0  # çalışırken cursor.cancel() ile durdurulanlar
+    cancelled_pending: int = 0  # iptali, sorgu başlamadan önce gelenler
+    unknown: int = 0            # o an çalışmayan (bitmiş / henüz başlamamış) istek için iptal
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+class QueryRegistry:
+    """
+    Çalışan sorguların request id -> cursor kaydı; /sql/cancel buradan cursor.cancel() çağırır.
+
+    İptal, sorgu henüz başlamadan (ör. kabul kuyruğunda beklerken) gelirse id ``pending_ttl``
+    saniye hatırlanır; sorgu başlamak istediğinde QueryCancelled ile hiç çalıştırılmaz.
+    """
+
+    def __init__(self, pending_ttl: float = 60.0, max_pending: int = 4096) -> None:
+        self.pending_ttl = float(pending_ttl)
+        self.max_pending = max(1, int(max_pending))
+        self._running: dict[str, Any] = {}
+        self._pending: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CancelStats()
+
+    def begin(self, request_id: str | None, cursor: Any) -> None:
+        """Cursor'ı iptal edilebilir olarak kaydeder; iptali önceden geldiyse QueryCancelled."""
+        if not request_id:
+            return
+        with self._lock:
+            self._check_locked(request_id)
+            self._running[request_id] = cursor
+            self.stats.started += 1
+
+    def check(self, request_id: str | None) -> None:
+        """Sorgu çalıştırmadan bekleyen istek için (ör. aynı okumayı bekleyen): iptal geldiyse QueryCancelled."""
+        if not request_id:
+            return
+        with self._lock:
+            self._check_locked(request_id)
+
+    def _check_locked(self, request_id: str) -> None:
+        self._expire_locked(time.monotonic())
+        if self._pending.pop(request_id, None) is not None:
+            self.stats.cancelled_pending += 1
+            raise QueryCancelled(f"Request {request_id} was cancelled")
+
+    def end(self, request_id: str | None, cursor: Any) -> None:
+        if not request_id:
+            return
+        with self._lock:
+            if self._running.get(request_id) is cursor:
+                del self._running[request_id]
+
+    @contextmanager
+    def running(self, request_id: str | None, cursor: Any) -> Iterator[None]:
+        """Blok süresince cursor iptal edilebilir; request id yoksa kayıt yapılmaz."""
+        self.begin(request_id, cursor)
+        try:
+            yield
+        finally:
+            self.end(request_id, cursor)
+
+    def cancel(self, request_id: str) -> str:
+        """Dönüş: "cancelled" (çalışıyordu) | "pending" (başlarsa çalışmayacak)."""
+        with self._lock:
+            self.stats.cancel_requests += 1
+            cursor = self._running.get(request_id)
+            if cursor is None:
+                now = time.monotonic()
+                self._expire_locked(now)
+                self._pending[request_id] = now + self.pending_ttl
+                while len(self._pending) > self.max_pending:
+                    self._pending.popitem(last=False)
+                self.stats.unknown += 1
+                return "pending"
+            self.stats.cancelled_running += 1
+        # SQLCancel başka thread'den güvenle çağrılabilir; kilidin dışında yapılır
+        try:
+            cursor.cancel()
+        except Exception:
+            pass
+        return "cancelled"
+
+    def _expire_locked(self, now: float) -> None:
+        while self._pending:
+            _, expires = next(iter(self._pending.items()))
+            if expires > now:
+                break
+            self._pending.popitem(last=False)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["running"] = len(self._running)
+            data["pending"] = len(self._pending)
+        return data
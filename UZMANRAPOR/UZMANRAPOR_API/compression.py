@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+try:
+    import zstandard
+except Exception:  # zstandard opsiyonel; yoksa yalnız gzip
+    zstandard = None
+
+Message = dict[str, Any]
+Send = Callable[[Message], Awaitable[None]]
+
+
+@dataclass
+class EncodingStats:
+    responses: int = 0
+    raw_bytes: int = 0    # sıkıştırmadan önce
+    wire_bytes: int = 0   # ağa giden
+
+    def as_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = dict(self.__dict__)
+        data["ratio"] = round(self.wire_bytes / self.raw_bytes, 4) if self.raw_bytes else None
+        return data
+
+
+def available_encodings() -> list[str]:
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def negotiate(accept: str, preferred: list[str]) -> str | None:
+    """Accept-Encoding başlığından (q=0 olanlar hariç) sunucunun tercih sırasına göre kodlama seçer."""
+    accepted: set[str] = set()
+    for part in accept.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name.strip())
+    for enc in preferred:
+        if enc in accepted or "*" in accepted:
+            return enc
+    return None
+
+
+class _Encoder:
+    """Parça parça sıkıştırır; her parça flush edilir ki akış (NDJSON/Arrow) gecikmeden ilerlesin."""
+
+    def __init__(self, encoding: str, gzip_level: int, zstd_level: int) -> None:
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip başlığı
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(self._flush_mode)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class CompressionMiddleware:
+    """
+    Accept-Encoding'e göre zstd/gzip cevap sıkıştırma (ASGI).
+    - ``minimum_size`` altındaki cevaplar olduğu gibi gider.
+    - Akışlı cevaplar (StreamingResponse) eşik aşılınca parça parça sıkıştırılır.
+    - Zaten Content-Encoding taşıyan cevaplara dokunulmaz.
+    Kodlama başına ham / ağ bayt sayaçları ``stats`` içinde tutulur.
+    """
+
+    def __init__(
+        self,
+        app: Any,
+        minimum_size: int = 1024,
+        encodings: list[str] | None = None,
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+        stats: dict[str, EncodingStats] | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = max(0, int(minimum_size))
+        usable = available_encodings()
+        self.encodings = [e for e in (encodings or usable) if e in usable]
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        # Dışarıdan verilirse (/stats/compression) aynı sözlük güncellenir
+        self.stats: dict[str, EncodingStats] = stats if stats is not None else {}
+
+    def _count(self, encoding: str, raw: int, wire: int, new_response: bool = False) -> None:
+        st = self.stats.setdefault(encoding, EncodingStats())
+        st.responses += int(new_response)
+        st.raw_bytes += raw
+        st.wire_bytes += wire
+
+    async def __call__(self, scope: Message, receive: Any, send: Send) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for k, v in scope.get("headers") or []:
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+                break
+        encoding = negotiate(accept, self.encodings) if accept else None
+        await self.app(scope, receive, _Responder(self, encoding, send).send)
+
+
+class _Responder:
+    def __init__(self, mw: CompressionMiddleware, encoding: str | None, send: Send) -> None:
+        self.mw = mw
+        self.encoding = encoding
+        self._send = send
+        self._start: Message | None = None
+        self._buf = b""
+        self._mode = ""  # "" karar verilmedi | "identity" | "encode"
+        self._encoder: _Encoder | None = None
+
+    def _headers(self, drop: set[bytes]) -> list[tuple[bytes, bytes]]:
+        assert self._start is not None
+        return [(k, v) for k, v in self._start.get("headers") or [] if k.lower() not in drop]
+
+    async def _begin_identity(self) -> None:
+        self._mode = "identity"
+        await self._send(self._start)
+
+    async def _begin_encoded(self, content_length: int | None, raw_length: int | None = None) -> None:
+        self._mode = "encode"
+        self._encoder = _Encoder(self.encoding, self.mw.gzip_level, self.mw.zstd_level)
+        headers = self._headers({b"content-length", b"content-encoding"})
+        headers.append((b"content-encoding", self.encoding.encode("ascii")))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode("ascii")))
+            # İstek bazında tasarrufu görmek için ham boyut (akışlı cevaplarda bilinmez)
+            headers.append((b"x-uncompressed-length", str(raw_length).encode("ascii")))
+        await self._send({**self._start, "headers": headers})
+
+    async def send(self, message: Message) -> None:
+        kind = message.get("type")
+        if kind == "http.response.start":
+            self._start = message
+            already = any(k.lower() == b"content-encoding" for k, _ in message.get("headers") or [])
+            if self.encoding is None or already:
+                await self._begin_identity()
+            return
+        if kind != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if self._mode == "identity":
+            self.mw._count("identity", len(body), len(body), new_response=not more)
+            await self._send(message)
+            return
+
+        if self._mode == "encode":
+            assert self._encoder is not None
+            out = self._encoder.chunk(body) if more else self._encoder.finish(body)
+            self.mw._count(self.encoding, len(body), len(out), new_response=not more)
+            await self._send({"type": "http.response.body", "body": out, "more_body": more})
+            return
+
+        # Karar öncesi: eşiğe kadar biriktir
+        self._buf += body
+        if len(self._buf) < self.mw.minimum_size:
+            if more:
+                return
+            await self._begin_identity()
+            self.mw._count("identity", len(self._buf), len(self._buf), new_response=True)
+            await self._send({"type": "http.response.body", "body": self._buf, "more_body": False})
+            return
+
+        data, self._buf = self._buf, b""
+        if not more:
+            out = _Encoder(self.encoding, self.mw.gzip_level, self.mw.zstd_level).finish(data)
+            await self._begin_encoded(len(out), len(data))
+            self.mw._count(self.encoding, len(data), len(out), new_response=True)
+            await self._send({"type": "http.response.body", "body": out, "more_body": False})
+            return
+
+        await self._begin_encoded(None)
+        out = self._encoder.chunk(data)
+        self.mw._count(self.encoding, len(data), len(out))
+        await self._send({"type": "http.response.body", "body": out, "more_body": True})
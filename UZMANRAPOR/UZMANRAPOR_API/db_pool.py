@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+
+class PoolTimeout(RuntimeError):
+    """Havuzdan belirtilen süre içinde bağlantı alınamadı."""
+
+
+@dataclass
+class PoolStats:
+    hits: int = 0            # boşta bekleyen bağlantı hazır bulundu
+    misses: int = 0          # yeni bağlantı açılması gerekti
+    waits: int = 0           # havuz dolu olduğu için beklendi
+    timeouts: int = 0        # bekleme süresi doldu
+    health_failures: int = 0  # sağlık kontrolünde düşen bağlantılar
+    evicted_idle: int = 0    # uzun süre boşta kaldığı için kapatılanlar
+    discarded: int = 0       # hata sonrası havuza geri konmayanlar
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _Slot:
+    conn: Any
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Sınırlı, thread-safe bağlantı havuzu.
+
+    - En fazla ``max_size`` bağlantı açık tutulur; dolunca ``acquire_timeout`` kadar beklenir.
+    - ``idle_timeout`` saniyeden uzun süre boşta kalan bağlantılar kapatılır.
+    - ``check_after`` saniyeden uzun süre kullanılmamış bağlantı verilmeden önce
+      ``SELECT 1`` ile yoklanır; düşmüşse yenisi açılır.
+    - ``cached_cursor`` bağlantı başına, anahtar başına kalıcı cursor verir: pyodbc aynı
+      cursor'da aynı SQL metni tekrar çalışınca hazırlanmış (prepared) ifadeyi yeniden kullanır.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 15.0,
+        check_after: float = 30.0,
+        name: str = "",
+    ) -> None:
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.idle_timeout = float(idle_timeout)
+        self.acquire_timeout = float(acquire_timeout)
+        self.check_after = float(check_after)
+        self.name = name
+
+        self._idle: list[_Slot] = []
+        self._in_use = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._cursors: dict[int, dict[str, Any]] = {}
+        self.stats = PoolStats()
+
+    # ------------------------------------------------------------------
+    def cached_cursor(self, conn: Any, key: str) -> Any:
+        """Havuzdan alınmış ``conn`` için ``key``'e ait cursor (yoksa açılır)."""
+        with self._cond:
+            per_conn = self._cursors.setdefault(id(conn), {})
+            cur = per_conn.get(key)
+        if cur is None:
+            cur = conn.cursor()
+            with self._cond:
+                per_conn[key] = cur
+        return cur
+
+    def drop_cursor(self, conn: Any, key: str) -> None:
+        """Hata sonrası cursor'ı bırakır; sonraki çağrı temiz bir cursor açar."""
+        with self._cond:
+            cur = self._cursors.get(id(conn), {}).pop(key, None)
+        if cur is not None:
+            _close_quietly(cur)
+
+    def _discard(self, conn: Any) -> None:
+        # Bağlantı kapanırken ona bağlı cursor'lar da bırakılır (id tekrar kullanılabilir)
+        with self._cond:
+            self._cursors.pop(id(conn), None)
+        _close_quietly(conn)
+
+    def _evict_idle_locked(self, now: float) -> list[Any]:
+        if self.idle_timeout <= 0:
+            return []
+        keep: list[_Slot] = []
+        dead: list[Any] = []
+        for slot in self._idle:
+            if now - slot.last_used > self.idle_timeout:
+                dead.append(slot.conn)
+            else:
+                keep.append(slot)
+        self._idle = keep
+        self.stats.evicted_idle += len(dead)
+        return dead
+
+    def _is_healthy(self, conn: Any) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchall()
+            finally:
+                try:
+                    cur.close()
+                except Exception:
+                    pass
+            return True
+        except Exception:
+            return False
+
+    def acquire(self) -> Any:
+        deadline = time.monotonic() + self.acquire_timeout
+        waited = False
+        while True:
+            slot: _Slot | None = None
+            to_close: list[Any] = []
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                now = time.monotonic()
+                to_close = self._evict_idle_locked(now)
+
+                if self._idle:
+                    # LIFO: en son kullanılan (sıcak) bağlantıyı ver
+                    slot = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.max_size:
+                    self._in_use += 1
+                else:
+                    if not waited:
+                        self.stats.waits += 1
+                        waited = True
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.stats.timeouts += 1
+                        raise PoolTimeout(f"No free connection in pool '{self.name}'")
+                    self._cond.wait(remaining)
+                    continue
+
+            for c in to_close:
+                self._discard(c)
+
+            if slot is not None:
+                if time.monotonic() - slot.last_used <= self.check_after or self._is_healthy(slot.conn):
+                    with self._cond:
+                        self.stats.hits += 1
+                    return slot.conn
+                # sağlık kontrolü düştü -> kapat, yerine yenisini aç
+                self._discard(slot.conn)
+                with self._cond:
+                    self.stats.health_failures += 1
+
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self.stats.misses += 1
+            return conn
+
+    def release(self, conn: Any, broken: bool = False) -> None:
+        if not broken:
+            # Açık kalan (commit edilmemiş) işlem varsa temizle
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+
+        with self._cond:
+            self._in_use = max(0, self._in_use - 1)
+            if broken or self._closed:
+                self.stats.discarded += int(broken)
+                self._cond.notify()
+                to_close = conn
+            else:
+                self._idle.append(_Slot(conn=conn))
+                self._cond.notify()
+                to_close = None
+
+        if to_close is not None:
+            self._discard(to_close)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            # rollback başarısız olursa release bağlantıyı bozuk sayıp kapatır
+            self.release(conn)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["idle"] = len(self._idle)
+            data["in_use"] = self._in_use
+            data["max_size"] = self.max_size
+            data["cached_cursors"] = sum(len(v) for v in self._cursors.values())
+        return data
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = [s.conn for s in self._idle]
+            self._idle = []
+            self._cond.notify_all()
+        for c in idle:
+            self._discard(c)
+
+
+class PoolRegistry:
+    """Veritabanı adına göre ayrı havuzlar (UZMANRAPOR_SQL_DATABASES)."""
+
+    def __init__(self, factory: Callable[[str], ConnectionPool]) -> None:
+        self._factory = factory
+        self._pools: dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def get(self, database: str) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(database)
+            if pool is None:
+                pool = self._factory(database)
+                self._pools[database] = pool
+            return pool
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {name: p.snapshot() for name, p in pools.items()}
+
+    def close_all(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for p in pools:
+            p.close()
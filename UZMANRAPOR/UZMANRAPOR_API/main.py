@@ -1,15 +1,53 @@
 from __future__ import annotations
 
 import base64
+import datetime as _dt
+import decimal
+import functools
+import io
+import json
 import os
 import re
-from typing import Any
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
 
+import anyio.to_thread
 import pyodbc
 from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+
+from admission import AdmissionController, AdmissionRejected
+from cancellation import QueryCancelled, QueryRegistry
+from compression import CompressionMiddleware, EncodingStats, available_encodings
+from db_pool import ConnectionPool, PoolRegistry, PoolTimeout
+from metrics import Family, Metrics, MetricsMiddleware, fingerprint
+from result_cache import ResultCache
+from routing import PRIMARY, ReadRouter
+from singleflight import FlightTimeout, SingleFlight
+from statements import STATEMENTS
+
+try:
+    import pyarrow as pa
+except Exception:  # pyarrow opsiyonel; yoksa /sql/arrow 501 döner
+    pa = None
 
 app = FastAPI(title="UzmanRapor API", version="1.0")
+# Request id (X-Request-Id, yoksa üretilir) + istek metrikleri; sıkıştırmanın içinde: baytlar ham boyuttur
+_METRICS = Metrics()
+app.add_middleware(MetricsMiddleware, metrics=_METRICS, slow_ms=float(os.getenv("UZMANRAPOR_SLOW_MS") or "0"))
+# Client Accept-Encoding ile zstd/gzip isterse eşik üstü cevaplar (akışlılar dahil) sıkıştırılır
+_COMPRESSION_STATS: dict[str, EncodingStats] = {}
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("UZMANRAPOR_COMPRESS_MIN_BYTES") or os.getenv("UZMANRAPOR_GZIP_MIN_BYTES") or "1024"),
+    encodings=[e.strip() for e in (os.getenv("UZMANRAPOR_COMPRESSION") or "zstd,gzip").split(",") if e.strip()],
+    stats=_COMPRESSION_STATS,
+)
 
 
 class SqlRequest(BaseModel):
@@ -17,12 +55,50 @@ class SqlRequest(BaseModel):
     params: list[Any] = Field(default_factory=list)
 
 
+class BatchStatement(BaseModel):
+    query: str
+    params: list[Any] = Field(default_factory=list)
+    many: list[list[Any]] | None = Field(
+        default=None, description="Dolu ise ifade her satır için çalışır (executemany)"
+    )
+    expect_rows: int | None = Field(
+        default=None,
+        description="Dolu ise ifade tam bu kadar satırı etkilemeli; aksi halde batch geri alınır (409)",
+    )
+
+
+class SqlBatchRequest(BaseModel):
+    statements: list[BatchStatement] = Field(default_factory=list)
+
+
+class UpsertRequest(BaseModel):
+    table: str = Field(..., description="Upsert izinli tablo (ör. AppMeta)")
+    columns: list[str] = Field(..., description="Anahtar kolonlar dahil yazılacak kolonlar")
+    rows: list[list[Any]] = Field(default_factory=list)
+    database: str = Field(default="", description="Hedef DB; boşsa varsayılan")
+
+
+class CancelRequest(BaseModel):
+    request_id: str
+
+
+class StmtRequest(BaseModel):
+    id: str = Field(..., description="statements.STATEMENTS içindeki ifade adı (ör. meta.get)")
+    params: list[Any] = Field(default_factory=list)
+    database: str = Field(default="", description="Hedef DB; boşsa varsayılan")
+
+
 def _env(name: str, default: str = "") -> str:
     v = os.getenv(name)
     return v.strip() if v else default
 
 
 MAX_ROWS = int(_env("UZMANRAPOR_MAX_ROWS", "20000"))
+STREAM_CHUNK_ROWS = int(_env("UZMANRAPOR_STREAM_CHUNK_ROWS", "1000"))
+STREAM_MAX_ROWS = int(_env("UZMANRAPOR_STREAM_MAX_ROWS", "1000000"))
+BATCH_MAX_ROWS = int(_env("UZMANRAPOR_BATCH_MAX_ROWS", "50000"))
+FAST_EXECUTEMANY = _env("UZMANRAPOR_FAST_EXECUTEMANY", "1").lower() in {"1", "true", "yes"}
+VALIDATE_CACHE_SIZE = int(_env("UZMANRAPOR_VALIDATE_CACHE_SIZE", "1024"))
 
 
 def _require_token(x_token: str | None) -> None:
@@ -36,16 +112,29 @@ def _require_token(x_token: str | None) -> None:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 
-def _sql_conn_str() -> str:
+_CONN_STR_DB = re.compile(r"(?i)\b(?:database|initial catalog)\s*=\s*[^;]*;?")
+
+
+def _with_database(raw: str, database: str | None) -> str:
+    if not database:
+        return raw
+    # Havuz DB bazlı olduğu için Database= kısmını hedef DB ile değiştir
+    base = _CONN_STR_DB.sub("", raw).rstrip()
+    if base and not base.endswith(";"):
+        base += ";"
+    return f"{base}Database={database};"
+
+
+def _sql_conn_str(database: str | None = None) -> str:
     # Tek satır connection string (tercih)
     raw = _env("UZMANRAPOR_SQL_CONN_STR", "")
     if raw:
-        return raw
+        return _with_database(raw, database)
 
     # Parça parça (alternatif)
     driver = _env("UZMANRAPOR_SQL_DRIVER", "{ODBC Driver 18 for SQL Server}")
     server = _env("UZMANRAPOR_SQL_SERVER", r"localhost\SQLEXPRESS")
-    database = _env("UZMANRAPOR_SQL_DATABASE", "UzmanRaporDB_ISKO14")
+    database = database or _env("UZMANRAPOR_SQL_DATABASE", "UzmanRaporDB_ISKO14")
     uid = _env("UZMANRAPOR_SQL_UID", "")
     pwd = _env("UZMANRAPOR_SQL_PWD", "")
     trusted = _env("UZMANRAPOR_SQL_TRUSTED", "")
@@ -67,6 +156,23 @@ def _sql_conn_str() -> str:
     return "".join(parts)
 
 
+def _read_conn_str(database: str | None = None) -> str:
+    """
+    Okuma replikası: UZMANRAPOR_SQL_READ_CONN_STR (ayrı sunucu / ikincil replika) ya da
+    UZMANRAPOR_SQL_READ_INTENT=1 ile birincil string + ApplicationIntent=ReadOnly (AG okuma
+    yönlendirmesi). İkisi de yoksa "" (replika yok, her şey birincile).
+    """
+    raw = _env("UZMANRAPOR_SQL_READ_CONN_STR", "")
+    if raw:
+        return _with_database(raw, database)
+    if _env("UZMANRAPOR_SQL_READ_INTENT", "").lower() in {"1", "true", "yes"}:
+        base = _sql_conn_str(database).rstrip()
+        if base and not base.endswith(";"):
+            base += ";"
+        return f"{base}ApplicationIntent=ReadOnly;"
+    return ""
+
+
 _FORBIDDEN = re.compile(
     r"\b("
     r"create|alter|drop|truncate|grant|revoke|"
@@ -128,6 +234,17 @@ _OBJ_REF = re.compile(
     r"\b(?:(?:\[?(?P<db>\w+)\]?\.)?\[?dbo\]?\.)\[?(?P<table>\w+)\]?\b",
     re.IGNORECASE,
 )
+# FROM / JOIN / INTO / UPDATE / DELETE / MERGE sonrası obje adı (niteliksiz de olabilir: UPDATE AppMeta)
+_NAME_REF = r"(?P<name>(?:\[?\w+\]?\.){0,2}\[?\w+\]?)"
+_BARE_REF = re.compile(
+    r"\b(?:from|join|into|update|delete(?!\s+from\b)|merge)\s+" + _NAME_REF,
+    re.IGNORECASE,
+)
+# yazmanın hedefi: INSERT [INTO] X / UPDATE X / DELETE [FROM] X / MERGE [INTO] X
+_WRITE_TARGET = re.compile(
+    r"\b(?:insert\s+(?:into\s+)?|update\s+|delete\s+(?:from\s+)?|merge\s+(?:into\s+)?)" + _NAME_REF,
+    re.IGNORECASE,
+)
 # exec dbo.sp_x veya exec [db].[dbo].[sp_x]
 _EXEC_REF = re.compile(
     r"\bexec\s+(?:(?P<db>\[?\w+\]?)\.)?\[?dbo\]?\.\[?(?P<proc>\w+)\]?\b",
@@ -135,6 +252,59 @@ _EXEC_REF = re.compile(
 )
 
 
+# ============================================================
+#  BAĞLANTI HAVUZU (DB bazlı)
+# ============================================================
+
+POOL_MAX = int(_env("UZMANRAPOR_POOL_MAX", "10"))
+POOL_IDLE_SEC = float(_env("UZMANRAPOR_POOL_IDLE_SEC", "300"))
+POOL_ACQUIRE_TIMEOUT = float(_env("UZMANRAPOR_POOL_ACQUIRE_TIMEOUT", "15"))
+POOL_CHECK_SEC = float(_env("UZMANRAPOR_POOL_CHECK_SEC", "30"))
+
+
+READ_POOL_MAX = int(_env("UZMANRAPOR_READ_POOL_MAX", str(POOL_MAX)))
+# Replika havuzu dolunca birincile düşmeden önce beklenecek süre (kısa: birincil zaten hazır)
+READ_POOL_ACQUIRE_TIMEOUT = float(_env("UZMANRAPOR_READ_POOL_ACQUIRE_TIMEOUT", "2"))
+
+
+def _make_pool(database: str, read: bool = False) -> ConnectionPool:
+    # database == "" -> env'deki varsayılan connection string aynen kullanılır
+    conn_str = _read_conn_str(database or None) if read else _sql_conn_str(database or None)
+    name = database or "default"
+    return ConnectionPool(
+        lambda: pyodbc.connect(conn_str, timeout=10),
+        max_size=READ_POOL_MAX if read else POOL_MAX,
+        idle_timeout=POOL_IDLE_SEC,
+        acquire_timeout=READ_POOL_ACQUIRE_TIMEOUT if read else POOL_ACQUIRE_TIMEOUT,
+        check_after=POOL_CHECK_SEC,
+        name=f"{name}:read" if read else name,
+    )
+
+
+_POOLS = PoolRegistry(_make_pool)
+_READ_POOLS = PoolRegistry(lambda database: _make_pool(database, read=True))
+
+
+def _target_database(query: str) -> str:
+    """Sorgudaki [DB].[dbo].[X] referansından hedef DB'yi bulur; yoksa "" (varsayılan)."""
+    for m in _OBJ_REF.finditer(query):
+        db = m.group("db")
+        if db and db in _DB_NAMES:
+            return db
+    m = _EXEC_REF.search(query)
+    if m and m.group("db"):
+        db = m.group("db").strip("[]")
+        if db in _DB_NAMES:
+            return db
+    return ""
+
+
+@app.on_event("shutdown")
+def _close_pools() -> None:
+    _POOLS.close_all()
+    _READ_POOLS.close_all()
+
+
 def _validate_query(query: str) -> None:
     q = query.strip()
     if not q:
@@ -186,7 +356,36 @@ def _validate_query(query: str) -> None:
                 raise HTTPException(status_code=403, detail=f"Procedure not allowed: {unqualified}")
 
 
+@functools.lru_cache(maxsize=VALIDATE_CACHE_SIZE)
+def _checked_target(query: str) -> str:
+    """
+    _validate_query + _target_database, metin başına bir kez (LRU).
+    Reddedilen sorgular önbelleğe girmez (HTTPException yükselir).
+    """
+    _validate_query(query)
+    return _target_database(query)
+
+
+# Adlandırılmış ifadeler başlangıçta bir kez doğrulanır; hatalı tanım servisi başlatmaz
+for _sid, _sql in STATEMENTS.items():
+    try:
+        _validate_query(_sql)
+    except HTTPException as _e:
+        raise RuntimeError(f"Invalid registered statement {_sid}: {_e.detail}") from None
+
+
+def _bind_value(p: Any) -> Any:
+    # Tipli binary parametre: {"$b64": "..."} -> bytes (varbinary kolonlar)
+    if isinstance(p, dict) and "$b64" in p:
+        try:
+            return base64.b64decode(p["$b64"])
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid $b64 parameter")
+    return p
+
+
 def _adapt_params(query: str, params: list[Any]) -> list[Any]:
+    params = [_bind_value(p) for p in params]
     # NoteRules varbinary için base64 -> bytes (heuristic)
     q = query.lower()
     if "insert into dbo.noterules" in q and params:
@@ -207,53 +406,1102 @@ def _encode_value(v: Any) -> Any:
     return v
 
 
+# ============================================================
+#  SONUÇ ÖNBELLEĞİ (referans tabloları)
+#  Anahtar: (normalize sorgu, parametreler, DB). API'nin yaptığı her yazma ilgili tablonun
+#  sürümünü artırır; TTL, API dışından (SSMS) yapılan değişiklikler için üst sınırdır.
+# ============================================================
+
+_CACHED_TABLES_DEFAULT = (
+    "LoomCutMap,TypeSelvedgeMap,BlockedLooms,DummyLooms,AppLookupValues,"
+    "TipBuzulmeModel,Makine_Ayar_Tablosu,ItemaAyar"
+)
+
+
+def _table_ttls(raw: str) -> dict[str, float]:
+    # "ItemaAyar=3600,BlockedLooms=60"
+    out: dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, sec = part.partition("=")
+        if name.strip() and sec.strip():
+            out[name.strip()] = float(sec)
+    return out
+
+
+_RESULTS = ResultCache(
+    tables=[t for t in _split_csv_env("UZMANRAPOR_RESULT_CACHE_TABLES") or _CACHED_TABLES_DEFAULT.split(",")
+            if t in _ALLOWED_TABLES],
+    max_bytes=int(float(_env("UZMANRAPOR_RESULT_CACHE_MB", "64")) * 1024 * 1024),
+    ttl=float(_env("UZMANRAPOR_RESULT_CACHE_TTL_SEC", "300")),
+    table_ttls=_table_ttls(_env("UZMANRAPOR_RESULT_CACHE_TTLS", "")),
+)
+
+
+def _copy_result(result: dict[str, Any]) -> dict[str, Any]:
+    """Paylaşılan (önbellek / birleştirilmiş) sonucun isteğe özel kopyası; hücreler zaten değişmez tiplerdir."""
+    out = dict(result)
+    out["columns"] = list(result.get("columns") or [])
+    out["rows"] = [list(row) for row in result.get("rows") or []]
+    return out
+
+
+def _leader_only(e: BaseException) -> bool:
+    """
+    Hata liderin kendi isteğine mi ait (iptal, kendi süresi, kabul reddi)? Bunlar birleştirilen
+    isteklere yayılmaz; bekleyenler kendi request id / süreleriyle yeniden dener.
+    """
+    if isinstance(e, (QueryCancelled, AdmissionRejected)):
+        return True
+    if isinstance(e, HTTPException):
+        # _remaining: liderin süresi çalıştırmadan önce doldu
+        return e.status_code in (499, 504)
+    state = e.args[0] if isinstance(e, pyodbc.Error) and e.args else ""
+    return state in ("HYT00", "HYT01", "HY008")
+
+
+# Aynı anda gelen aynı okuma tek DB çalıştırmasıyla karşılanır (yazmalar asla birleştirilmez)
+_FLIGHTS = SingleFlight(share=_copy_result, own=_leader_only)
+SINGLEFLIGHT = _env("UZMANRAPOR_SINGLEFLIGHT", "1").lower() in {"1", "true", "yes"}
+# Yalnız okuyan prosedürler: EXEC'leri önbelleği boşaltmaz
+_READONLY_PROCS = {p.lower() for p in _split_csv_env("UZMANRAPOR_READONLY_PROCS")}
+
+_WRITE_KW = re.compile(r"\b(insert|update|delete)\b", re.IGNORECASE)
+
+
+_KNOWN_TABLES = {t.lower() for t in _ALLOWED_TABLES}
+
+
+def _ref_name(raw: str) -> str:
+    return raw.rsplit(".", 1)[-1].strip("[]")
+
+
+@functools.lru_cache(maxsize=VALIDATE_CACHE_SIZE)
+def _query_tables(query: str) -> tuple[str, ...]:
+    """
+    Sorgunun dokunduğu tablolar: dbo-nitelikli referanslar + FROM/JOIN/... sonrası niteliksiz adlar.
+    Takma ad / CTE adı da gelebilir; bunlar önbellek tablosu olmadığından sorgu önbelleklenmez.
+    """
+    names = {m.group("table") for m in _OBJ_REF.finditer(query)}
+    names |= {_ref_name(m.group("name")) for m in _BARE_REF.finditer(query)}
+    return tuple(sorted(names))
+
+
+@functools.lru_cache(maxsize=VALIDATE_CACHE_SIZE)
+def _write_tables(query: str) -> tuple[str, ...] | None:
+    """Yazmanın dokunduğu tablolar; hedef çözülemezse (ör. takma adla DELETE t FROM ...) None."""
+    targets = [_ref_name(m.group("name")) for m in _WRITE_TARGET.finditer(query)]
+    if not targets or any(t.lower() not in _KNOWN_TABLES for t in targets):
+        return None
+    return tuple(sorted(set(targets) | set(_query_tables(query))))
+
+
+@functools.lru_cache(maxsize=VALIDATE_CACHE_SIZE)
+def _is_read(query: str) -> bool:
+    head = query.strip().split(None, 1)[0].lower() if query.strip() else ""
+    return head in {"select", "with"} and not _WRITE_KW.search(query)
+
+
+def _after_write(query: str) -> None:
+    """Başarılı yazmadan sonra dokunulan tabloların önbellek sürümünü artırır."""
+    m = _EXEC_REF.search(query)
+    if m and query.strip().lower().startswith("exec"):
+        # Prosedürün hangi tablolara yazdığı bilinmez: salt-okur listesinde değilse hepsi
+        if f"dbo.{m.group('proc')}".lower() not in _READONLY_PROCS:
+            _RESULTS.bump_all()
+        return
+    tables = _write_tables(query)
+    if tables is None:
+        # Hedef tablo çözülemedi: yanlışlıkla bayat veri vermektense tüm önbellek geçersiz
+        _RESULTS.bump_all()
+        return
+    _RESULTS.bump(tables)
+
+
+def _approx_size(result: dict[str, Any]) -> int:
+    # JSON boyutuna yakın, ucuz tahmin (bellek sınırı için)
+    size = 64 + sum(len(str(c)) for c in result.get("columns") or [])
+    for row in result.get("rows") or []:
+        size += sum(len(str(v)) + 4 for v in row)
+    return size
+
+
+def _execute_cached(
+    query: str,
+    raw_params: list[Any],
+    database: str,
+    run: Callable[[], dict[str, Any]],
+    client: str = "",
+    route: str = PRIMARY,
+    deadline: float | None = None,
+    request_id: str | None = None,
+) -> dict[str, Any]:
+    """
+    run() sonucunu referans tabloları için önbellekten verir / önbelleğe koyar; aynı anda
+    çalışan aynı okumaları tek çalıştırmada birleştirir. Yazma ise çalıştırdıktan sonra
+    ilgili tabloları geçersiz kılar ve client'ın okumalarını bir süre birincile yapıştırır.
+    Birleştirilen okuma isteğin süresi / iptali kadar bekler; client'ın son yazmasından önce
+    başlamış bir okumaya katılmaz.
+    """
+    if not _is_read(query):
+        result = run()
+        _after_write(query)
+        _ROUTER.note_write(client)
+        return result
+
+    key = (
+        " ".join(query.split()).rstrip(";"),
+        json.dumps(raw_params, sort_keys=True, default=str, ensure_ascii=False),
+        database,
+        route,  # birincile yapışmış client, replikadan okuyanın sonucunu paylaşmasın
+    )
+    tables = _query_tables(query)
+    load = run
+    if _RESULTS.cacheable(tables):
+        hit = _RESULTS.get(key)
+        if hit is not None:
+            return _copy_result(hit)
+
+        def load() -> dict[str, Any]:
+            deps = _RESULTS.versions(tables)
+            result = run()
+            if result.get("columns"):
+                _RESULTS.put(key, result, _approx_size(result), deps)
+            return result
+
+    if not SINGLEFLIGHT:
+        return load()
+    wait = _remaining(deadline)
+    if wait is None and QUERY_TIMEOUT_SEC > 0:
+        wait = float(QUERY_TIMEOUT_SEC)
+    try:
+        return _FLIGHTS.do(
+            key,
+            load,
+            timeout=wait,
+            check=lambda: _QUERIES.check(request_id),
+            not_before=_ROUTER.last_write(client),
+        )
+    except FlightTimeout:
+        raise HTTPException(status_code=504, detail="Deadline exceeded while waiting for identical query")
+
+
+# ============================================================
+#  KABUL KONTROLÜ (şeritler + istemci bazında adil kuyruk)
+# ============================================================
+
+# small: kısa okumalar (lookup, kayıtlı ifadeler); bulk: akışlar, snapshot, batch ve yazmalar.
+# İki şeridin slot toplamı havuz boyutunu (POOL_MAX) aşmamalı.
+_ADMISSION = AdmissionController(
+    {
+        "small": (int(_env("UZMANRAPOR_SMALL_SLOTS", "6")), int(_env("UZMANRAPOR_SMALL_QUEUE", "64"))),
+        "bulk": (int(_env("UZMANRAPOR_BULK_SLOTS", "3")), int(_env("UZMANRAPOR_BULK_QUEUE", "16"))),
+    },
+    timeout=float(_env("UZMANRAPOR_ADMISSION_TIMEOUT_SEC", "10")),
+    enabled=_env("UZMANRAPOR_ADMISSION", "1").lower() in {"1", "true", "yes"},
+)
+# Senkron handler'lar anyio thread havuzunda (varsayılan 40 thread) çalışır ve kabul kuyruğunda
+# beklerken thread tutar. Havuz slot + kuyruk toplamından küçükse kuyruk dolmadan thread'ler biter,
+# istekler 503 yerine sessizce bekler; havuz bu toplam + diğer işler için pay kadar büyütülür.
+THREADPOOL_SIZE = int(_env("UZMANRAPOR_THREADPOOL_SIZE", "0"))  # 0: otomatik
+THREADPOOL_HEADROOM = int(_env("UZMANRAPOR_THREADPOOL_HEADROOM", "40"))
+
+
+@app.on_event("startup")
+async def _size_threadpool() -> None:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    want = THREADPOOL_SIZE or (_ADMISSION.capacity() + THREADPOOL_HEADROOM)
+    if want > limiter.total_tokens:
+        limiter.total_tokens = want
+    print(f"[API] thread havuzu: {limiter.total_tokens} (kabul kapasitesi {_ADMISSION.capacity()})")
+
+
+# Bu tablolardan okuma da büyük iş sayılır (snapshot blob'ları)
+_BULK_TABLES = {t.lower() for t in (_split_csv_env("UZMANRAPOR_BULK_TABLES") or ["Snapshots"])}
+
+
+def _lane(query: str) -> str:
+    if not _is_read(query):
+        return "bulk"
+    return "bulk" if any(t.lower() in _BULK_TABLES for t in _query_tables(query)) else "small"
+
+
+def _client_key(x_client_id: str | None, x_token: str | None) -> str:
+    # Adillik anahtarı: client'ın gönderdiği X-Client-Id (makine), yoksa token
+    return (x_client_id or "").strip()[:64] or (x_token or "")
+
+
+def _busy(e: AdmissionRejected, deadline: float | None = None) -> HTTPException:
+    if deadline is not None and time.monotonic() >= deadline:
+        # Client'ın süresi kuyrukta doldu; tekrar denemenin anlamı yok
+        return HTTPException(status_code=504, detail="Deadline exceeded while queued")
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+# ============================================================
+#  SÜRE SINIRI VE İPTAL
+# ============================================================
+
+# Client X-Deadline-Ms göndermezse (veya daha uzununu isterse) uygulanan sorgu zaman aşımı; 0: sınırsız
+QUERY_TIMEOUT_SEC = int(_env("UZMANRAPOR_QUERY_TIMEOUT_SEC", "120"))
+# Zaman aşımları bu basamaklara yukarı yuvarlanır; kayıtlı ifade cursor'ları basamak başına bir kez açılır
+_TIMEOUT_STEPS = (1, 2, 3, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+_QUERIES = QueryRegistry()
+
+
+def _deadline(x_deadline_ms: str | None) -> float | None:
+    """X-Deadline-Ms (client'ın isteği gönderirken kalan süresi, ms) -> monotonic son an."""
+    if not x_deadline_ms:
+        return None
+    try:
+        ms = float(x_deadline_ms)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid X-Deadline-Ms header")
+    return time.monotonic() + max(0.0, ms) / 1000.0
+
+
+def _remaining(deadline: float | None) -> float | None:
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise HTTPException(status_code=504, detail="Deadline exceeded before execution")
+    return left
+
+
+def _query_timeout(deadline: float | None) -> int:
+    """ODBC sorgu zaman aşımı (sn): kalan süre basamağa yuvarlanır, QUERY_TIMEOUT_SEC ile sınırlanır."""
+    left = _remaining(deadline)
+    if left is None:
+        return QUERY_TIMEOUT_SEC
+    step = next((t for t in _TIMEOUT_STEPS if t >= left), _TIMEOUT_STEPS[-1])
+    return min(step, QUERY_TIMEOUT_SEC) if QUERY_TIMEOUT_SEC > 0 else step
+
+
+def _cursor(conn: Any, deadline: float | None) -> Any:
+    # pyodbc zaman aşımını cursor açılırken uygular (SQL_ATTR_QUERY_TIMEOUT)
+    conn.timeout = _query_timeout(deadline)
+    return conn.cursor()
+
+
+def _db_error(e: Exception) -> HTTPException:
+    """Sorgu hatası -> HTTP: zaman aşımı (HYT00) 504, iptal (HY008) 499, diğerleri 500."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, QueryCancelled):
+        return HTTPException(status_code=499, detail=str(e))
+    state = e.args[0] if isinstance(e, pyodbc.Error) and e.args else ""
+    if state in ("HYT00", "HYT01"):
+        return HTTPException(status_code=504, detail=f"Query timeout expired: {e}")
+    if state == "HY008":
+        return HTTPException(status_code=499, detail="Query cancelled")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+# ============================================================
+#  OKUMA / YAZMA YÖNLENDİRME (okuma replikası)
+# ============================================================
+
+_ROUTER = ReadRouter(
+    enabled=bool(_read_conn_str()),
+    sticky_sec=float(_env("UZMANRAPOR_READ_STICKY_SEC", "5")),
+    retry_after=float(_env("UZMANRAPOR_READ_RETRY_SEC", "30")),
+)
+
+
+def _read_route(query: str, client: str) -> str:
+    """
+    Sorgunun gideceği sunucu. Yalnız düz okumalar replikaya gidebilir; önbelleklenen referans
+    tabloları birincilden okunur (sürüm tabanlı geçersizleştirme birincildeki yazmalara göre çalışır,
+    replika gecikmesi TTL boyunca önbellekte kalmasın).
+    """
+    if not _is_read(query) or _RESULTS.cacheable(_query_tables(query)):
+        return PRIMARY
+    return _ROUTER.route(client)
+
+
+def _acquire_routed(route: str, database: str) -> tuple[ConnectionPool, Any]:
+    """(havuz, bağlantı); replikadan bağlantı alınamazsa birincile düşülür."""
+    return _ROUTER.acquire(route, lambda: _POOLS.get(database), lambda: _READ_POOLS.get(database))
+
+
+@contextmanager
+def _routed_connection(route: str, database: str) -> Iterator[tuple[ConnectionPool, Any]]:
+    pool, conn = _acquire_routed(route, database)
+    try:
+        yield pool, conn
+    finally:
+        pool.release(conn)
+
+
 @app.get("/health")
 def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/stats/pool")
+def pool_stats(x_token: str | None = Header(default=None)) -> dict[str, Any]:
+    _require_token(x_token)
+    return {
+        "pools": _POOLS.snapshot(),
+        "read_pools": _READ_POOLS.snapshot(),
+        "routing": _ROUTER.snapshot(),
+        "validate_cache": _checked_target.cache_info()._asdict(),
+    }
+
+
+@app.get("/stats/cache")
+def cache_stats(x_token: str | None = Header(default=None)) -> dict[str, Any]:
+    _require_token(x_token)
+    return {"results": _RESULTS.snapshot(), "singleflight": _FLIGHTS.snapshot()}
+
+
+@app.get("/stats/admission")
+def admission_stats(x_token: str | None = Header(default=None)) -> dict[str, Any]:
+    _require_token(x_token)
+    return _ADMISSION.snapshot()
+
+
+@app.get("/stats/queries")
+def query_stats(x_token: str | None = Header(default=None)) -> dict[str, Any]:
+    _require_token(x_token)
+    return {"query_timeout_sec": QUERY_TIMEOUT_SEC, **_QUERIES.snapshot()}
+
+
+@app.get("/stats/compression")
+def compression_stats(x_token: str | None = Header(default=None)) -> dict[str, Any]:
+    _require_token(x_token)
+    return {
+        "available": available_encodings(),
+        "by_encoding": {k: v.as_dict() for k, v in _COMPRESSION_STATS.items()},
+    }
+
+
+def _metric_families() -> list[Family]:
+    """/metrics için havuz, kabul kontrolü, önbellek ve iptal sayaçları."""
+    pools: dict[str, list[tuple[dict[str, str], float]]] = {}
+    for registry in (_POOLS, _READ_POOLS):
+        for name, snap in registry.snapshot().items():
+            for key in ("in_use", "idle", "max_size", "hits", "misses", "waits", "timeouts", "discarded"):
+                pools.setdefault(key, []).append(({"pool": name}, snap[key]))
+    lanes: dict[str, list[tuple[dict[str, str], float]]] = {}
+    for name, snap in _ADMISSION.snapshot()["lanes"].items():
+        for key in ("in_use", "queued", "admitted", "rejected_full", "rejected_timeout"):
+            lanes.setdefault(key, []).append(({"lane": name}, snap[key]))
+    cache = _RESULTS.snapshot()
+    flights = _FLIGHTS.snapshot()
+    queries = _QUERIES.snapshot()
+    routing = _ROUTER.snapshot()
+    return [
+        ("uzmanrapor_pool_connections_in_use", "gauge", "Havuzdan alınmış bağlantılar", pools.get("in_use", [])),
+        ("uzmanrapor_pool_connections_idle", "gauge", "Havuzda boşta bekleyen bağlantılar", pools.get("idle", [])),
+        ("uzmanrapor_pool_max_size", "gauge", "Havuz üst sınırı", pools.get("max_size", [])),
+        ("uzmanrapor_pool_hits_total", "counter", "Boşta bağlantı hazır bulundu", pools.get("hits", [])),
+        ("uzmanrapor_pool_misses_total", "counter", "Yeni bağlantı açıldı", pools.get("misses", [])),
+        ("uzmanrapor_pool_waits_total", "counter", "Havuz dolu olduğu için beklendi", pools.get("waits", [])),
+        ("uzmanrapor_pool_timeouts_total", "counter", "Havuzdan bağlantı alınamadı", pools.get("timeouts", [])),
+        ("uzmanrapor_pool_discarded_total", "counter", "Hata sonrası atılan bağlantılar", pools.get("discarded", [])),
+        ("uzmanrapor_admission_in_use", "gauge", "Dolu kabul slotları", lanes.get("in_use", [])),
+        ("uzmanrapor_admission_queued", "gauge", "Kabul kuyruğunda bekleyenler", lanes.get("queued", [])),
+        ("uzmanrapor_admission_admitted_total", "counter", "Slot alan istekler", lanes.get("admitted", [])),
+        ("uzmanrapor_admission_rejected_full_total", "counter", "Kuyruk dolu (503)", lanes.get("rejected_full", [])),
+        ("uzmanrapor_admission_rejected_timeout_total", "counter", "Kuyrukta süre aşımı (503)", lanes.get("rejected_timeout", [])),
+        ("uzmanrapor_result_cache_hits_total", "counter", "Sonuç önbelleği isabetleri", [({}, cache["hits"])]),
+        ("uzmanrapor_result_cache_misses_total", "counter", "Sonuç önbelleği ıskaları", [({}, cache["misses"])]),
+        ("uzmanrapor_result_cache_bytes", "gauge", "Sonuç önbelleği boyutu", [({}, cache["bytes"])]),
+        ("uzmanrapor_singleflight_coalesced_total", "counter", "Birleştirilen okumalar", [({}, flights["coalesced"])]),
+        ("uzmanrapor_queries_running", "gauge", "İptal edilebilir çalışan sorgular", [({}, queries["running"])]),
+        ("uzmanrapor_queries_cancelled_total", "counter", "İptal edilen sorgular", [
+            ({"when": "running"}, queries["cancelled_running"]),
+            ({"when": "pending"}, queries["cancelled_pending"]),
+        ]),
+        ("uzmanrapor_read_routing_total", "counter", "Okumaların yönlendirildiği sunucu", [
+            ({"target": "replica"}, routing["replica_reads"]),
+            ({"target": "primary"}, routing["primary_reads"]),
+        ]),
+        ("uzmanrapor_read_fallbacks_total", "counter", "Replikadan birincile düşen okumalar", [({}, routing["fallbacks"])]),
+    ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(
+    x_token: str | None = Header(default=None),
+    authorization: str | None = Header(default=None),
+) -> PlainTextResponse:
+    """Prometheus metin biçimi; token X-Token ya da "Authorization: Bearer <token>" ile verilir."""
+    if not x_token and authorization and authorization.lower().startswith("bearer "):
+        x_token = authorization[7:].strip()
+    _require_token(x_token)
+    return PlainTextResponse(
+        _METRICS.render(_metric_families()), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/stats/statements")
+def statement_stats(x_token: str | None = Header(default=None)) -> dict[str, Any]:
+    """/metrics'teki statement etiketlerinin (parmak izi) örnek sorgu metinleri."""
+    _require_token(x_token)
+    return {"statements": _METRICS.statements()}
+
+
+def _result(conn: Any, cur: Any) -> dict[str, Any]:
+    """Çalıştırılmış cursor'dan /sql cevabı (SELECT ise satırlar, değilse commit + etkilenen satır)."""
+    if cur.description:
+        cols = [d[0] for d in cur.description]
+        rows = cur.fetchmany(MAX_ROWS + 1)
+        if len(rows) > MAX_ROWS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Result too large (>{MAX_ROWS} rows). Please add filters.",
+            )
+        data_rows = [[_encode_value(v) for v in row] for row in rows]
+        return {"columns": cols, "rows": data_rows, "rowcount": len(data_rows)}
+
+    conn.commit()
+    rc = cur.rowcount if cur.rowcount is not None else -1
+    return {"columns": [], "rows": [], "affected_rows": rc}
+
+
+def _counted(request_id: str | None, result: dict[str, Any]) -> dict[str, Any]:
+    """/sql cevabının satır sayısını (dönen ya da etkilenen) isteğin metriklerine işler."""
+    _METRICS.note(request_id, rows=result.get("rowcount", result.get("affected_rows", 0)))
+    return result
+
+
 @app.post("/sql")
-def sql(req: SqlRequest, x_token: str | None = Header(default=None)) -> dict[str, Any]:
-    conn_str = _sql_conn_str()
+def sql(
+    req: SqlRequest,
+    x_token: str | None = Header(default=None),
+    x_client_id: str | None = Header(default=None),
+    x_deadline_ms: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> dict[str, Any]:
+    deadline = _deadline(x_deadline_ms)
+    params = _adapt_params(req.query, list(req.params or []))
+
+    try:
+        _require_token(x_token)
+        database = _checked_target(req.query)
+        # Yalnız doğrulanmış sorgular metrik serisi açar (yetkisiz istekler üst sınırı dolduramasın)
+        _METRICS.note(x_request_id, fingerprint(req.query), req.query)
+
+        client = _client_key(x_client_id, x_token)
+        route = _read_route(req.query, client)
+
+        # Önbellekten / birleştirilmiş okumadan dönenler slot almaz
+        def _run() -> dict[str, Any]:
+            with _ADMISSION.slot(_lane(req.query), client, _remaining(deadline)):
+                with _routed_connection(route, database) as (_, conn):
+                    cur = _cursor(conn, deadline)
+                    with _QUERIES.running(x_request_id, cur):
+                        cur.execute(req.query, params)
+                        return _result(conn, cur)
+
+        return _counted(x_request_id, _execute_cached(
+            req.query, list(req.params or []), database, _run, client, route, deadline, x_request_id
+        ))
+
+    except HTTPException as e:
+        if e.status_code == 403:
+            print("[403 FORBIDDEN SQL]", req.query.strip().replace("\n", " ")[:200])
+            print("[403 DETAIL]", e.detail)
+        raise
+
+    except AdmissionRejected as e:
+        raise _busy(e, deadline)
+
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except Exception as e:
+        raise _db_error(e)
+
+
+@app.post("/sql/stmt")
+def sql_stmt(
+    req: StmtRequest,
+    x_token: str | None = Header(default=None),
+    x_client_id: str | None = Header(default=None),
+    x_deadline_ms: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> dict[str, Any]:
+    """
+    Kayıtlı (önceden doğrulanmış) ifadeyi id ile çalıştırır; cevap /sql ile aynıdır.
+    Bağlantı başına ifade başına tek cursor tutulur; pyodbc aynı metni yeniden hazırlamaz.
+    """
+    deadline = _deadline(x_deadline_ms)
+    _require_token(x_token)
+    query = STATEMENTS.get(req.id)
+    if query is None:
+        raise HTTPException(status_code=404, detail=f"Unknown statement: {req.id}")
+    if req.database and req.database not in _DB_NAMES:
+        raise HTTPException(status_code=400, detail=f"Unknown database: {req.database}")
+
+    params = _adapt_params(query, list(req.params or []))
+    _METRICS.note(x_request_id, req.id, query)
+    client = _client_key(x_client_id, x_token)
+    route = _read_route(query, client)
+
+    def _run() -> dict[str, Any]:
+        slot = _ADMISSION.slot(_lane(query), client, _remaining(deadline))
+        with slot, _routed_connection(route, req.database) as (pool, conn):
+            # Zaman aşımı cursor'a açılırken bağlanır: cursor ifade + zaman aşımı basamağı başına tutulur
+            conn.timeout = _query_timeout(deadline)
+            key = f"{req.id}@{conn.timeout}"
+            cur = pool.cached_cursor(conn, key)
+            try:
+                with _QUERIES.running(x_request_id, cur):
+                    cur.execute(query, params)
+                    return _result(conn, cur)
+            except Exception:
+                pool.drop_cursor(conn, key)
+                raise
+
+    try:
+        return _counted(x_request_id, _execute_cached(
+            query, list(req.params or []), req.database, _run, client, route, deadline, x_request_id
+        ))
+
+    except HTTPException:
+        raise
+
+    except AdmissionRejected as e:
+        raise _busy(e, deadline)
+
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except Exception as e:
+        raise _db_error(e)
+
+
+@app.post("/sql/cancel")
+def sql_cancel(req: CancelRequest, x_token: str | None = Header(default=None)) -> dict[str, str]:
+    """
+    X-Request-Id ile gönderilmiş isteği iptal eder: çalışıyorsa SQL Server'a iptal (SQLCancel)
+    gider, henüz başlamadıysa hiç çalıştırılmaz. Dönüş: {"status": "cancelled" | "pending"}
+    """
+    _require_token(x_token)
+    if not req.request_id:
+        raise HTTPException(status_code=400, detail="request_id is required")
+    return {"status": _QUERIES.cancel(req.request_id)}
+
+
+def _release_once(fn: Callable[[], None]) -> Callable[[], None]:
+    """
+    Akış kaynaklarını (bağlantı, slot, sorgu kaydı) bir kez bırakır. Üretecin finally'si ve cevap
+    sonrası arka plan görevi ikisi de çağırır: client ilk parçadan önce koparsa hiç başlamamış
+    üretecin finally'si çalışmaz, kaynaklar arka plan göreviyle bırakılır.
+    """
+    lock = threading.Lock()
+    released = False
+
+    def _release() -> None:
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+        fn()
+
+    return _release
+
+
+class _ReleasingStream(StreamingResponse):
+    """
+    ASGI 2.4 sunucularında client koptuğunda Starlette ClientDisconnect fırlatır ve arka plan
+    görevini atlar; hiç başlamamış üretecin kaynakları o durumda da burada bırakılır.
+    """
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        except BaseException:
+            if self.background is not None:
+                with anyio.CancelScope(shield=True):
+                    await self.background()
+            raise
+
+
+def _ndjson(obj: dict[str, Any]) -> bytes:
+    # /sql ile aynı tip dönüşümü (datetime -> ISO, Decimal -> float ...)
+    return (json.dumps(jsonable_encoder(obj), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@app.post("/sql/stream")
+def sql_stream(
+    req: SqlRequest,
+    x_token: str | None = Header(default=None),
+    x_client_id: str | None = Header(default=None),
+    x_deadline_ms: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> StreamingResponse:
+    """
+    /sql ile aynı doğrulama; sonuç tek JSON yerine NDJSON parçaları olarak akar:
+      {"columns": [...]}\n{"rows": [...]}\n ... {"done": true, "rowcount": n}\n
+    Bağlantı akış bitene kadar havuzdan alınmış kalır; satırlar sunucuda
+    fetchmany ile parça parça okunduğu için bellek sonuç boyutundan bağımsızdır.
+    """
+    deadline = _deadline(x_deadline_ms)
     params = _adapt_params(req.query, list(req.params or []))
 
-    conn = None
     try:
         _require_token(x_token)
-        _validate_query(req.query)
+        database = _checked_target(req.query)
+    except HTTPException as e:
+        if e.status_code == 403:
+            print("[403 FORBIDDEN SQL]", req.query.strip().replace("\n", " ")[:200])
+            print("[403 DETAIL]", e.detail)
+        raise
+    _METRICS.note(x_request_id, fingerprint(req.query), req.query)
+
+    # Slot, bağlantı gibi akış bitene kadar tutulur
+    client = _client_key(x_client_id, x_token)
+    try:
+        ticket = _ADMISSION.acquire("bulk", client, _remaining(deadline))
+    except AdmissionRejected as e:
+        raise _busy(e, deadline)
+
+    try:
+        pool, conn = _acquire_routed(_read_route(req.query, client), database)
+    except PoolTimeout as e:
+        _ADMISSION.release(ticket)
+        raise HTTPException(status_code=503, detail=str(e))
+
+    cur: Any = None
 
-        conn = pyodbc.connect(conn_str, timeout=10)
-        cur = conn.cursor()
+    @_release_once
+    def _done() -> None:
+        _QUERIES.end(x_request_id, cur)
+        pool.release(conn)
+        _ADMISSION.release(ticket)
+
+    try:
+        cur = _cursor(conn, deadline)
+        _QUERIES.begin(x_request_id, cur)
         cur.execute(req.query, params)
+        if not cur.description:
+            conn.commit()
+            _after_write(req.query)
+            _ROUTER.note_write(client)
+    except Exception as e:
+        _done()
+        raise _db_error(e)
+
+    def _generate() -> Iterator[bytes]:
+        try:
+            if not cur.description:
+                rc = cur.rowcount if cur.rowcount is not None else -1
+                _METRICS.note(x_request_id, rows=rc)
+                yield _ndjson({"columns": [], "done": True, "affected_rows": rc})
+                return
+
+            yield _ndjson({"columns": [d[0] for d in cur.description]})
+            total = 0
+            while True:
+                rows = cur.fetchmany(STREAM_CHUNK_ROWS)
+                if not rows:
+                    break
+                total += len(rows)
+                if total > STREAM_MAX_ROWS:
+                    yield _ndjson({"error": f"Result too large (>{STREAM_MAX_ROWS} rows). Please add filters."})
+                    return
+                yield _ndjson({"rows": [[_encode_value(v) for v in row] for row in rows]})
+            _METRICS.note(x_request_id, rows=total)
+            yield _ndjson({"done": True, "rowcount": total})
+        except Exception as e:
+            yield _ndjson({"error": str(e)})
+        finally:
+            _done()
+
+    return _ReleasingStream(_generate(), media_type="application/x-ndjson", background=BackgroundTask(_done))
+
 
-        if cur.description:
-            cols = [d[0] for d in cur.description]
-            rows = cur.fetchmany(MAX_ROWS + 1)
-            if len(rows) > MAX_ROWS:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"Result too large (>{MAX_ROWS} rows). Please add filters.",
-                )
-            data_rows = [[_encode_value(v) for v in row] for row in rows]
-            return {"columns": cols, "rows": data_rows, "rowcount": len(data_rows)}
-
-        conn.commit()
-        rc = cur.rowcount if cur.rowcount is not None else -1
-        return {"columns": [], "rows": [], "affected_rows": rc}
+# ============================================================
+#  ARROW IPC CEVAP MODU
+# ============================================================
 
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _arrow_type_for(py_type: Any):
+    """pyodbc description'daki Python tipini Arrow tipine eşler."""
+    if py_type is bool:
+        return pa.bool_()
+    if py_type is int:
+        return pa.int64()
+    if py_type in (float, decimal.Decimal):
+        return pa.float64()
+    if py_type is _dt.datetime:
+        return pa.timestamp("us")
+    if py_type is _dt.date:
+        return pa.date32()
+    if py_type is _dt.time:
+        return pa.time64("us")
+    if py_type in (bytes, bytearray):
+        return pa.binary()
+    return pa.string()
+
+
+def _arrow_column(values: list[Any], typ) -> Any:
+    if pa.types.is_floating(typ):
+        values = [None if v is None else float(v) for v in values]
+    elif pa.types.is_string(typ):
+        values = [None if v is None or isinstance(v, str) else str(v) for v in values]
+    return pa.array(values, type=typ)
+
+
+@app.post("/sql/arrow")
+def sql_arrow(
+    req: SqlRequest,
+    x_token: str | None = Header(default=None),
+    x_client_id: str | None = Header(default=None),
+    x_deadline_ms: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> StreamingResponse:
+    """
+    SELECT sonucunu Apache Arrow IPC stream olarak döndürür (sütun tipleri korunur:
+    tarih -> timestamp/date32, sayısal -> int64/float64). Yalnızca sonuç kümesi dönen
+    sorgular içindir; pyarrow kurulu değilse 501.
+    """
+    if pa is None:
+        raise HTTPException(status_code=501, detail="Arrow support is not installed on the server")
+
+    deadline = _deadline(x_deadline_ms)
+    params = _adapt_params(req.query, list(req.params or []))
+    try:
+        _require_token(x_token)
+        database = _checked_target(req.query)
     except HTTPException as e:
         if e.status_code == 403:
             print("[403 FORBIDDEN SQL]", req.query.strip().replace("\n", " ")[:200])
             print("[403 DETAIL]", e.detail)
         raise
+    _METRICS.note(x_request_id, fingerprint(req.query), req.query)
+
+    # Slot, bağlantı gibi akış bitene kadar tutulur
+    client = _client_key(x_client_id, x_token)
+    try:
+        ticket = _ADMISSION.acquire("bulk", client, _remaining(deadline))
+    except AdmissionRejected as e:
+        raise _busy(e, deadline)
+
+    try:
+        pool, conn = _acquire_routed(_read_route(req.query, client), database)
+    except PoolTimeout as e:
+        _ADMISSION.release(ticket)
+        raise HTTPException(status_code=503, detail=str(e))
 
+    cur: Any = None
+
+    @_release_once
+    def _done() -> None:
+        _QUERIES.end(x_request_id, cur)
+        pool.release(conn)
+        _ADMISSION.release(ticket)
+
+    try:
+        cur = _cursor(conn, deadline)
+        _QUERIES.begin(x_request_id, cur)
+        cur.execute(req.query, params)
+        if not cur.description:
+            raise HTTPException(status_code=400, detail="Arrow mode is only available for queries returning rows")
+        names = [d[0] for d in cur.description]
+        schema = pa.schema([pa.field(n, _arrow_type_for(d[1])) for n, d in zip(names, cur.description)])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        _done()
+        raise _db_error(e)
 
-    finally:
+    def _generate() -> Iterator[bytes]:
+        sink = io.BytesIO()
         try:
-            if conn is not None:
-                conn.close()
-        except Exception:
-            pass
+            writer = pa.ipc.new_stream(sink, schema)
+            total = 0
+            while True:
+                rows = cur.fetchmany(STREAM_CHUNK_ROWS)
+                if not rows:
+                    break
+                total += len(rows)
+                if total > STREAM_MAX_ROWS:
+                    # IPC akışında hata satırı yok; eksik akış client'ta hata olarak görünür
+                    raise RuntimeError(f"Result too large (>{STREAM_MAX_ROWS} rows)")
+                cols = list(zip(*rows))
+                arrays = [_arrow_column(list(col), f.type) for col, f in zip(cols, schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                yield sink.getvalue()
+                sink.seek(0)
+                sink.truncate()
+            _METRICS.note(x_request_id, rows=total)
+            writer.close()
+            yield sink.getvalue()
+        finally:
+            _done()
+
+    return _ReleasingStream(_generate(), media_type=ARROW_MEDIA_TYPE, background=BackgroundTask(_done))
+
+
+@app.post("/sql/batch")
+def sql_batch(
+    req: SqlBatchRequest,
+    x_token: str | None = Header(default=None),
+    x_client_id: str | None = Header(default=None),
+    x_deadline_ms: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> dict[str, Any]:
+    """
+    Birden çok parametreli ifadeyi tek istekte ve TEK transaction içinde çalıştırır.
+    Herhangi bir ifade hata verirse tamamı geri alınır.
+    """
+    deadline = _deadline(x_deadline_ms)
+    current = ""
+    try:
+        _require_token(x_token)
+
+        stmts = req.statements or []
+        if not stmts:
+            return {"results": []}
+        # Aynı ifade kümesi (ör. DELETE + INSERT kaydı) tek etikette toplanır
+        shape = ";\n".join(dict.fromkeys(st.query for st in stmts))
+        _METRICS.note(x_request_id, "batch:" + fingerprint(shape), shape)
+
+        total_rows = sum(len(st.many) if st.many is not None else 1 for st in stmts)
+        if total_rows > BATCH_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"Batch too large (>{BATCH_MAX_ROWS} rows).")
 
+        databases: set[str] = set()
+        for st in stmts:
+            current = st.query
+            databases.add(_checked_target(st.query))
+            if st.many is not None and st.expect_rows is not None:
+                # executemany satır başına etkilenen sayıyı güvenilir vermez: koşul denetlenemez
+                raise HTTPException(status_code=400, detail="expect_rows cannot be combined with many")
+        if len(databases) > 1:
+            raise HTTPException(status_code=400, detail="Batch statements must target a single database")
+
+        # Batch (yazma içersin içermesin) tek transaction: hep birincilde
+        pool = _POOLS.get(databases.pop())
+        results: list[dict[str, Any]] = []
+        client = _client_key(x_client_id, x_token)
+        slot = _ADMISSION.slot("bulk", client, _remaining(deadline))
+        with slot, pool.connection() as conn:
+            cur = _cursor(conn, deadline)
+            _QUERIES.begin(x_request_id, cur)
+            try:
+                for i, st in enumerate(stmts):
+                    current = st.query
+                    if st.many is not None:
+                        rows = [_adapt_params(st.query, list(r or [])) for r in st.many]
+                        if not rows:
+                            results.append({"affected_rows": 0})
+                            continue
+                        cur.fast_executemany = FAST_EXECUTEMANY
+                        cur.executemany(st.query, rows)
+                        cur.fast_executemany = False
+                        # pyodbc executemany'de rowcount güvenilir değil: -1 (bilinmiyor)
+                        results.append({"affected_rows": -1})
+                        continue
+
+                    cur.execute(st.query, _adapt_params(st.query, list(st.params or [])))
+                    if cur.description:
+                        cols = [d[0] for d in cur.description]
+                        fetched = cur.fetchmany(MAX_ROWS + 1)
+                        if len(fetched) > MAX_ROWS:
+                            raise HTTPException(
+                                status_code=413,
+                                detail=f"Result too large (>{MAX_ROWS} rows). Please add filters.",
+                            )
+                        data_rows = [[_encode_value(v) for v in row] for row in fetched]
+                        results.append({"columns": cols, "rows": data_rows, "rowcount": len(data_rows)})
+                    else:
+                        rc = cur.rowcount if cur.rowcount is not None else -1
+                        if st.expect_rows is not None and rc != st.expect_rows:
+                            # İyimser eşzamanlılık: koşullu güncelleme tutmadı, hiçbir ifade uygulanmaz
+                            raise HTTPException(
+                                status_code=409,
+                                detail=f"Conflict: statement {i} affected {rc} rows, expected {st.expect_rows}",
+                            )
+                        results.append({"affected_rows": rc})
+                conn.commit()
+                for st in stmts:
+                    if not _is_read(st.query):
+                        _after_write(st.query)
+                        _ROUTER.note_write(client)
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+            finally:
+                _QUERIES.end(x_request_id, cur)
+
+        _METRICS.note(x_request_id, rows=sum(max(0, r.get("rowcount", r.get("affected_rows", 0))) for r in results))
+        return {"results": results}
+
+    except HTTPException as e:
+        if e.status_code == 403:
+            print("[403 FORBIDDEN SQL]", current.strip().replace("\n", " ")[:200])
+            print("[403 DETAIL]", e.detail)
+        raise
+
+    except AdmissionRejected as e:
+        raise _busy(e, deadline)
+
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except Exception as e:
+        raise _db_error(e)
+
+
+# ============================================================
+#  UPSERT (MERGE yerine güvenli, whitelist'li ekle/güncelle)
+# ============================================================
+
+# Tablo -> anahtar kolon(lar). Yalnız burada tanımlı tablolara upsert yapılabilir.
+_UPSERT_KEYS: dict[str, tuple[str, ...]] = {
+    "AppMeta": ("MetaKey",),
+    "TypeSelvedgeMap": ("RootType",),
+    "LoomCutMap": ("LoomNo",),
+}
+# Her yazmada sunucu ifadesiyle güncellenen kolonlar
+_UPSERT_TOUCH: dict[str, dict[str, str]] = {
+    "AppMeta": {"UpdatedAt": "SYSUTCDATETIME()"},
+}
+_IDENT = re.compile(r"^\w+$")
+_UPSERT_IN_CHUNK = 1000
+
+
+def _upsert_key_norm(v: Any) -> Any:
+    # SQL Server varsayılan collation'ı büyük/küçük harf ve sondaki boşluk duyarsızdır
+    return v.rstrip().casefold() if isinstance(v, str) else v
+
+
+def _run_upsert(cur: Any, target: str, table: str, columns: list[str], rows: list[list[Any]]) -> dict[str, int]:
+    keys = _UPSERT_KEYS[table]
+    touch = _UPSERT_TOUCH.get(table, {})
+    key_idx = [columns.index(k) for k in keys]
+    set_cols = [c for c in columns if c not in keys]
+    set_idx = [columns.index(c) for c in set_cols]
+
+    # Aynı anahtar birden çok kez geldiyse sonuncusu geçerli
+    latest: dict[tuple[Any, ...], list[Any]] = {}
+    for r in rows:
+        latest[tuple(_upsert_key_norm(r[i]) for i in key_idx)] = r
+    rows = list(latest.values())
+
+    set_sql = ", ".join([f"[{c}] = ?" for c in set_cols] + [f"[{c}] = {expr}" for c, expr in touch.items()])
+    where_sql = " AND ".join(f"[{k}] = ?" for k in keys)
+    update_sql = f"UPDATE {target} SET {set_sql} WHERE {where_sql}" if set_sql else ""
+    ins_cols = ", ".join(f"[{c}]" for c in list(columns) + list(touch))
+    ins_vals = ", ".join(["?"] * len(columns) + list(touch.values()))
+    insert_sql = f"INSERT INTO {target} ({ins_cols}) VALUES ({ins_vals})"
+
+    if len(keys) == 1:
+        # Mevcut anahtarlar tek sorguda (parça parça) okunur; UPDLOCK+HOLDLOCK transaction
+        # bitene kadar aynı anahtarın başka istekçe eklenmesini engeller.
+        k = keys[0]
+        existing: set[Any] = set()
+        values = [r[key_idx[0]] for r in rows]
+        for i in range(0, len(values), _UPSERT_IN_CHUNK):
+            part = values[i:i + _UPSERT_IN_CHUNK]
+            cur.execute(
+                f"SELECT [{k}] FROM {target} WITH (UPDLOCK, HOLDLOCK) WHERE [{k}] IN ({', '.join('?' * len(part))})",
+                part,
+            )
+            existing.update(_upsert_key_norm(r[0]) for r in cur.fetchall())
+        to_update = [r for r in rows if _upsert_key_norm(r[key_idx[0]]) in existing]
+        to_insert = [r for r in rows if _upsert_key_norm(r[key_idx[0]]) not in existing]
+        if update_sql and to_update:
+            cur.fast_executemany = FAST_EXECUTEMANY
+            cur.executemany(update_sql, [[r[i] for i in set_idx] + [r[i] for i in key_idx] for r in to_update])
+        if to_insert:
+            cur.fast_executemany = FAST_EXECUTEMANY
+            cur.executemany(insert_sql, to_insert)
+        cur.fast_executemany = False
+        return {"updated": len(to_update) if update_sql else 0, "inserted": len(to_insert)}
+
+    # Bileşik anahtar: satır satır UPDATE, etkilenmediyse INSERT
+    updated = inserted = 0
+    for r in rows:
+        key_vals = [r[i] for i in key_idx]
+        if update_sql:
+            cur.execute(update_sql, [r[i] for i in set_idx] + key_vals)
+            if cur.rowcount and cur.rowcount > 0:
+                updated += 1
+                continue
+        else:
+            cur.execute(f"SELECT 1 FROM {target} WITH (UPDLOCK, HOLDLOCK) WHERE {where_sql}", key_vals)
+            if cur.fetchone() is not None:
+                continue
+        cur.execute(insert_sql, r)
+        inserted += 1
+    return {"updated": updated, "inserted": inserted}
+
+
+@app.post("/sql/upsert")
+def sql_upsert(
+    req: UpsertRequest,
+    x_token: str | None = Header(default=None),
+    x_client_id: str | None = Header(default=None),
+    x_deadline_ms: str | None = Header(default=None),
+    x_request_id: str | None = Header(default=None),
+) -> dict[str, Any]:
+    """
+    Anahtar kolonlara göre satır varsa UPDATE, yoksa INSERT; tüm satırlar tek transaction'da.
+    Tablo ve anahtarları sunucuda tanımlıdır (_UPSERT_KEYS); MERGE kullanılmaz.
+    """
+    deadline = _deadline(x_deadline_ms)
+    _require_token(x_token)
+    if req.table not in _UPSERT_KEYS:
+        raise HTTPException(status_code=403, detail=f"Upsert not allowed for table: {req.table}")
+    _METRICS.note(x_request_id, f"upsert:{req.table}")
+    if req.database and req.database not in _DB_NAMES:
+        raise HTTPException(status_code=400, detail=f"Unknown database: {req.database}")
+
+    columns = list(req.columns or [])
+    if not columns or len(set(columns)) != len(columns) or not all(_IDENT.match(c) for c in columns):
+        raise HTTPException(status_code=400, detail="Invalid column list")
+    touch = _UPSERT_TOUCH.get(req.table, {})
+    if any(c in touch for c in columns):
+        raise HTTPException(status_code=400, detail="Server-managed columns cannot be written")
+    missing = [k for k in _UPSERT_KEYS[req.table] if k not in columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Key columns missing: {', '.join(missing)}")
+
+    rows = [_adapt_params("", list(r or [])) for r in req.rows or []]
+    if any(len(r) != len(columns) for r in rows):
+        raise HTTPException(status_code=400, detail="Row length does not match columns")
+    if len(rows) > BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (>{BATCH_MAX_ROWS} rows).")
+    if not rows:
+        return {"updated": 0, "inserted": 0}
+
+    target = f"[{req.database}].[dbo].[{req.table}]" if req.database else f"dbo.[{req.table}]"
+    try:
+        client = _client_key(x_client_id, x_token)
+        slot = _ADMISSION.slot("bulk", client, _remaining(deadline))
+        with slot, _POOLS.get(req.database).connection() as conn:
+            cur = _cursor(conn, deadline)
+            try:
+                with _QUERIES.running(x_request_id, cur):
+                    result = _run_upsert(cur, target, req.table, columns, rows)
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
+        _RESULTS.bump([req.table])
+        _ROUTER.note_write(client)
+        _METRICS.note(x_request_id, rows=len(rows))
+        return result
+
+    except AdmissionRejected as e:
+        raise _busy(e, deadline)
+
+    except PoolTimeout as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    except Exception as e:
+        raise _db_error(e)
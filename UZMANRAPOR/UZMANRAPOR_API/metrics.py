@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+
+Message = dict[str, Any]
+Send = Callable[[Message], Awaitable[None]]
+# (ad, tip, açıklama, [(etiketler, değer), ...]) — render'a dışarıdan eklenen ölçümler
+Family = tuple[str, str, str, list[tuple[dict[str, str], float]]]
+
+# Saniye; kısa lookup'lardan uzun raporlara kadar
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_STRING_LIT = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBER_LIT = re.compile(r"(?<![\w@\]])-?\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+
+
+def normalize(query: str) -> str:
+    """Sabitler ? olur, IN (?, ?, ...) listeleri tek ?... olur, boşluklar sadeleşir."""
+    q = _COMMENT.sub(" ", query)
+    q = _STRING_LIT.sub("?", q)
+    q = _NUMBER_LIT.sub("?", q)
+    q = _PARAM_LIST.sub("?...", q)
+    return " ".join(q.split()).rstrip(";").lower()
+
+
+def fingerprint(query: str) -> str:
+    """Aynı biçimdeki sorgular için kısa, sabit kimlik (metrik etiketi)."""
+    return hashlib.sha1(normalize(query).encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class _Series:
+    buckets: list[int]
+    count: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    payload_bytes: int = 0
+    by_status: dict[int, int] = field(default_factory=dict)
+
+
+@dataclass
+class _Trace:
+    path: str
+    started: float
+    statement: str = "-"
+    rows: int = 0
+
+
+class Metrics:
+    """
+    İstek metrikleri (thread-safe): uç nokta + ifade parmak izi başına gecikme histogramı,
+    satır ve cevap baytı sayaçları, durum kodu başına istek sayısı, uç nokta başına aktif istek.
+
+    İstekler request id ile izlenir: ``begin`` (middleware) -> ``note`` (handler: ifade, satır)
+    -> ``finish`` (middleware: durum, bayt). Parmak izi sayısı ``max_statements`` ile sınırlıdır;
+    fazlası "other" etiketinde toplanır.
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS, max_statements: int = 500) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        self.max_statements = max(1, int(max_statements))
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._texts: dict[str, str] = {}
+        self._traces: dict[str, _Trace] = {}
+        self._active: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, request_id: str, path: str) -> _Trace:
+        tr = _Trace(path, time.perf_counter())
+        with self._lock:
+            self._traces[request_id] = tr
+            self._active[path] = self._active.get(path, 0) + 1
+        return tr
+
+    def note(
+        self,
+        request_id: str | None,
+        statement: str | None = None,
+        text: str | None = None,
+        rows: int | None = None,
+    ) -> None:
+        """Handler'dan: isteğin ifade etiketi (ve örnek metni) ve dönen / etkilenen satır sayısı."""
+        if not request_id:
+            return
+        with self._lock:
+            tr = self._traces.get(request_id)
+            if tr is None:
+                return
+            if statement:
+                if statement not in self._texts and len(self._texts) >= self.max_statements:
+                    statement = "other"
+                elif text is not None and statement not in self._texts:
+                    self._texts[statement] = " ".join(text.split())[:500]
+                tr.statement = statement
+            if rows is not None:
+                tr.rows += max(0, int(rows))
+
+    def finish(self, request_id: str, tr: _Trace, status: int, payload_bytes: int) -> float:
+        """İsteği kapatır; dönüş süre (sn)."""
+        with self._lock:
+            if self._traces.get(request_id) is tr:
+                del self._traces[request_id]
+            elapsed = time.perf_counter() - tr.started
+            self._active[tr.path] = max(0, self._active.get(tr.path, 1) - 1)
+            if not self._active[tr.path]:
+                del self._active[tr.path]
+            # Bilinmeyen yollar etiket sayısını şişirmesin
+            path = "unmatched" if status == 404 and tr.statement == "-" else tr.path
+            key = (path, tr.statement)
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = _Series([0] * len(self.buckets))
+            for i, upper in enumerate(self.buckets):
+                if elapsed <= upper:
+                    s.buckets[i] += 1
+                    break
+            s.count += 1
+            s.seconds += elapsed
+            s.rows += tr.rows
+            s.payload_bytes += payload_bytes
+            s.by_status[status] = s.by_status.get(status, 0) + 1
+        return elapsed
+
+    # ------------------------------------------------------------------
+    def render(self, extra: Iterable[Family] = ()) -> str:
+        """Prometheus metin biçimi (text/plain; version=0.0.4)."""
+        out: list[str] = []
+        with self._lock:
+            series = sorted(self._series.items())
+            active = sorted(self._active.items())
+
+            out += _header("uzmanrapor_request_duration_seconds", "histogram", "İstek süresi (cevabın son baytına kadar)")
+            for (path, stmt), s in series:
+                labels = {"endpoint": path, "statement": stmt}
+                cumulative = 0
+                for upper, n in zip(self.buckets, s.buckets):
+                    cumulative += n
+                    out.append(_line("uzmanrapor_request_duration_seconds_bucket", {**labels, "le": f"{upper:g}"}, cumulative))
+                out.append(_line("uzmanrapor_request_duration_seconds_bucket", {**labels, "le": "+Inf"}, s.count))
+                out.append(_line("uzmanrapor_request_duration_seconds_sum", labels, round(s.seconds, 6)))
+                out.append(_line("uzmanrapor_request_duration_seconds_count", labels, s.count))
+
+            out += _header("uzmanrapor_requests_total", "counter", "Durum kodu başına istek sayısı")
+            for (path, stmt), s in series:
+                for status, n in sorted(s.by_status.items()):
+                    out.append(_line("uzmanrapor_requests_total", {"endpoint": path, "statement": stmt, "status": str(status)}, n))
+
+            out += _header("uzmanrapor_request_errors_total", "counter", "4xx/5xx ile biten istekler")
+            for (path, stmt), s in series:
+                errors = sum(n for status, n in s.by_status.items() if status >= 400)
+                if errors:
+                    out.append(_line("uzmanrapor_request_errors_total", {"endpoint": path, "statement": stmt}, errors))
+
+            out += _header("uzmanrapor_result_rows_total", "counter", "Dönen / etkilenen satırlar")
+            for (path, stmt), s in series:
+                out.append(_line("uzmanrapor_result_rows_total", {"endpoint": path, "statement": stmt}, s.rows))
+
+            out += _header("uzmanrapor_response_bytes_total", "counter", "Cevap gövdesi (sıkıştırmadan önce)")
+            for (path, stmt), s in series:
+                out.append(_line("uzmanrapor_response_bytes_total", {"endpoint": path, "statement": stmt}, s.payload_bytes))
+
+            out += _header("uzmanrapor_requests_active", "gauge", "Şu an işlenen istekler")
+            for path, n in active:
+                out.append(_line("uzmanrapor_requests_active", {"endpoint": path}, n))
+
+        for name, kind, help_text, samples in extra:
+            out += _header(name, kind, help_text)
+            for labels, value in samples:
+                out.append(_line(name, labels, value))
+        return "\n".join(out) + "\n"
+
+    def statements(self) -> dict[str, str]:
+        """Parmak izi -> örnek (normalize edilmemiş) sorgu metni."""
+        with self._lock:
+            return dict(self._texts)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _header(name: str, kind: str, help_text: str) -> list[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+
+
+def _line(name: str, labels: dict[str, str], value: float) -> str:
+    if labels:
+        body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+        return f"{name}{{{body}}} {value}"
+    return f"{name} {value}"
+
+
+class MetricsMiddleware:
+    """
+    Her HTTP isteğine request id verir (client X-Request-Id gönderdiyse o kullanılır, yoksa
+    üretilip handler'ların göreceği şekilde başlıklara eklenir), cevapta X-Request-Id ve
+    Server-Timing (cevap başlayana kadarki süre) döndürür ve isteği ``metrics``'e kaydeder.
+    ``slow_ms`` > 0 ise daha uzun süren istekler request id ile loglanır.
+    """
+
+    def __init__(self, app: Any, metrics: Metrics, slow_ms: float = 0.0) -> None:
+        self.app = app
+        self.metrics = metrics
+        self.slow_ms = float(slow_ms)
+
+    async def __call__(self, scope: Message, receive: Any, send: Send) -> None:
+        if scope.get("type") != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = list(scope.get("headers") or [])
+        request_id = ""
+        for k, v in headers:
+            if k == b"x-request-id":
+                request_id = v.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = uuid.uuid4().hex
+            headers.append((b"x-request-id", request_id.encode("ascii")))
+            scope = {**scope, "headers": headers}
+
+        path = scope.get("path", "")
+        trace = self.metrics.begin(request_id, path)
+        status = 500
+        payload = 0
+
+        async def _send(message: Message) -> None:
+            nonlocal status, payload
+            if message.get("type") == "http.response.start":
+                status = int(message.get("status", 500))
+                took = (time.perf_counter() - trace.started) * 1000.0
+                extra = [
+                    (b"x-request-id", request_id.encode("latin-1")),
+                    (b"server-timing", f"app;dur={took:.1f}".encode("ascii")),
+                ]
+                message = {**message, "headers": list(message.get("headers") or []) + extra}
+            elif message.get("type") == "http.response.body":
+                payload += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            elapsed = self.metrics.finish(request_id, trace, status, payload)
+            if self.slow_ms > 0 and elapsed * 1000.0 >= self.slow_ms:
+                print(f"[SLOW] {request_id} {path} {trace.statement} {status} {elapsed * 1000:.0f} ms {payload} B")
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0           # geçerli girdi bulundu
+    misses: int = 0         # girdi yok / geçersiz
+    stores: int = 0         # yeni sonuç saklandı
+    expired: int = 0        # TTL dolduğu için düşen girdiler
+    stale: int = 0          # tablo sürümü değiştiği için düşen girdiler
+    evicted: int = 0        # bellek sınırı nedeniyle (LRU) silinenler
+    invalidations: int = 0  # yazma sonrası tablo sürümü artırma sayısı
+    too_large: int = 0      # tek başına sınırı aşan, saklanmayan sonuçlar
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires: float
+    deps: tuple[tuple[str, int], ...]  # (tablo, okunduğu andaki sürüm)
+
+
+class ResultCache:
+    """
+    Referans tabloları için sonuç önbelleği (thread-safe, süreç içi).
+
+    - Her tablonun bir sürüm sayacı vardır; API'nin yaptığı yazmalar ``bump`` ile sayacı artırır.
+      Girdi, okunduğu andaki sürümleri taşır; sürümlerden biri değişmişse girdi geçersizdir.
+    - Girdiler en fazla ``ttl`` saniye yaşar (API dışından yapılan değişiklikler için üst sınır).
+    - Toplam boyut ``max_bytes``'ı aşarsa en uzun süredir kullanılmayan girdiler silinir.
+    Tablo adları küçük harfe çevrilerek tutulur.
+    """
+
+    def __init__(
+        self,
+        tables: Iterable[str],
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 300.0,
+        table_ttls: dict[str, float] | None = None,
+    ) -> None:
+        self.tables = {t.lower() for t in tables}
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl = float(ttl)
+        self.table_ttls = {k.lower(): float(v) for k, v in (table_ttls or {}).items()}
+
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and bool(self.tables)
+
+    def cacheable(self, tables: Iterable[str]) -> bool:
+        """Sorgu yalnız önbelleklenen tablolara dokunuyorsa True."""
+        names = [t.lower() for t in tables]
+        return self.enabled and bool(names) and all(t in self.tables for t in names)
+
+    def versions(self, tables: Iterable[str]) -> tuple[tuple[str, int], ...]:
+        """Sorgu çalışmadan ÖNCE alınmalı: arada yazma olursa saklanan girdi hemen geçersiz olur."""
+        with self._lock:
+            return tuple(sorted((t.lower(), self._versions.get(t.lower(), 0)) for t in tables))
+
+    # ------------------------------------------------------------------
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            if time.monotonic() >= entry.expires:
+                self._drop_locked(key)
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+            if any(self._versions.get(t, 0) != v for t, v in entry.deps):
+                self._drop_locked(key)
+                self.stats.stale += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, size: int, deps: tuple[tuple[str, int], ...]) -> None:
+        if size > self.max_bytes:
+            with self._lock:
+                self.stats.too_large += 1
+            return
+        ttl = min([self.table_ttls.get(t, self.ttl) for t, _ in deps] or [self.ttl])
+        with self._lock:
+            if any(self._versions.get(t, 0) != v for t, v in deps):
+                return  # okuma sırasında tablo değişti; eski sonucu saklama
+            if key in self._entries:
+                self._drop_locked(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + ttl, deps)
+            self._bytes += size
+            self.stats.stores += 1
+            while self._bytes > self.max_bytes and self._entries:
+                old_key = next(iter(self._entries))
+                self._drop_locked(old_key)
+                self.stats.evicted += 1
+
+    def bump(self, tables: Iterable[str]) -> None:
+        """Yazılan tabloların sürümünü artırır; bu tablolara bağlı girdiler geçersiz olur."""
+        names = {t.lower() for t in tables}
+        if not names:
+            return
+        with self._lock:
+            for t in names:
+                self._versions[t] = self._versions.get(t, 0) + 1
+            self.stats.invalidations += 1
+
+    def bump_all(self) -> None:
+        self.bump(self.tables)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop_locked(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["entries"] = len(self._entries)
+            data["bytes"] = self._bytes
+            data["max_bytes"] = self.max_bytes
+            lookups = self.stats.hits + self.stats.misses
+            data["hit_rate"] = round(self.stats.hits / lookups, 4) if lookups else 0.0
+        return data
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from db_pool import PoolTimeout
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+
+@dataclass
+class RouteStats:
+    replica_reads: int = 0   # replikaya yönlendirilen okumalar
+    primary_reads: int = 0   # replika varken birincile giden okumalar (yapışkan + replika kapalı)
+    sticky_reads: int = 0    # client yakın zamanda yazdığı için birincile gidenler
+    down_reads: int = 0      # replika geçici olarak devre dışıyken birincile gidenler
+    fallbacks: int = 0       # replikadan bağlantı alınamayıp birincile düşenler
+    replica_down: int = 0    # replikanın devre dışı bırakılma sayısı
+    writes_noted: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+class ReadRouter:
+    """
+    Okuma isteklerinin replika / birincil sunucu seçimi (thread-safe).
+
+    - Client yazma yaptıktan sonra ``sticky_sec`` boyunca okumaları birincile gider
+      (read-your-writes: replika gecikmesi yüzünden client kendi yazdığını eski görmesin).
+    - Replikaya bağlanılamazsa ``retry_after`` saniye boyunca tüm okumalar birincile düşer.
+    Yazmalar her zaman birincile gider; bu sınıf yalnız okumalar için sorulur.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        sticky_sec: float = 5.0,
+        retry_after: float = 30.0,
+        max_clients: int = 4096,
+    ) -> None:
+        self.enabled = enabled
+        self.sticky_sec = float(sticky_sec)
+        self.retry_after = float(retry_after)
+        self.max_clients = max(1, int(max_clients))
+        self._last_write: OrderedDict[str, float] = OrderedDict()
+        self._down_until = 0.0
+        self._last_error = ""
+        self._lock = threading.Lock()
+        self.stats = RouteStats()
+
+    def route(self, client: str) -> str:
+        """Okuma için hedef: REPLICA ya da PRIMARY."""
+        if not self.enabled:
+            return PRIMARY
+        now = time.monotonic()
+        with self._lock:
+            if now < self._down_until:
+                self.stats.down_reads += 1
+                self.stats.primary_reads += 1
+                return PRIMARY
+            wrote = self._last_write.get(client)
+            if wrote is not None and now - wrote < self.sticky_sec:
+                self.stats.sticky_reads += 1
+                self.stats.primary_reads += 1
+                return PRIMARY
+            self.stats.replica_reads += 1
+            return REPLICA
+
+    def note_write(self, client: str) -> None:
+        """
+        Client'ın başarılı yazmasından sonra çağrılır; yapışkanlık penceresini başlatır.
+        Replika kapalıyken de tutulur: birleştirilen okumalar (singleflight) için gerekir.
+        """
+        with self._lock:
+            self._last_write[client] = time.monotonic()
+            self._last_write.move_to_end(client)
+            while len(self._last_write) > self.max_clients:
+                self._last_write.popitem(last=False)
+            self.stats.writes_noted += 1
+
+    def last_write(self, client: str) -> float | None:
+        """Client'ın son yazmasının anı (monotonic); bilinmiyorsa None."""
+        with self._lock:
+            return self._last_write.get(client)
+
+    def acquire(self, route: str, primary: Callable[[], Any], replica: Callable[[], Any]) -> tuple[Any, Any]:
+        """
+        Okuma için (havuz, bağlantı); primary / replica havuzu veren çağrılardır.
+        Replika havuzu doluysa (PoolTimeout) birincile düşülür; bağlantı açılamazsa replika
+        ``retry_after`` süresince devre dışı kalır.
+        """
+        if route == REPLICA:
+            pool = replica()
+            try:
+                return pool, pool.acquire()
+            except PoolTimeout:
+                self.fallback()
+            except Exception as e:
+                self.replica_failed(str(e))
+        pool = primary()
+        return pool, pool.acquire()
+
+    def fallback(self) -> None:
+        """Bu okuma replika yerine birincile gitti (ör. replika havuzu dolu)."""
+        with self._lock:
+            self.stats.fallbacks += 1
+
+    def replica_failed(self, error: str) -> None:
+        """Replikaya bağlanılamadı: ``retry_after`` süresince okumalar birincile gider."""
+        with self._lock:
+            self.stats.fallbacks += 1
+            self.stats.replica_down += 1
+            self._down_until = time.monotonic() + self.retry_after
+            self._last_error = error[:300]
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["enabled"] = self.enabled
+            data["sticky_sec"] = self.sticky_sec
+            now = time.monotonic()
+            data["sticky_clients"] = sum(1 for t in self._last_write.values() if now - t < self.sticky_sec)
+            data["replica_down_for_sec"] = round(max(0.0, self._down_until - time.monotonic()), 1)
+            data["last_error"] = self._last_error
+        return data
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import copy
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+
+class FlightTimeout(TimeoutError):
+    """Bekleyen çağrının süresi, liderin sonucu gelmeden doldu."""
+
+
+@dataclass
+class FlightStats:
+    executions: int = 0   # gerçekten çalıştırılan (lider) çağrılar
+    coalesced: int = 0    # devam eden aynı çağrının sonucunu bekleyip alanlar
+    errors: int = 0       # hata ile biten lider çağrılar (lidere özgü değilse bekleyenler kopyasını alır)
+    max_waiters: int = 0  # tek bir çağrıyı bekleyen en fazla istek
+    bypassed: int = 0     # devam eden çağrı, istekten önceki bir yazmadan önce başladığı için katılmayanlar
+    timeouts: int = 0     # lideri beklerken süresi dolanlar
+    cancelled: int = 0    # lideri beklerken iptal edilenler
+    retried: int = 0      # lider kendi isteğine özgü hatayla bitti, bekleyen yeniden denedi
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters", "started")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+        self.started = time.monotonic()
+
+
+def _copy_error(exc: BaseException) -> BaseException:
+    # Aynı istisna nesnesi birden çok thread'de fırlatılırsa traceback'leri birbirine karışır
+    try:
+        return copy.copy(exc)
+    except Exception:
+        return exc
+
+
+class SingleFlight:
+    """
+    Aynı anahtarla eşzamanlı gelen çağrıları birleştirir: ilk gelen (lider) fn'i çalıştırır,
+    o bitene kadar gelen diğerleri bekler ve sonucun kopyasını (``share``) / hatanın kopyasını alır.
+    Sonuç saklanmaz; lider bitince anahtar serbest kalır. Yalnız OKUMA için kullanılmalıdır.
+
+    ``own(exc)`` True dönen hatalar (liderin iptali, süresi, kabul reddi) yalnız lidere aittir:
+    bekleyenler bunu almaz, ``do``'yu yeniden dener; biri yeni lider olur.
+    """
+
+    # Bekleyen, iptal kontrolü için bu aralıkla uyanır (sn)
+    POLL_SEC = 0.1
+
+    def __init__(
+        self,
+        share: Callable[[Any], Any] = copy.deepcopy,
+        own: Callable[[BaseException], bool] | None = None,
+    ) -> None:
+        self.share = share
+        self.own = own
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = FlightStats()
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        timeout: float | None = None,
+        check: Callable[[], None] | None = None,
+        not_before: float | None = None,
+    ) -> Any:
+        """
+        timeout: bekleyenin liderin sonucunu en fazla bekleyeceği süre (sn); dolunca FlightTimeout.
+        check: beklerken periyodik çağrılır; istek iptal edildiyse fırlatarak beklemeyi bırakır.
+        not_before: (monotonic) bu andan önce başlamış çağrıya katılınmaz, fn ayrıca çalıştırılır
+                    (ör. client'ın son yazması: kendi yazdığını görmeyen sonucu almasın).
+        """
+        end = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while True:
+            solo = False
+            with self._lock:
+                call = self._calls.get(key)
+                if call is not None and not_before is not None and call.started < not_before:
+                    # Devam eden çağrı client'ın yazmasından önce başladı: katılma, ayrıca çalıştır
+                    solo = True
+                    self.stats.bypassed += 1
+                    self.stats.executions += 1
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+                    self.stats.executions += 1
+                elif not solo:
+                    call.waiters += 1
+                    self.stats.coalesced += 1
+                    self.stats.max_waiters = max(self.stats.max_waiters, call.waiters)
+
+            if solo:
+                return fn()
+            if leader:
+                return self._lead(key, call, fn)
+
+            self._wait(call, None if end is None else end - time.monotonic(), check)
+            if call.error is None:
+                return self.share(call.result)
+            if self.own is not None and self.own(call.error):
+                # Hata liderin kendi isteğine ait (iptal, süre, kabul): bu istekle yeniden dene
+                with self._lock:
+                    self.stats.retried += 1
+                continue
+            raise _copy_error(call.error)
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            with self._lock:
+                self.stats.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _wait(self, call: _Call, timeout: float | None, check: Callable[[], None] | None) -> None:
+        end = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while True:
+            left = None if end is None else end - time.monotonic()
+            if left is not None and left <= 0:
+                with self._lock:
+                    self.stats.timeouts += 1
+                raise FlightTimeout("Timed out waiting for identical in-flight query")
+            step = self.POLL_SEC if check is not None else left
+            if step is not None and left is not None:
+                step = min(step, left)
+            if call.event.wait(step):
+                return
+            if check is not None:
+                try:
+                    check()
+                except BaseException:
+                    with self._lock:
+                        self.stats.cancelled += 1
+                    raise
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = self.stats.as_dict()
+            data["in_flight"] = len(self._calls)
+        return data
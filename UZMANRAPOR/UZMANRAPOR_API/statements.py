@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+# ============================================================
+#  ADLANDIRILMIŞ İFADELER (/sql/stmt)
+#  Sık çalışan sorgular bir kez, başlangıçta doğrulanır; client id + parametre gönderir.
+#  Sorgular DB öneki içermez: hedef DB istekteki "database" alanından seçilir.
+#  Metin değişirse client'taki karşılık gelen (yedek) sorgu da güncellenmelidir.
+# ============================================================
+
+STATEMENTS: dict[str, str] = {
+    # AppMeta
+    "meta.get": "SELECT MetaValue FROM dbo.AppMeta WHERE MetaKey = ?",
+    # Referans tablosu sürüm damgaları ("ver:<Tablo>"), client önbelleği tek sorguda kontrol eder
+    "meta.versions": "SELECT MetaKey, MetaValue FROM dbo.AppMeta WHERE MetaKey LIKE ?",
+    # Blok / dummy / kesim / kenar haritaları
+    "looms.blocked": "SELECT LoomNo FROM dbo.BlockedLooms ORDER BY LoomNo",
+    "looms.dummy": "SELECT LoomNo FROM dbo.DummyLooms ORDER BY LoomNo",
+    "loom_cut_map.all": "SELECT LoomNo, CutType FROM dbo.LoomCutMap",
+    "type_selvedge_map.all": "SELECT RootType, Selvedge FROM dbo.TypeSelvedgeMap",
+    # Usta defteri
+    "usta.last_n": (
+        "SELECT TOP (?) "
+        "Id, "
+        "CONVERT(varchar(10), Tarih, 104) AS Tarih, "
+        "Vardiya AS Saat, "
+        "Tezgah AS Tezgah, "
+        "KokTip AS Takdir, "
+        "HasisNo AS [Haşıl İşEm], "
+        "LeventNo AS Levent, "
+        "EtiketNo AS Etiket, "
+        "DokumaIsEmri AS [Dokuma İş Emri], "
+        "Metre AS Metre, "
+        "HasilNo AS [Haşıl no], "
+        "IsTanimi AS [İş tanımı], "
+        "YapilanIslem AS [Yapılan işlem], "
+        "IslemYapan AS [İşlem Yapan], "
+        "Aciklama AS [Açıklama] "
+        "FROM dbo.UstaDefteri "
+        "ORDER BY Id DESC"
+    ),
+    "usta.etiket_exists": "SELECT 1 FROM dbo.UstaDefteri WHERE EtiketNo = ?",
+    # Sayfalı: (sayfa boyu, son Id); MAX_ROWS'a takılmamak için client kısa sayfa gelene kadar tekrarlar
+    "usta.etiket_page": (
+        "SELECT TOP (?) Id, EtiketNo, Tezgah FROM dbo.UstaDefteri "
+        "WHERE Id > ? AND EtiketNo IS NOT NULL AND LTRIM(RTRIM(EtiketNo)) <> '' "
+        "ORDER BY Id"
+    ),
+    "usta.etiket_count": (
+        "SELECT COUNT_BIG(*) FROM dbo.UstaDefteri "
+        "WHERE Id <= ? AND EtiketNo IS NOT NULL AND LTRIM(RTRIM(EtiketNo)) <> ''"
+    ),
+    "lookup.values": (
+        "SELECT Id, Value FROM dbo.AppLookupValues "
+        "WHERE ListName = ? AND IsActive = 1 "
+        "ORDER BY SortOrder, Value"
+    ),
+    # Itema / makine ayarları
+    "itema_ayar.by_tip": "SELECT TOP 1 * FROM dbo.ItemaAyar WHERE [tip] = ?",
+    "makine_ayar.by_orgu": "SELECT * FROM dbo.Makine_Ayar_Tablosu WHERE [orgu_tipi] = ?",
+}
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# API modülleri düz (paket değil): testler klasörün kendisinden import eder
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pyodbc")
+
+import main  # noqa: E402
+
+INSERT = "INSERT INTO dbo.LoomCutMap (LoomNo, CutType) VALUES (?, ?)"
+UPDATE = "UPDATE dbo.AppMeta SET MetaValue = ? WHERE MetaKey = ?"
+
+
+class _Cursor:
+    description = None
+    fast_executemany = False
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = -1
+
+    def execute(self, query, params=()):
+        self.conn.executed.append(query)
+        self.rowcount = 1
+        return self
+
+    def executemany(self, query, rows):
+        self.conn.executed.append(query)
+        self.rowcount = -1  # pyodbc: executemany sonrası güvenilir değil
+        return self
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    timeout = 0
+
+    def __init__(self):
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    c = _Conn()
+    monkeypatch.setattr(main, "_POOLS", main.PoolRegistry(lambda database: main.ConnectionPool(lambda: c, name=database)))
+    return c
+
+
+def _batch(statements):
+    req = main.SqlBatchRequest(statements=[main.BatchStatement(**st) for st in statements])
+    return main.sql_batch(req, x_token="t", x_client_id="c", x_deadline_ms=None, x_request_id=None)
+
+
+@pytest.fixture(autouse=True)
+def token(monkeypatch):
+    monkeypatch.setenv("UZMANRAPOR_API_TOKEN", "t")
+
+
+def test_many_reports_unknown_row_count(conn):
+    out = _batch([
+        {"query": INSERT, "many": [["2201", "ISAVER"], ["2202", "ROTOCUT"]]},
+        {"query": UPDATE, "params": ["x", "last_update"], "expect_rows": 1},
+    ])
+    assert out["results"] == [{"affected_rows": -1}, {"affected_rows": 1}]
+    assert conn.commits == 1
+
+
+def test_expect_rows_with_many_is_rejected(conn):
+    with pytest.raises(main.HTTPException) as e:
+        _batch([{"query": INSERT, "many": [["2201", "ISAVER"]], "expect_rows": 1}])
+    assert e.value.status_code == 400
+    assert conn.executed == []  # hiçbir ifade çalıştırılmadı
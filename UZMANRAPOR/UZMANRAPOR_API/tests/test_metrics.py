@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pyodbc")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+
+@pytest.mark.parametrize("path", ["/sql", "/sql/stream", "/sql/arrow"])
+def test_unauthenticated_request_does_not_open_statement_series(monkeypatch, path):
+    monkeypatch.setenv("UZMANRAPOR_API_TOKEN", "t")
+    query = f"SELECT MetaValue FROM dbo.AppMeta WHERE MetaKey = 'unauth{path}'"
+    resp = TestClient(main.app).post(path, json={"query": query}, headers={"X-Token": "wrong"})
+    assert resp.status_code in (401, 501)  # 501: sunucuda pyarrow yok
+    assert main.fingerprint(query) not in main._METRICS.statements()
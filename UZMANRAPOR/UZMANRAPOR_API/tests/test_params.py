@@ -0,0 +1,25 @@
+import base64
+import pickle
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pyodbc")
+
+import main  # noqa: E402
+
+RULE = {"col": "Tezgah", "val": "2201", "text": "BEKLE"}
+
+
+def test_changed_note_rule_binds_bytes():
+    blob = pickle.dumps(RULE)
+    # Client bytes parametreyi {"$b64": ...} olarak gönderir (sql_api_client._wire_params)
+    wire = [{"$b64": base64.b64encode(blob).decode("ascii")}, 2]
+    params = main._adapt_params("UPDATE dbo.NoteRules SET RuleData = ? WHERE Id = ?;", wire)
+    assert params == [blob, 2]
+    assert main._adapt_params("INSERT INTO dbo.NoteRules (RuleData) VALUES (?);", wire[:1]) == [blob]
+
+
+def test_invalid_b64_is_rejected():
+    with pytest.raises(main.HTTPException):
+        main._adapt_params("UPDATE dbo.NoteRules SET RuleData = ? WHERE Id = ?;", [{"$b64": "abc"}, 1])
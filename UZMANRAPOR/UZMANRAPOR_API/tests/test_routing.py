@@ -0,0 +1,211 @@
+import shutil
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool
+from routing import PRIMARY, REPLICA, ReadRouter
+
+# Birincil ve replika yerine iki SQLite dosyası: replika, birincilin yazmadan önceki kopyası
+# (replikasyon gecikmesi). Okuma yönlendirmesi main._acquire_routed ile aynı yoldan geçer.
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    primary = tmp_path / "primary.db"
+    with sqlite3.connect(primary) as c:
+        c.execute("CREATE TABLE AppMeta (MetaKey TEXT PRIMARY KEY, MetaValue TEXT)")
+        c.execute("INSERT INTO AppMeta VALUES ('last_update', 'eski')")
+    replica = tmp_path / "replica.db"
+    shutil.copy(primary, replica)
+    return primary, replica
+
+
+def _pool(path, name, **kw):
+    return ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), name=name, **kw)
+
+
+def _read(router, client, primary_pool, replica_pool):
+    route = router.route(client)
+    pool, conn = router.acquire(route, lambda: primary_pool, lambda: replica_pool)
+    try:
+        value = conn.execute("SELECT MetaValue FROM AppMeta WHERE MetaKey = 'last_update'").fetchone()[0]
+        return route, pool, value
+    finally:
+        pool.release(conn)
+
+
+def _write(router, client, primary_pool, value):
+    conn = primary_pool.acquire()
+    try:
+        conn.execute("UPDATE AppMeta SET MetaValue = ? WHERE MetaKey = 'last_update'", (value,))
+        conn.commit()
+    finally:
+        primary_pool.release(conn)
+    router.note_write(client)
+
+
+def test_reads_stick_to_primary_after_write(dbs):
+    primary_pool, replica_pool = _pool(dbs[0], "primary"), _pool(dbs[1], "replica")
+    router = ReadRouter(enabled=True, sticky_sec=0.2)
+
+    assert _read(router, "A", primary_pool, replica_pool)[0] == REPLICA
+
+    _write(router, "A", primary_pool, "yeni")
+    route, pool, value = _read(router, "A", primary_pool, replica_pool)
+    assert (route, pool, value) == (PRIMARY, primary_pool, "yeni")  # kendi yazdığını görür
+
+    # Başka client yapışmaz: replikadan (henüz eski) okur
+    route, _, value = _read(router, "B", primary_pool, replica_pool)
+    assert (route, value) == (REPLICA, "eski")
+
+    time.sleep(0.25)
+    assert _read(router, "A", primary_pool, replica_pool)[0] == REPLICA
+    assert router.snapshot()["sticky_reads"] == 1
+    assert router.last_write("A") is not None
+
+
+def test_falls_back_to_primary_when_replica_down(dbs, tmp_path):
+    primary_pool = _pool(dbs[0], "primary")
+    # Replika dosyası yok ve salt okunur URI: bağlantı açılamaz
+    missing = f"file:{tmp_path / 'yok' / 'replica.db'}?mode=ro"
+    replica_pool = ConnectionPool(lambda: sqlite3.connect(missing, uri=True), name="replica")
+    router = ReadRouter(enabled=True, retry_after=0.2)
+
+    route, pool, value = _read(router, "A", primary_pool, replica_pool)
+    assert route == REPLICA and pool is primary_pool and value == "eski"
+    snap = router.snapshot()
+    assert snap["replica_down"] == 1 and snap["fallbacks"] == 1 and snap["last_error"]
+
+    # Devre dışı süresince replika hiç denenmez
+    assert router.route("A") == PRIMARY
+    assert router.snapshot()["down_reads"] == 1
+
+    time.sleep(0.25)
+    assert router.route("A") == REPLICA
+
+
+def test_falls_back_without_disabling_when_replica_pool_busy(dbs):
+    primary_pool = _pool(dbs[0], "primary")
+    replica_pool = _pool(dbs[1], "replica", max_size=1, acquire_timeout=0.05)
+    router = ReadRouter(enabled=True)
+
+    held = replica_pool.acquire()
+    try:
+        route, pool, _ = _read(router, "A", primary_pool, replica_pool)
+        assert route == REPLICA and pool is primary_pool
+    finally:
+        replica_pool.release(held)
+
+    snap = router.snapshot()
+    assert snap["fallbacks"] == 1 and snap["replica_down"] == 0
+    assert _read(router, "A", primary_pool, replica_pool)[1] is replica_pool
+
+
+def test_disabled_router_reads_primary_and_tracks_writes(dbs):
+    primary_pool = _pool(dbs[0], "primary")
+    router = ReadRouter(enabled=False)
+    assert router.route("A") == PRIMARY
+    router.note_write("A")
+    assert router.last_write("A") is not None
+
+
+def test_concurrent_clients(dbs):
+    primary_pool, replica_pool = _pool(dbs[0], "primary"), _pool(dbs[1], "replica")
+    router = ReadRouter(enabled=True, sticky_sec=5)
+    _write(router, "writer", primary_pool, "yeni")
+    seen: dict[str, str] = {}
+
+    def read(client):
+        seen[client] = _read(router, client, primary_pool, replica_pool)[2]
+
+    threads = [threading.Thread(target=read, args=(c,)) for c in ("writer", "r1", "r2")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen == {"writer": "yeni", "r1": "eski", "r2": "eski"}
+
+
+# ------------------------------------------------------------
+#  main üzerinden: _read_route + _routed_connection + _execute_cached (singleflight anahtarı, note_write)
+# ------------------------------------------------------------
+
+READ = "SELECT MetaValue FROM dbo.AppMeta WHERE MetaKey = 'last_update'"
+WRITE = "UPDATE dbo.AppMeta SET MetaValue = ? WHERE MetaKey = 'last_update'"
+
+
+@pytest.fixture
+def routed_main(dbs, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("pyodbc")
+    import main
+
+    monkeypatch.setattr(main, "_ROUTER", ReadRouter(enabled=True, sticky_sec=5))
+    monkeypatch.setattr(main, "_POOLS", main.PoolRegistry(lambda database: _pool(dbs[0], "primary")))
+    monkeypatch.setattr(main, "_READ_POOLS", main.PoolRegistry(lambda database: _pool(dbs[1], "replica")))
+    return main
+
+
+def _main_read(main, client, gate=None, deadline=None):
+    route = main._read_route(READ, client)
+
+    def run():
+        # SQLite'ta dbo şeması yok: aynı sorgu şemasız çalıştırılır
+        with main._routed_connection(route, "db") as (_, conn):
+            value = conn.execute(READ.replace("dbo.", "")).fetchone()[0]
+        if gate is not None:
+            gate.wait(5)
+        return {"columns": ["MetaValue"], "rows": [[value]], "rowcount": 1}
+
+    result = main._execute_cached(READ, [], "db", run, client, route, deadline)
+    return route, result["rows"][0][0]
+
+
+def _main_write(main, client, value):
+    def run():
+        with main._routed_connection(PRIMARY, "db") as (_, conn):
+            cur = conn.execute(WRITE.replace("dbo.", ""), (value,))
+            conn.commit()
+            return {"columns": [], "rows": [], "affected_rows": cur.rowcount}
+
+    main._execute_cached(WRITE, [value], "db", run, client, PRIMARY)
+
+
+def test_main_read_after_write_does_not_join_replica_flight(routed_main):
+    main = routed_main
+    _main_write(main, "A", "yeni")
+
+    # B (yapışık değil) replikadan okuyor ve sonucu bekletiyor; A'nın yazmasından SONRA başladı
+    gate = threading.Event()
+    seen = {}
+    reader = threading.Thread(target=lambda: seen.update(B=_main_read(main, "B", gate)))
+    reader.start()
+    deadline = time.monotonic() + 5
+    while not main._FLIGHTS.snapshot()["in_flight"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+    try:
+        # A kendi yazdığını birincilden görmeli; B'nin replika uçuşuna katılırsa eski değeri alır
+        # (katılırsa kapı kapalı olduğundan süre dolar ve 504 ile düşer)
+        route, value = _main_read(main, "A", deadline=time.monotonic() + 1)
+        assert (route, value) == (PRIMARY, "yeni")
+    finally:
+        gate.set()
+        reader.join(5)
+
+    assert seen["B"] == (REPLICA, "eski")
+    assert main._FLIGHTS.snapshot()["in_flight"] == 0
+
+
+def test_main_cached_reference_reads_always_use_primary(routed_main):
+    main = routed_main
+    query = "SELECT LoomNo FROM dbo.BlockedLooms"
+    if not main._RESULTS.cacheable(main._query_tables(query)):
+        pytest.skip("BlockedLooms önbellekli tablolar arasında değil")
+    # Önbellek girdisi yalnız birincilden doldurulur: replika gecikmesi TTL boyunca saklanmaz
+    assert main._read_route(query, "B") == PRIMARY
+    assert main._read_route(READ, "B") == REPLICA
@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pyodbc")
+
+import main  # noqa: E402
+from admission import AdmissionRejected  # noqa: E402
+from cancellation import QueryCancelled  # noqa: E402
+
+# Önbelleklenmeyen tablo: sonuç yalnız singleflight ile paylaşılır
+QUERY = "SELECT MetaValue FROM dbo.AppMeta WHERE MetaKey = ?"
+ROWS = {"columns": ["MetaValue"], "rows": [["v1"]], "rowcount": 1}
+
+
+def _wait_for(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def _flight():
+    calls = list(main._FLIGHTS._calls.values())
+    return calls[0] if calls else None
+
+
+def _coalesce(leader_error, param):
+    """Lider, takipçi katılana kadar bekler ve leader_error ile biter; takipçinin sonucu/hatası döner."""
+    release = threading.Event()
+    follower_runs = []
+    out = {}
+
+    def _leader_run():
+        release.wait(5)
+        raise leader_error
+
+    def _follower_run():
+        follower_runs.append(1)
+        return main._copy_result(ROWS)
+
+    def _call(name, run, request_id):
+        try:
+            out[name] = main._execute_cached(QUERY, [param], "db", run, "client-" + name, main.PRIMARY,
+                                             None, request_id)
+        except BaseException as e:
+            out[name] = e
+
+    leader = threading.Thread(target=_call, args=("a", _leader_run, "req-a"))
+    leader.start()
+    _wait_for(lambda: _flight() is not None)
+    follower = threading.Thread(target=_call, args=("b", _follower_run, "req-b"))
+    follower.start()
+    _wait_for(lambda: _flight() is not None and _flight().waiters == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    return out, follower_runs
+
+
+@pytest.mark.parametrize("error", [
+    QueryCancelled("Request req-a was cancelled"),
+    AdmissionRejected("Server busy", retry_after=1),
+    main.pyodbc.Error("HYT00", "Query timeout expired"),
+    main.HTTPException(status_code=504, detail="Deadline exceeded before execution"),
+])
+def test_leader_specific_error_is_not_shared(error):
+    out, follower_runs = _coalesce(error, f"own-{type(error).__name__}")
+    assert out["a"] is error
+    assert out["b"] == ROWS
+    assert follower_runs == [1]  # takipçi yeni lider olup kendisi çalıştırdı
+
+
+def test_query_error_is_shared():
+    error = main.pyodbc.Error("42S22", "Invalid column name")
+    out, follower_runs = _coalesce(error, "shared")
+    assert isinstance(out["b"], main.pyodbc.Error)
+    assert out["b"].args == error.args
+    assert follower_runs == []
@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pyodbc")
+
+import anyio  # noqa: E402
+
+import main  # noqa: E402
+
+
+def test_release_once_runs_cleanup_once():
+    calls = []
+    release = main._release_once(lambda: calls.append(1))
+    release()
+    release()
+    assert calls == [1]
+
+
+def test_release_once_is_thread_safe():
+    calls = []
+    release = main._release_once(lambda: calls.append(1))
+    threads = [threading.Thread(target=release) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+
+
+def test_unstarted_generator_is_released_by_background_task():
+    calls = []
+    release = main._release_once(lambda: calls.append(1))
+
+    def _generate():
+        try:
+            yield b"x"
+        finally:
+            release()
+
+    gen = _generate()
+    gen.close()  # hiç başlamamış üretecin finally'si çalışmaz
+    assert calls == []
+    main.BackgroundTask(release).func()
+    assert calls == [1]
+
+
+# ------------------------------------------------------------
+#  Uç seviyesinde: client ilk parçadan önce koparsa bağlantı ve kabul slotu geri döner
+# ------------------------------------------------------------
+
+QUERY = "SELECT MetaKey, MetaValue FROM dbo.AppMeta"
+
+
+class _FakeCursor:
+    description = [("MetaKey", str, None, None, None, None, True), ("MetaValue", str, None, None, None, None, True)]
+    rowcount = -1
+
+    def __init__(self):
+        self._rows = [("last_update", "v1"), ("rules", "v2")]
+
+    def execute(self, query, params=()):
+        return self
+
+    def fetchmany(self, n):
+        out, self._rows = self._rows[:n], self._rows[n:]
+        return out
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FakeConn:
+    timeout = 0
+
+    def cursor(self):
+        return _FakeCursor()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    monkeypatch.setenv("UZMANRAPOR_API_TOKEN", "t")
+    pools = main.PoolRegistry(lambda database: main.ConnectionPool(_FakeConn, name=database))
+    monkeypatch.setattr(main, "_POOLS", pools)
+    return pools
+
+
+def _in_use(pools):
+    pool = sum(snap["in_use"] for snap in pools.snapshot().values())
+    lane = main._ADMISSION.snapshot()["lanes"]["bulk"]["in_use"]
+    return pool, lane
+
+
+def _drop_before_first_chunk(response, spec_version):
+    """Cevabı, ilk parça gönderilmeden kopan bir client'a karşı ASGI üzerinden sürer."""
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if spec_version >= "2.4":
+            raise OSError("client gone")  # 2.4: kopma send'de OSError olarak görünür
+        await anyio.sleep_forever()  # <2.4: kopma receive'den gelir, send hiç tamamlanmaz
+
+    async def run():
+        scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": spec_version}}
+        try:
+            await response(scope, receive, send)
+        except Exception:
+            pass
+
+    anyio.run(run)
+
+
+ENDPOINTS = [
+    pytest.param(lambda: main.sql_stream, id="stream"),
+    pytest.param(lambda: main.sql_arrow if main.pa is not None else pytest.skip("pyarrow"), id="arrow"),
+]
+
+
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_drop_before_first_chunk_releases_connection_and_slot(fake_db, endpoint, spec_version):
+    before = _in_use(fake_db)
+    response = endpoint()(main.SqlRequest(query=QUERY), x_token="t", x_client_id="c", x_deadline_ms=None,
+                          x_request_id="req-drop")
+    pool_in_use, lane_in_use = _in_use(fake_db)
+    assert pool_in_use == before[0] + 1 and lane_in_use == before[1] + 1  # akış boyunca tutulur
+
+    _drop_before_first_chunk(response, spec_version)
+    assert _in_use(fake_db) == before
+    assert main._QUERIES.snapshot()["running"] == 0
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_full_stream_releases_connection_and_slot(fake_db, endpoint):
+    before = _in_use(fake_db)
+    response = endpoint()(main.SqlRequest(query=QUERY), x_token="t", x_client_id="c", x_deadline_ms=None,
+                          x_request_id="req-full")
+    chunks = []
+
+    async def run():
+        async def receive():
+            await anyio.sleep_forever()
+
+        async def send(message):
+            chunks.append(message.get("body", b""))
+
+        await response({"type": "http", "asgi": {"spec_version": "2.3"}}, receive, send)
+
+    anyio.run(run)
+    assert b"".join(chunks)
+    assert _in_use(fake_db) == before